@@ -0,0 +1,571 @@
+"""Generador de cargas sintéticas y banco de pruebas de rendimiento del planificador.
+
+Uso:
+    python benchmarks.py [--scales 500,2000,8000] [--operarios 1,2,3] [-o benchmark_results.json]
+    python benchmarks.py --formats [--scales 2000,8000]
+    python benchmarks.py --report-memory [--scales 2000,8000,32000]
+    python benchmarks.py --compare anterior.json actual.json
+
+Genera Excel sintéticos con la misma disposición de columnas que espera Task
+(B-G y L, con observaciones que mezclan "N legios" y "revisió") y mide por
+separado read_excel_data (frente al bucle anterior con iterrows),
+calcular_duracion, el modelo de tarea (__dict__ frente a __slots__),
+generate_routes, la inserción de visitas en un día, create_excel_report y
+print_summary a varias escalas y para 1..N operarios; con --formats mide
+además la lectura del archivo completo en Excel, CSV y Parquet, y con
+--report-memory la memoria pico del informe en un plan con horizonte
+suficiente para todas las tareas. Los resultados (tiempo, memoria pico y una
+curva de escalado de tiempo y memoria por etapa) se guardan en JSON para poder
+comparar ejecuciones entre commits.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import math
+import os
+import platform
+import random
+import re
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+import pandas as pd
+
+import route_planner
+
+# Observaciones típicas de las hojas mensuales, con su peso relativo
+OBSERVACIONES = [
+    ("1 legio", 20),
+    ("2 legios", 15),
+    ("3 legios", 10),
+    ("4 legios", 8),
+    ("5 legios", 5),
+    ("6 legios", 4),
+    ("8 legios", 3),
+    ("10 legios", 2),
+    ("Presa de mostres legionel·la", 6),
+    ("2 legios + revisió", 8),
+    ("Revisió i 4 legios", 4),
+    ("Revisió anual", 10),
+    ("revisio instal·lació", 3),
+    ("", 2),
+]
+
+MANTENIMIENTOS = ["Legionel·la", "ACS", "Torres de refrigeració", "Piscina"]
+
+# Franjas horarias típicas (columnas M-N) de escuelas, hoteles y centros deportivos
+FRANJAS = [("9:00", "13:00"), ("8:00", "11:00"), ("10:00", "14:00"), ("15:00", "18:00")]
+
+
+def poblaciones_sinteticas(num_poblaciones):
+    """Devuelve num_poblaciones nombres, empezando por los del fichero de coordenadas."""
+    names = []
+    if os.path.exists(route_planner.COORDINATES_FILE):
+        names = pd.read_csv(route_planner.COORDINATES_FILE)['poblacion'].astype(str).tolist()
+    names = names[:num_poblaciones]
+    names += [f"Població {i}" for i in range(len(names) + 1, num_poblaciones + 1)]
+    return names
+
+
+def generate_synthetic_tasks(num_rows, num_poblaciones=40, seed=0, invalid_ratio=0.02, window_ratio=0.0):
+    """Genera un DataFrame con la disposición del Excel mensual (sin cabecera).
+
+    Las poblaciones siguen una distribución sesgada (unas pocas concentran muchas
+    tareas) y una fracción invalid_ratio de filas no tiene cliente o población.
+    Con window_ratio > 0 se añaden las columnas M-N y esa fracción de filas
+    tiene franja horaria (de mañana o de tarde).
+    """
+    rng = random.Random(seed)
+    poblaciones = poblaciones_sinteticas(num_poblaciones)
+    town_weights = [1 / (rank + 1) for rank in range(len(poblaciones))]
+    texts = [text for text, _ in OBSERVACIONES]
+    text_weights = [weight for _, weight in OBSERVACIONES]
+
+    towns = rng.choices(poblaciones, town_weights, k=num_rows)
+    observaciones = rng.choices(texts, text_weights, k=num_rows)
+    rows = []
+    for i in range(num_rows):
+        client = rng.randrange(max(num_rows // 2, 1))
+        row = [None] * (14 if window_ratio > 0 else 12)
+        row[0] = i + 1
+        row[1] = rng.choice(MANTENIMIENTOS)
+        row[2] = 10000 + client
+        row[3] = f"Client {client}"
+        row[4] = f"Carrer {rng.randrange(1, 120)}, {rng.randrange(1, 80)}"
+        row[5] = f"Instal·lació {client}" if rng.random() < 0.5 else None
+        row[6] = towns[i]
+        row[11] = observaciones[i] or None
+        if window_ratio > 0 and rng.random() < window_ratio:
+            row[12], row[13] = rng.choice(FRANJAS)
+        if rng.random() < invalid_ratio:
+            row[rng.choice((3, 6))] = None
+        rows.append(row)
+
+    return pd.DataFrame(rows)
+
+
+def read_excel_iterrows(df):
+    """Lectura anterior a read_excel_data (una Task por fila con iterrows), como referencia."""
+    tasks = []
+    for _, row in df.iterrows():
+        task = route_planner.Task(row)
+        if task.is_valid():
+            tasks.append(task)
+    return tasks
+
+
+def calcular_duracion_escalera(observaciones):
+    """Método anterior a DurationRules (regex sin compilar y cadena de if/elif), como referencia."""
+    descripcion = observaciones.lower()
+    duracion = 0
+    
+    legio_match = re.search(r'(\d+)\s*legio', descripcion)
+    if legio_match:
+        num_legios = int(legio_match.group(1))
+    elif 'legio' in descripcion:
+        num_legios = 1
+    else:
+        num_legios = 0
+    
+    if num_legios == 1:
+        duracion = 45
+    elif 2 <= num_legios <= 3:
+        duracion = 60
+    elif 4 <= num_legios <= 5:
+        duracion = 90
+    elif 6 <= num_legios <= 7:
+        duracion = 120
+    elif 7 <= num_legios <= 9:
+        duracion = 150
+    elif 9 <= num_legios <= 11:
+        duracion = 180
+    
+    if 'revisió' in descripcion or 'revisio' in descripcion:
+        duracion += 45
+    
+    return duracion
+
+
+def datetime_start_times(visits):
+    """Modelo anterior a los minutos enteros (datetime y timedelta por visita), como referencia.
+    
+    visits son tuplas (duración, tiempo de viaje) de un día, en orden; devuelve
+    la hora de inicio de cada visita y si antes se hace la pausa para comer, con
+    la regla de las 13:00 que aplicaban calculate_start_time y el informe.
+    """
+    day = datetime.combine(datetime.today(), datetime.min.time())
+    lunch_start = day + timedelta(hours=13)
+    starts = []
+    lunches = []
+    last_end_time = None
+    for duracion, travel_time in visits:
+        if last_end_time is None:
+            start_time = day + timedelta(hours=8, minutes=travel_time)
+            lunch = False
+        else:
+            start_time = last_end_time + timedelta(minutes=travel_time)
+            lunch = (last_end_time.hour < 13 and start_time.hour >= 13
+                     and start_time.time() > lunch_start.time())
+            if lunch:
+                start_time += timedelta(minutes=route_planner.LUNCH_DURATION)
+        starts.append(start_time)
+        lunches.append(lunch)
+        last_end_time = start_time + timedelta(minutes=duracion)
+    return starts, lunches
+
+
+def dict_task_class():
+    """Copia de Task sin __slots__ (atributos en __dict__), como antes de compartir las tareas."""
+    excluded = {'__slots__', *route_planner.Task.__slots__}
+    namespace = {name: value for name, value in vars(route_planner.Task).items() if name not in excluded}
+    return type('DictTask', (), namespace)
+
+
+DictTask = dict_task_class()
+
+
+def dict_tasks(records):
+    """Crea tareas sin asignar con el modelo anterior basado en __dict__."""
+    return [DictTask.from_values(*record) for record in records]
+
+
+def plan_visits(operarios):
+    """Tareas y tiempos de viaje de cada día del plan, para volver a insertarlas."""
+    return [
+        list(zip(route_day.visit_tasks, route_day.travel_times))
+        for operario in operarios
+        for route_day in operario.active_days()
+    ]
+
+
+def insert_minutes(days):
+    """Inserta las visitas de cada día en un RouteDayWeek nuevo (minutos enteros)."""
+    for visits in days:
+        route_day = route_planner.RouteDayWeek(route_planner.WORK_DAYS[0], 1, datetime(2026, 1, 5))
+        for task, travel_time in visits:
+            route_day.add_task(task, travel_time)
+
+
+def insert_datetime(days):
+    """Inserta las visitas de cada día con el modelo anterior basado en datetime."""
+    for visits in days:
+        datetime_start_times([(task.duracion, travel_time) for task, travel_time in visits])
+
+
+def insert_copies(days):
+    """Inserta las visitas copiando la tarea en cada día, como hacía add_task antes de __slots__."""
+    planned = []
+    for visits in days:
+        route_day = []
+        for task, travel_time in visits:
+            task_copy = DictTask()
+            task_copy.__dict__.update({name: getattr(task, name) for name in route_planner.Task.__slots__})
+            task_copy.travel_time = travel_time
+            route_day.append(task_copy)
+        planned.append(route_day)
+    return planned
+
+
+def cold_duration_rules(tasks):
+    """Prepara reglas de duración con la caché vacía; devuelve las tareas."""
+    route_planner.get_duration_rules().duration_of.cache_clear()
+    return tasks
+
+
+def git_commit():
+    """Devuelve el commit actual del repositorio, si se puede saber."""
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def measure(stage, setup, repeat):
+    """Mide una etapa: mejor tiempo de repeat ejecuciones y memoria pico de una más.
+
+    setup() prepara la entrada (fuera de la medición) y stage(entrada) ejecuta la
+    etapa. Los print del planificador se descartan.
+    """
+    best = math.inf
+    with contextlib.redirect_stdout(io.StringIO()):
+        for _ in range(repeat):
+            data = setup()
+            start = time.perf_counter()
+            stage(data)
+            best = min(best, time.perf_counter() - start)
+
+        data = setup()
+        tracemalloc.start()
+        stage(data)
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+
+    return {'seconds': best, 'peak_mb': peak / 1e6}
+
+
+def fresh_tasks(records):
+    """Crea tareas sin asignar a partir de sus tuplas compactas."""
+    return [route_planner.Task.from_values(*record) for record in records]
+
+
+def write_task_files(df, directory):
+    """Escribe el mismo DataFrame sintético como xlsx, csv y parquet; devuelve {formato: ruta}."""
+    paths = {fmt: os.path.join(directory, f"tareas.{fmt}") for fmt in ("xlsx", "csv", "parquet")}
+    df.to_excel(paths['xlsx'], header=False, index=False)
+    df.to_csv(paths['csv'], header=False, index=False)
+    # Parquet exige nombres de columna de texto; el lector usa la posición, no el nombre
+    df.set_axis([str(column) for column in df.columns], axis=1).to_parquet(paths['parquet'], index=False)
+    return paths
+
+
+def measure_formats(df, repeat):
+    """Mide la lectura del archivo completo: pd.read_excel + read_excel_data frente a read_tasks_file.
+
+    La memoria pico solo cuenta las asignaciones de Python: lo que reserva Arrow
+    al leer Parquet no aparece en tracemalloc.
+    """
+    measurements = []
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_task_files(df, directory)
+        measurements.append(('excel_pandas', measure(
+            lambda path: route_planner.read_excel_data(pd.read_excel(path, header=None)),
+            lambda: paths['xlsx'], repeat,
+        )))
+        for fmt, path in paths.items():
+            measurements.append((fmt, measure(route_planner.read_tasks_file, lambda: path, repeat)))
+    return measurements
+
+
+def measure_report_memory(records, num_operarios, repeat):
+    """Mide el informe, con y sin streaming, sobre un plan que crece con las tareas.
+
+    Con el horizonte por defecto el plan deja de crecer al llenarse, así que aquí
+    las semanas se ajustan para que quepan todas las tareas. El informe se
+    escribe en un archivo temporal para que el propio archivo no cuente en la
+    memoria pico. Devuelve [(streaming, número de visitas, medición)].
+    """
+    weeks = max(route_planner.MAX_WEEKS,
+                math.ceil(len(records) / (num_operarios * len(route_planner.WORK_DAYS) * 4)))
+    calendar = route_planner.PlanningCalendar(datetime(2026, 1, 5), weeks)
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = route_planner.generate_routes(fresh_tasks(records), num_operarios, calendar=calendar)
+    visits = sum(len(route_day.visit_tasks) for operario in operarios for route_day in operario.route_days.values())
+
+    measurements = []
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "informe.xlsx")
+        for streaming in (False, True):
+            measurements.append((streaming, visits, measure(
+                lambda output: route_planner.create_excel_report(operarios, output, streaming=streaming),
+                lambda: path, repeat,
+            )))
+    return measurements
+
+
+def run_scale(num_rows, operarios_list, num_poblaciones, seed, repeat, window_ratio=0.0, formats=False,
+              report_memory=False):
+    """Mide todas las etapas para una escala; devuelve una lista de resultados."""
+    results = []
+    df = generate_synthetic_tasks(num_rows, num_poblaciones, seed, window_ratio=window_ratio)
+
+    def add(stage, num_operarios, measurement, **extra):
+        results.append({'stage': stage, 'rows': num_rows, 'operarios': num_operarios, **extra, **measurement})
+
+    add('read_excel_data', None, measure(route_planner.read_excel_data, lambda: df, repeat))
+    add('read_excel_data', None, measure(read_excel_iterrows, lambda: df, repeat), method='iterrows')
+    if formats:
+        for method, measurement in measure_formats(df, repeat):
+            add('read_tasks_file', None, measurement, method=method)
+
+    tasks = route_planner.read_excel_data(df)
+    records = route_planner.task_records(tasks)
+    add('calcular_duracion', None, measure(
+        lambda tasks: [calcular_duracion_escalera(task.observaciones) for task in tasks], lambda: tasks, repeat,
+    ), tasks=len(tasks), method='escalera')
+    add('calcular_duracion', None, measure(
+        lambda tasks: [task.calcular_duracion() for task in tasks], lambda: cold_duration_rules(tasks), repeat,
+    ), tasks=len(tasks), method='reglas_en_frio')
+    add('calcular_duracion', None, measure(
+        lambda tasks: [task.calcular_duracion() for task in tasks], lambda: tasks, repeat,
+    ), tasks=len(tasks), method='reglas')
+    observaciones = pd.Series([task.observaciones for task in tasks])
+    add('calcular_duracion', None, measure(
+        route_planner.calcular_duraciones, lambda: cold_duration_rules(observaciones), repeat,
+    ), tasks=len(tasks), method='columna')
+
+    # Modelo de tarea: tamaño de cada registro y planificación con __dict__ frente a __slots__
+    for method, create in (('dict', dict_tasks), ('slots', fresh_tasks)):
+        measurement = measure(create, lambda: records, repeat)
+        add('modelo_tarea', None, measurement, method=method, tasks=len(records),
+            bytes_per_task=measurement['peak_mb'] * 1e6 / max(len(records), 1))
+        measurement = measure(
+            lambda tasks: route_planner.generate_routes(tasks, operarios_list[-1]), lambda: create(records), repeat,
+        )
+        add('planificacion_modelo', operarios_list[-1], measurement, method=method,
+            tasks_per_second=len(records) / measurement['seconds'])
+
+    for num_operarios in operarios_list:
+        for assignment in route_planner.ASSIGNMENT_MODES:
+            # Intentos por tarea: días (o poblaciones) consultados para colocar cada tarea
+            stats = route_planner.PlanningStats()
+            with contextlib.redirect_stdout(io.StringIO()):
+                route_planner.generate_routes(fresh_tasks(records), num_operarios, assignment=assignment, stats=stats)
+            add('generate_routes', num_operarios, measure(
+                lambda tasks: route_planner.generate_routes(tasks, num_operarios, assignment=assignment),
+                lambda: fresh_tasks(records), repeat,
+            ), assignment=assignment, probes_per_task=stats.probes / max(stats.tasks, 1),
+                max_probes=stats.max_probes)
+
+        plan_tasks = fresh_tasks(records)
+        with contextlib.redirect_stdout(io.StringIO()):
+            operarios = route_planner.generate_routes(plan_tasks, num_operarios)
+
+        # Coste de insertar las visitas del plan, con el modelo anterior y con minutos enteros
+        days = plan_visits(operarios)
+        visits = sum(len(day) for day in days)
+        for method, stage in (('datetime', insert_datetime), ('copia', insert_copies), ('minutos', insert_minutes)):
+            add('insercion', num_operarios, measure(stage, lambda: days, repeat), method=method, visits=visits)
+
+        for streaming in (False, True):
+            add('create_excel_report', num_operarios, measure(
+                lambda output: route_planner.create_excel_report(operarios, output, streaming=streaming),
+                io.BytesIO, repeat,
+            ), streaming=streaming)
+
+        add('print_summary', num_operarios, measure(
+            lambda _: route_planner.print_summary(plan_tasks, operarios), lambda: None, repeat,
+        ))
+
+        if report_memory:
+            for streaming, visits, measurement in measure_report_memory(records, num_operarios, repeat):
+                add('informe_memoria', num_operarios, measurement, streaming=streaming, visits=visits)
+
+    return results
+
+
+def fitted_exponent(points):
+    """Exponente k del ajuste y ~ x^k en escala logarítmica (None si no se puede ajustar)."""
+    points = [(x, y) for x, y in points if x > 0 and y > 0]
+    if len(points) < 2:
+        return None
+    xs = [math.log(x) for x, _ in points]
+    ys = [math.log(y) for _, y in points]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    variance = sum((x - mean_x) ** 2 for x in xs)
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / variance if variance else None
+
+
+def scaling_curves(results):
+    """Ajusta tiempo y memoria pico ~ filas^k por etapa y variante.
+
+    k cerca de 1 indica escalado lineal; un memory_exponent cerca de 0 indica
+    que la memoria pico no crece con el número de filas.
+    """
+    series = {}
+    for result in results:
+        key = (result['stage'], result['operarios'], variant(result))
+        series.setdefault(key, []).append((result['rows'], result['seconds'], result['peak_mb']))
+
+    curves = []
+    for (stage, num_operarios, stage_variant), points in series.items():
+        timed = [(rows, seconds) for rows, seconds, _ in points if seconds > 0]
+        if len(timed) < 2:
+            continue
+        curves.append({
+            'stage': stage,
+            'operarios': num_operarios,
+            'variant': stage_variant,
+            'exponent': fitted_exponent(timed),
+            'memory_exponent': fitted_exponent([(rows, peak_mb) for rows, _, peak_mb in points]),
+            'microseconds_per_row': {rows: seconds / rows * 1e6 for rows, seconds in timed},
+            'peak_mb': {rows: peak_mb for rows, _, peak_mb in points},
+        })
+    return curves
+
+
+def variant(result):
+    """Nombre de la variante medida (modo de asignación, informe en streaming o método)."""
+    if result.get('streaming'):
+        return 'streaming'
+    return result.get('assignment') or result.get('method') or ''
+
+
+def result_key(result):
+    """Clave que identifica una medición para comparar dos ejecuciones."""
+    return (result['stage'], result['rows'], result['operarios'], variant(result))
+
+
+def compare(old_path, new_path):
+    """Imprime la relación de tiempos y memoria entre dos ficheros de resultados."""
+    with open(old_path, encoding='utf-8') as f:
+        old = {result_key(result): result for result in json.load(f)['results']}
+    with open(new_path, encoding='utf-8') as f:
+        new = json.load(f)['results']
+
+    print(f"{'etapa':<22}{'filas':>8}{'ops':>5}  {'variante':<14}{'antes':>10}{'después':>10}{'ratio':>8}{'MB':>14}")
+    for result in new:
+        before = old.get(result_key(result))
+        if before is None:
+            continue
+        ratio = result['seconds'] / before['seconds'] if before['seconds'] else math.inf
+        print(f"{result['stage']:<22}{result['rows']:>8}{result['operarios'] or '-':>5}  {variant(result):<14}"
+              f"{before['seconds'] * 1000:>8.1f}ms{result['seconds'] * 1000:>8.1f}ms{ratio:>7.2f}x"
+              f"{before['peak_mb']:>7.1f}->{result['peak_mb']:<6.1f}")
+
+
+def parse_int_list(value):
+    """Convierte '1,2,3' en [1, 2, 3]."""
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def main(argv=None):
+    """Punto de entrada del banco de pruebas."""
+    parser = argparse.ArgumentParser(description="Banco de pruebas de rendimiento del planificador.")
+    parser.add_argument("--scales", type=parse_int_list, default=[500, 2000, 8000],
+                        help="número de filas de cada escala (por defecto: 500,2000,8000)")
+    parser.add_argument("--operarios", type=parse_int_list, default=[1, 2, 3],
+                        help="números de operarios a medir (por defecto: 1,2,3)")
+    parser.add_argument("--poblaciones", type=int, default=40, help="número de poblaciones distintas")
+    parser.add_argument("--repeat", type=int, default=3, help="repeticiones por medición (se usa la mejor)")
+    parser.add_argument("--seed", type=int, default=0, help="semilla de los datos sintéticos")
+    parser.add_argument("--windows", type=float, default=0.0,
+                        help="fracción de tareas con franja horaria (columnas M-N)")
+    parser.add_argument("--formats", action="store_true",
+                        help="mide también la lectura del archivo completo en xlsx, csv y parquet")
+    parser.add_argument("--report-memory", action="store_true",
+                        help="mide la memoria pico del informe con y sin streaming en un plan que crece con las filas")
+    parser.add_argument("-o", "--output", default="benchmark_results.json", help="fichero JSON de resultados")
+    parser.add_argument("--export", metavar="XLSX",
+                        help="solo escribe un Excel sintético con la mayor escala y termina")
+    parser.add_argument("--compare", nargs=2, metavar=("ANTES", "DESPUES"),
+                        help="compara dos ficheros de resultados y termina")
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        compare(*args.compare)
+        return 0
+
+    if args.export:
+        df = generate_synthetic_tasks(max(args.scales), args.poblaciones, args.seed, window_ratio=args.windows)
+        df.to_excel(args.export, header=False, index=False)
+        print(f"Excel sintético de {len(df)} filas escrito en {args.export}")
+        return 0
+
+    # Cargar la matriz de tiempos antes de medir, para no contarla en la primera etapa
+    route_planner.get_travel_matrix()
+
+    results = []
+    for num_rows in args.scales:
+        print(f"Midiendo {num_rows} filas...", file=sys.stderr)
+        results.extend(run_scale(num_rows, args.operarios, args.poblaciones, args.seed, args.repeat,
+                                 args.windows, args.formats, args.report_memory))
+
+    output = {
+        'commit': git_commit(),
+        'date': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'parameters': {
+            'scales': args.scales,
+            'operarios': args.operarios,
+            'poblaciones': args.poblaciones,
+            'repeat': args.repeat,
+            'seed': args.seed,
+            'windows': args.windows,
+            'formats': args.formats,
+            'report_memory': args.report_memory,
+        },
+        'results': results,
+        'scaling': scaling_curves(results),
+    }
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(output, f, ensure_ascii=False, indent=2)
+
+    for result in results:
+        print(f"{result['stage']:<22}{result['rows']:>8} filas  ops={result['operarios'] or '-':<3}"
+              f"{variant(result):<14}{result['seconds'] * 1000:>9.1f} ms {result['peak_mb']:>8.1f} MB"
+              + (f"  {result['probes_per_task']:.1f} intentos/tarea (máx. {result['max_probes']})"
+                 if 'probes_per_task' in result else "")
+              + (f"  {result['visits']} visitas" if 'visits' in result else "")
+              + (f"  {result['bytes_per_task']:.0f} B/tarea" if 'bytes_per_task' in result else "")
+              + (f"  {result['tasks_per_second']:.0f} tareas/s" if 'tasks_per_second' in result else ""))
+    for curve in scaling_curves(results):
+        if curve['stage'] == 'informe_memoria' and curve['memory_exponent'] is not None:
+            print(f"informe_memoria ops={curve['operarios']} {curve['variant'] or 'pandas':<10}"
+                  f"memoria ~ filas^{curve['memory_exponent']:.2f}")
+    print(f"Resultados guardados en {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
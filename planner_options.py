@@ -0,0 +1,10 @@
+"""Valores válidos de las opciones del planificador, compartidos por todas las entradas.
+
+route_planner los usa en generate_routes, y route_planner_cli.py y
+planning_service.py validan con ellos sus argumentos y las opciones de cada
+trabajo. Como esas herramientas, este módulo no importa nada: así pueden
+conocer las opciones sin cargar pandas ni el planificador.
+"""
+
+ASSIGNMENT_MODES = ("round_robin", "best_fit")  # Modos de asignación de generate_routes
+LOCATION_ORDERS = ("alphabetical", "sweep")  # Orden en que generate_routes recorre las poblaciones
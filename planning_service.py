@@ -0,0 +1,692 @@
+"""Servicio local de planificación por HTTP/JSON, con un conjunto acotado de procesos.
+
+Uso:
+    python planning_service.py serve [--port 8600] [--workers 2] [--queue 32] [--cache 64]
+    python planning_service.py loadtest [--url http://127.0.0.1:8600] [--clients 4] [--requests 5]
+
+Varios usuarios de la aplicación (y los lotes de route_planner_cli.py con
+--service) envían sus archivos de tareas a un mismo servicio, que los
+planifica en procesos aparte en lugar de en el hilo de cada sesión. Cada
+trabajo recibe un id, se pone en una cola acotada y se consulta su estado
+hasta que termina; el informe Excel, el plan guardado y los cambios respecto
+al mes anterior se descargan después. Los resultados se guardan por el hash
+de la entrada (archivo, opciones y plan anterior), de modo que repetir una
+planificación idéntica no vuelve a calcularla.
+
+API:
+    POST /trabajos                   {"nombre", "archivo" (base64), "opciones", "plan_anterior" (base64)}
+    GET  /trabajos/ID                estado del trabajo y, al terminar, su resumen
+    GET  /trabajos/ID/informe        informe Excel
+    GET  /trabajos/ID/plan           plan guardado (JSON de SavedPlan)
+    GET  /trabajos/ID/cambios        cambios respecto al plan anterior (CSV)
+    GET  /estado                     procesos, cola y aciertos de la caché
+
+Cada trabajo se planifica con plan_file de route_planner_cli.py, así que el
+resumen es el mismo que escribe la planificación por lotes. Como el resto de
+herramientas de línea de comandos, solo importa la biblioteca estándar:
+route_planner se carga en los procesos de trabajo.
+"""
+
+import argparse
+import base64
+import hashlib
+import http.client
+import json
+import math
+import os
+import queue
+import tempfile
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit
+
+from planner_options import ASSIGNMENT_MODES, LOCATION_ORDERS
+
+DEFAULT_PORT = 8600
+DEFAULT_WORKERS = 2  # Procesos de planificación en paralelo
+DEFAULT_QUEUE = 32  # Trabajos en espera como máximo; los siguientes se rechazan con 503
+DEFAULT_CACHE = 64  # Trabajos terminados que se conservan (y sirven de caché)
+DEFAULT_TIMEOUT = 30  # Segundos por petición HTTP
+MAX_UPLOAD_BYTES = 64 * 1024 * 1024
+POLL_INTERVAL = 0.2  # Segundos entre consultas del estado de un trabajo
+
+# Opciones de un trabajo y sus valores por defecto (las mismas que la planificación por lotes)
+JOB_OPTIONS = {
+    'operarios': 1,
+    'weeks': 4,
+    'start_date': None,
+    'holidays': [],
+    'assignment': "round_robin",
+    'location_order': "alphabetical",
+    'improve': 0,
+    'resequence': False,
+    'stats': False,
+}
+
+# Partes que se pueden descargar de un trabajo terminado, con su tipo de contenido
+RESULT_PARTS = {
+    'informe': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'plan': "application/json",
+    'cambios': "text/csv; charset=utf-8",
+}
+
+
+class PlanningServiceError(RuntimeError):
+    """Error devuelto por el servicio de planificación; status es el código HTTP (0 si no hay conexión)."""
+
+    def __init__(self, message, status=0):
+        super().__init__(message)
+        self.status = status
+
+
+def normalize_options(options):
+    """Completa las opciones de un trabajo con los valores por defecto y las valida.
+
+    Lanza ValueError si hay opciones desconocidas o valores no válidos.
+    """
+    options = dict(options or {})
+    unknown = set(options) - set(JOB_OPTIONS)
+    if unknown:
+        raise ValueError(f"Opciones desconocidas: {', '.join(sorted(unknown))}")
+    options = {**JOB_OPTIONS, **options}
+
+    if not isinstance(options['operarios'], int) or not 1 <= options['operarios'] <= 20:
+        raise ValueError("operarios debe ser un entero entre 1 y 20")
+    if not isinstance(options['weeks'], int) or not 1 <= options['weeks'] <= 52:
+        raise ValueError("weeks debe ser un entero entre 1 y 52")
+    if options['start_date'] is not None:
+        try:
+            datetime.strptime(options['start_date'], "%Y-%m-%d")
+        except (TypeError, ValueError):
+            raise ValueError("start_date debe ser una fecha AAAA-MM-DD") from None
+    if not isinstance(options['holidays'], list):
+        raise ValueError("holidays debe ser una lista de fechas AAAA-MM-DD")
+    try:
+        holidays = {datetime.strptime(day, "%Y-%m-%d") for day in options['holidays']}
+    except (TypeError, ValueError):
+        raise ValueError("holidays debe ser una lista de fechas AAAA-MM-DD") from None
+    # Ordenados y sin repetir, para que la clave de la caché no dependa del orden
+    options['holidays'] = [day.strftime("%Y-%m-%d") for day in sorted(holidays)]
+    if options['assignment'] not in ASSIGNMENT_MODES:
+        raise ValueError(f"assignment debe ser uno de {', '.join(ASSIGNMENT_MODES)}")
+    if options['location_order'] not in LOCATION_ORDERS:
+        raise ValueError(f"location_order debe ser uno de {', '.join(LOCATION_ORDERS)}")
+    if not isinstance(options['improve'], (int, float)) or not 0 <= options['improve'] <= 600:
+        raise ValueError("improve debe ser un número de segundos entre 0 y 600")
+    options['resequence'] = bool(options['resequence'])
+    options['stats'] = bool(options['stats'])
+    return options
+
+
+def job_key(file_bytes, file_name, options, previous_plan=None):
+    """Hash de la entrada de un trabajo: contenido y extensión del archivo, opciones y plan anterior."""
+    digest = hashlib.sha256()
+    digest.update(file_bytes)
+    digest.update(os.path.splitext(file_name)[1].lower().encode())
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    if previous_plan is not None:
+        digest.update(previous_plan)
+    return digest.hexdigest()
+
+
+def init_worker():
+    """Inicializa un proceso de trabajo: importa el planificador y carga la matriz de tiempos."""
+    import route_planner
+    route_planner.get_travel_matrix()
+
+
+def run_job(file_bytes, file_name, options, previous_plan=None):
+    """Planifica un archivo en un proceso de trabajo; devuelve el resumen y los archivos generados.
+
+    Reutiliza plan_file de la planificación por lotes sobre un directorio
+    temporal. Devuelve {'resumen': ..., 'informe': bytes, 'plan': bytes,
+    'cambios': bytes o None}; si la planificación falla, lanza RuntimeError
+    con el error del resumen.
+    """
+    import route_planner_cli
+
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "tareas" + os.path.splitext(file_name)[1].lower())
+        with open(path, 'wb') as f:
+            f.write(file_bytes)
+        warm_start = None
+        if previous_plan is not None:
+            warm_start = os.path.join(directory, "plan_anterior.json")
+            with open(warm_start, 'wb') as f:
+                f.write(previous_plan)
+
+        output_dir = os.path.join(directory, "salida")
+        os.makedirs(output_dir)
+        summary = route_planner_cli.plan_file(path, output_dir, {
+            **options,
+            'start_date': (datetime.strptime(options['start_date'], "%Y-%m-%d")
+                           if options['start_date'] else None),
+            'holidays': [datetime.strptime(day, "%Y-%m-%d") for day in options['holidays']],
+            'warm_start': warm_start,
+            'save_plan': True,
+            'routing_url': None,
+            'routing_cache': None,
+        })
+        if summary['estado'] != 'ok':
+            raise RuntimeError(summary['error'])
+
+        files = {}
+        for part, key in (('informe', 'informe'), ('plan', 'plan_guardado'), ('cambios', 'informe_cambios')):
+            files[part] = None
+            path = summary.pop(key, None)
+            if path:
+                with open(path, 'rb') as f:
+                    files[part] = f.read()
+    summary['archivo'] = file_name
+    return {'resumen': summary, **files}
+
+
+class PlanningJob:
+    """Un trabajo del servicio: su entrada, su estado y, al terminar, su resultado.
+
+    state pasa por 'en_cola', 'en_curso' y 'terminado' o 'error'.
+    """
+
+    def __init__(self, key, file_bytes, file_name, options, previous_plan=None):
+        """Crea un trabajo en cola con un id nuevo."""
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.input = (file_bytes, file_name, options, previous_plan)
+        self.file_name = file_name
+        self.state = 'en_cola'
+        self.error = None
+        self.result = None
+        self.submitted = time.time()
+        self.started = None
+        self.finished = None
+        self.done = threading.Event()
+
+    @property
+    def finished_ok(self):
+        """Indica si el trabajo ha terminado sin errores."""
+        return self.state == 'terminado'
+
+    def to_dict(self):
+        """Estado del trabajo serializable a JSON (con el resumen si ya ha terminado)."""
+        data = {
+            'id': self.id,
+            'archivo': self.file_name,
+            'estado': self.state,
+            'error': self.error,
+            'tiempos': {
+                'cola': round((self.started or time.time()) - self.submitted, 3),
+                'planificar': round((self.finished or time.time()) - self.started, 3) if self.started else None,
+            },
+        }
+        if self.finished_ok:
+            data['resumen'] = self.result['resumen']
+            data['descargas'] = [part for part in RESULT_PARTS if self.result.get(part) is not None]
+        return data
+
+
+class PlanningService:
+    """Cola de trabajos de planificación atendida por un conjunto acotado de procesos.
+
+    Hay tantos hilos despachadores como procesos: cada uno saca un trabajo de
+    la cola (como mucho max_queue en espera), lo ejecuta en el ProcessPoolExecutor
+    y guarda el resultado. Los trabajos terminados se conservan por su hash de
+    entrada (como mucho cache_size, se descartan los más antiguos): un trabajo
+    idéntico a uno terminado o en marcha devuelve ese mismo trabajo.
+    """
+
+    def __init__(self, workers=DEFAULT_WORKERS, max_queue=DEFAULT_QUEUE, cache_size=DEFAULT_CACHE):
+        """Arranca los procesos de trabajo y los hilos despachadores."""
+        self.workers = workers
+        self.cache_size = cache_size
+        self.executor = ProcessPoolExecutor(max_workers=workers, initializer=init_worker)
+        self.queue = queue.Queue(maxsize=max_queue)
+        self.lock = threading.Lock()
+        self.jobs = {}  # id -> PlanningJob
+        self.by_key = {}  # hash de la entrada -> id del trabajo en marcha o terminado sin errores
+        self.finished = OrderedDict()  # ids de los trabajos terminados, del más antiguo al más reciente
+        self.hits = 0
+        self.misses = 0
+        self.running = 0
+        self.completed = 0
+        self.dispatchers = [threading.Thread(target=self.dispatch, daemon=True) for _ in range(workers)]
+        for dispatcher in self.dispatchers:
+            dispatcher.start()
+
+    def submit(self, file_bytes, file_name, options=None, previous_plan=None):
+        """Pone en cola un trabajo; devuelve (trabajo, si venía de la caché).
+
+        Lanza ValueError si las opciones no son válidas y queue.Full si la cola
+        está llena.
+        """
+        options = normalize_options(options)
+        key = job_key(file_bytes, file_name, options, previous_plan)
+        with self.lock:
+            job = self.jobs.get(self.by_key.get(key))
+            if job is not None:
+                self.hits += 1
+                if job.id in self.finished:
+                    self.finished.move_to_end(job.id)
+                return job, True
+
+            job = PlanningJob(key, file_bytes, file_name, options, previous_plan)
+            self.queue.put_nowait(job)
+            self.misses += 1
+            self.jobs[job.id] = job
+            self.by_key[key] = job.id
+        return job, False
+
+    def dispatch(self):
+        """Bucle de un hilo despachador: ejecuta los trabajos de la cola en los procesos."""
+        while True:
+            job = self.queue.get()
+            if job is None:
+                return
+            with self.lock:
+                job.state = 'en_curso'
+                job.started = time.time()
+                self.running += 1
+            result, error = None, None
+            try:
+                result = self.executor.submit(run_job, *job.input).result()
+            except RuntimeError as e:
+                # Error de la planificación, ya con su tipo (ver run_job)
+                error = str(e)
+            except Exception as e:
+                error = f"{type(e).__name__}: {e}"
+            self.complete(job, result, error)
+
+    def complete(self, job, result, error):
+        """Guarda el resultado de un trabajo y descarta los más antiguos si se supera cache_size."""
+        with self.lock:
+            job.result = result
+            job.error = error
+            job.state = 'error' if error else 'terminado'
+            job.finished = time.time()
+            job.input = None
+            self.running -= 1
+            self.completed += 1
+            if error and self.by_key.get(job.key) == job.id:
+                # Un trabajo fallido no se reutiliza: se puede volver a enviar
+                del self.by_key[job.key]
+            self.finished[job.id] = job.key
+            while len(self.finished) > self.cache_size:
+                old_id, old_key = self.finished.popitem(last=False)
+                del self.jobs[old_id]
+                if self.by_key.get(old_key) == old_id:
+                    del self.by_key[old_key]
+        job.done.set()
+
+    def job(self, job_id):
+        """Devuelve un trabajo por su id, o None si no existe (o ya se ha descartado)."""
+        with self.lock:
+            return self.jobs.get(job_id)
+
+    def status(self):
+        """Estado del servicio: procesos, trabajos en cola y en curso y aciertos de la caché."""
+        with self.lock:
+            return {
+                'procesos': self.workers,
+                'en_cola': self.queue.qsize(),
+                'en_curso': self.running,
+                'terminados': self.completed,
+                'conservados': len(self.finished),
+                'cache': {'aciertos': self.hits, 'fallos': self.misses},
+            }
+
+    def close(self):
+        """Para los despachadores (tras terminar los trabajos en cola) y los procesos."""
+        for _ in self.dispatchers:
+            self.queue.put(None)
+        for dispatcher in self.dispatchers:
+            dispatcher.join()
+        self.executor.shutdown()
+
+
+class PlanningServer:
+    """Servidor HTTP/JSON del servicio de planificación.
+
+    Se arranca en segundo plano con start(), que devuelve su URL, y se para con
+    stop(), que también cierra el servicio.
+    """
+
+    def __init__(self, host="127.0.0.1", port=DEFAULT_PORT, service=None):
+        """Prepara el servidor; con port=0 se elige un puerto libre."""
+        self.service = service if service is not None else PlanningService()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Conexiones persistentes
+
+            def do_GET(self):
+                server.respond(self, *server.get(self.path))
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                if length > MAX_UPLOAD_BYTES:
+                    server.respond(self, 413, {'error': f"El archivo supera {MAX_UPLOAD_BYTES} bytes"})
+                    self.close_connection = True
+                    return
+                server.respond(self, *server.post(self.path, self.rfile.read(length)))
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = None
+
+    @property
+    def url(self):
+        """URL base del servidor."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def respond(self, handler, status, data, content_type="application/json", headers=None):
+        """Envía una respuesta; data son bytes o un objeto que se serializa como JSON."""
+        body = data if isinstance(data, bytes) else json.dumps(data, ensure_ascii=False).encode('utf-8')
+        handler.send_response(status)
+        handler.send_header("Content-Type", content_type)
+        handler.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            handler.send_header(name, value)
+        handler.end_headers()
+        handler.wfile.write(body)
+
+    def post(self, path, body):
+        """Atiende POST /trabajos: pone en cola un trabajo."""
+        if urlsplit(path).path.rstrip("/") != "/trabajos":
+            return 404, {'error': f"Ruta desconocida: {path}"}
+        try:
+            request = json.loads(body)
+            file_bytes = base64.b64decode(request['archivo'], validate=True)
+            file_name = str(request.get('nombre') or "tareas.xlsx")
+            previous_plan = (base64.b64decode(request['plan_anterior'], validate=True)
+                             if request.get('plan_anterior') else None)
+            job, cached = self.service.submit(file_bytes, file_name, request.get('opciones'), previous_plan)
+        except queue.Full:
+            return (503, {'error': "La cola de trabajos está llena; vuelva a intentarlo"}, "application/json",
+                    {"Retry-After": "1"})
+        except (ValueError, KeyError, TypeError, AttributeError) as e:
+            return 400, {'error': f"Petición no válida: {e}"}
+        return (200 if job.done.is_set() else 202), {**job.to_dict(), 'cache': cached}
+
+    def get(self, path):
+        """Atiende GET /estado, /trabajos/ID y /trabajos/ID/PARTE."""
+        parts = urlsplit(path).path.strip("/").split("/")
+        if parts == ["estado"]:
+            return 200, self.service.status()
+        if len(parts) not in (2, 3) or parts[0] != "trabajos":
+            return 404, {'error': f"Ruta desconocida: {path}"}
+        job = self.service.job(parts[1])
+        if job is None:
+            return 404, {'error': f"No existe el trabajo {parts[1]}"}
+        if len(parts) == 2:
+            return 200, job.to_dict()
+
+        part = parts[2]
+        if part not in RESULT_PARTS:
+            return 404, {'error': f"Parte desconocida: {part}"}
+        if not job.finished_ok:
+            return 409, {'error': f"El trabajo no ha terminado correctamente (estado: {job.state})"}
+        if job.result.get(part) is None:
+            return 404, {'error': f"El trabajo no tiene {part}"}
+        return 200, job.result[part], RESULT_PARTS[part]
+
+    def start(self):
+        """Arranca el servidor en un hilo y devuelve su URL."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        """Para el servidor y el servicio."""
+        self.server.shutdown()
+        self.server.server_close()
+        self.service.close()
+
+
+class PlanningClient:
+    """Cliente del servicio de planificación, para la aplicación y los lotes.
+
+    Cada llamada abre una conexión HTTP nueva, así que un mismo cliente se
+    puede usar desde varios hilos.
+    """
+
+    def __init__(self, base_url, timeout=DEFAULT_TIMEOUT):
+        """Prepara el cliente para el servicio de base_url (por ejemplo http://127.0.0.1:8600)."""
+        url = urlsplit(base_url)
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path.rstrip("/")
+        self.timeout = timeout
+
+    def request(self, method, path, data=None):
+        """Hace una petición y devuelve el cuerpo; lanza PlanningServiceError si falla."""
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        connection = connection_class(self.host, self.port, timeout=self.timeout)
+        body = json.dumps(data).encode('utf-8') if data is not None else None
+        try:
+            connection.request(method, self.path + path, body=body,
+                               headers={"Content-Type": "application/json"} if body is not None else {})
+            response = connection.getresponse()
+            content = response.read()
+        except (OSError, http.client.HTTPException) as e:
+            raise PlanningServiceError(f"No se puede conectar con el servicio de planificación: {e}") from e
+        finally:
+            connection.close()
+
+        if response.status not in (200, 202):
+            try:
+                message = json.loads(content)['error']
+            except (ValueError, KeyError, TypeError):
+                message = content[:200].decode('utf-8', 'replace')
+            raise PlanningServiceError(f"El servicio de planificación ha respondido {response.status}: {message}",
+                                       response.status)
+        return content
+
+    def submit(self, file_bytes, file_name, options=None, previous_plan=None):
+        """Envía un archivo de tareas; devuelve el estado del trabajo (con su id y si venía de la caché)."""
+        data = {
+            'nombre': file_name,
+            'archivo': base64.b64encode(file_bytes).decode('ascii'),
+            'opciones': options or {},
+        }
+        if previous_plan is not None:
+            data['plan_anterior'] = base64.b64encode(previous_plan).decode('ascii')
+        return json.loads(self.request("POST", "/trabajos", data))
+
+    def job(self, job_id):
+        """Devuelve el estado de un trabajo."""
+        return json.loads(self.request("GET", f"/trabajos/{job_id}"))
+
+    def wait(self, job_id, timeout=None, poll=POLL_INTERVAL):
+        """Espera a que un trabajo termine y devuelve su estado final.
+
+        Lanza PlanningServiceError si el trabajo termina con error y
+        TimeoutError si no termina en timeout segundos.
+        """
+        deadline = time.monotonic() + timeout if timeout is not None else math.inf
+        while True:
+            job = self.job(job_id)
+            if job['estado'] == 'terminado':
+                return job
+            if job['estado'] == 'error':
+                raise PlanningServiceError(job['error'])
+            if time.monotonic() > deadline:
+                raise TimeoutError(f"El trabajo {job_id} no ha terminado en {timeout} s")
+            time.sleep(poll)
+
+    def download(self, job_id, part):
+        """Descarga una parte ('informe', 'plan' o 'cambios') de un trabajo terminado."""
+        return self.request("GET", f"/trabajos/{job_id}/{part}")
+
+    def status(self):
+        """Devuelve el estado del servicio."""
+        return json.loads(self.request("GET", "/estado"))
+
+
+def percentile(values, fraction):
+    """Percentil por rango más cercano de una lista de valores."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def load_test(url, payloads, clients, requests_per_client, options=None, timeout=None):
+    """Lanza clients clientes a la vez contra el servicio, cada uno con requests_per_client trabajos.
+
+    Cada cliente envía los archivos de payloads (lista de (nombre, bytes)) por
+    turnos y espera a que terminen. Devuelve el rendimiento (trabajos por
+    segundo), la latencia de cada trabajo, desde que se envía hasta que se
+    sabe que ha terminado, y cuántos envíos ha rechazado el servicio por tener
+    la cola llena (rechazos; el cliente espera y vuelve a enviarlos).
+    """
+    client = PlanningClient(url)
+    latencies = []
+    cached = 0
+    rejected = 0
+    errors = []
+    lock = threading.Lock()
+
+    def run_client(index):
+        nonlocal cached, rejected
+        for i in range(requests_per_client):
+            name, content = payloads[(index * requests_per_client + i) % len(payloads)]
+            start = time.perf_counter()
+            try:
+                while True:
+                    try:
+                        job = client.submit(content, name, options)
+                        break
+                    except PlanningServiceError as e:
+                        if e.status != 503:
+                            raise
+                        with lock:
+                            rejected += 1
+                        time.sleep(POLL_INTERVAL)
+                client.wait(job['id'], timeout=timeout)
+            except (PlanningServiceError, TimeoutError) as e:
+                with lock:
+                    errors.append(str(e))
+                continue
+            with lock:
+                latencies.append(time.perf_counter() - start)
+                cached += job['cache']
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=run_client, args=(index,)) for index in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    return {
+        'clientes': clients,
+        'trabajos': len(latencies),
+        'errores': len(errors),
+        'de_cache': cached,
+        'rechazos': rejected,
+        'segundos': round(elapsed, 3),
+        'trabajos_por_segundo': round(len(latencies) / elapsed, 3) if elapsed else None,
+        'latencia': {
+            'media': round(sum(latencies) / len(latencies), 3),
+            'p50': round(percentile(latencies, 0.50), 3),
+            'p95': round(percentile(latencies, 0.95), 3),
+            'max': round(max(latencies), 3),
+        } if latencies else None,
+        'servicio': client.status(),
+        'primeros_errores': errors[:3],
+    }
+
+
+def synthetic_payloads(count, rows, seed=0):
+    """Genera count archivos CSV sintéticos distintos de rows filas con benchmarks.py."""
+    import benchmarks
+
+    payloads = []
+    for i in range(count):
+        df = benchmarks.generate_synthetic_tasks(rows, seed=seed + i)
+        payloads.append((f"sintetico_{i}.csv", df.to_csv(header=False, index=False).encode('utf-8')))
+    return payloads
+
+
+def main(argv=None):
+    """Punto de entrada: arranca el servicio o lanza la prueba de carga."""
+    parser = argparse.ArgumentParser(description="Servicio local de planificación por HTTP/JSON.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    serve_parser = subparsers.add_parser("serve", help="arranca el servicio")
+    serve_parser.add_argument("--host", default="127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="procesos de planificación")
+    serve_parser.add_argument("--queue", type=int, default=DEFAULT_QUEUE, help="trabajos en espera como máximo")
+    serve_parser.add_argument("--cache", type=int, default=DEFAULT_CACHE, help="trabajos terminados que se conservan")
+
+    load_parser = subparsers.add_parser("loadtest", help="mide rendimiento y latencia con varios clientes a la vez")
+    load_parser.add_argument("--url", default=None,
+                             help="URL del servicio; por defecto se arranca uno local con --workers procesos")
+    load_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS,
+                             help="procesos del servicio local")
+    load_parser.add_argument("--clients", type=int, default=4, help="clientes concurrentes")
+    load_parser.add_argument("--requests", type=int, default=5, help="trabajos por cliente")
+    load_parser.add_argument("--files", nargs="*", default=None,
+                             help="archivos de tareas a enviar; por defecto, CSV sintéticos")
+    load_parser.add_argument("--distinct", type=int, default=None,
+                             help="archivos sintéticos distintos "
+                                  "(por defecto, uno por trabajo: sin aciertos de caché)")
+    load_parser.add_argument("--rows", type=int, default=500, help="filas de cada archivo sintético")
+    load_parser.add_argument("-n", "--operarios", type=int, default=2, help="operarios de cada trabajo")
+    load_parser.add_argument("-o", "--output", default=None, help="fichero JSON de resultados")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = PlanningServer(args.host, args.port, PlanningService(args.workers, args.queue, args.cache))
+        print(f"Servicio de planificación en {server.url} ({args.workers} procesos)")
+        try:
+            server.server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server.server_close()
+            server.service.close()
+        return 0
+
+    if args.files:
+        payloads = []
+        for path in args.files:
+            with open(path, 'rb') as f:
+                payloads.append((os.path.basename(path), f.read()))
+    else:
+        payloads = synthetic_payloads(args.distinct or args.clients * args.requests, args.rows)
+
+    server = None
+    url = args.url
+    if url is None:
+        server = PlanningServer(port=0, service=PlanningService(args.workers, max(DEFAULT_QUEUE, args.clients)))
+        url = server.start()
+    try:
+        result = load_test(url, payloads, args.clients, args.requests, {'operarios': args.operarios})
+    finally:
+        if server is not None:
+            server.stop()
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    latency = result['latencia'] or {}
+    print(f"{result['trabajos']} trabajos ({result['de_cache']} de la caché, {result['rechazos']} rechazos, "
+          f"{result['errores']} errores) "
+          f"con {result['clientes']} clientes en {result['segundos']:.1f} s: "
+          f"{result['trabajos_por_segundo']} trabajos/s, latencia p50 {latency.get('p50')} s, "
+          f"p95 {latency.get('p95')} s")
+    return 1 if result['errores'] else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,2990 @@
+import pandas as pd
+import numpy as np
+import re
+import os
+import json
+import hashlib
+import time
+import random
+import contextlib
+import threading
+import atexit
+import weakref
+import heapq
+from bisect import bisect_left, bisect_right, insort
+from functools import lru_cache
+from itertools import zip_longest
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime, timedelta
+import io
+
+from planner_options import ASSIGNMENT_MODES, LOCATION_ORDERS
+
+# Constantes globales
+ORIGIN_LOCATION = "Vic"  # Ubicación de la empresa
+WORK_HOURS = 8  # Horas por jornada
+WORK_DAYS = ["Lunes", "Martes", "Miércoles", "Jueves"]  # Días laborables
+MAX_WEEKS = 4  # Máximo número de semanas para planificar
+LUNCH_DURATION = 30  # Minutos para comer
+EXACT_SEQUENCING_MAX_STOPS = 12  # Poblaciones por día hasta las que resequence_days usa el método exacto
+
+# Pesos del objetivo para comparar planificaciones
+UNASSIGNED_PENALTY = 480  # Minutos equivalentes por tarea sin asignar (una jornada)
+IMBALANCE_WEIGHT = 1  # Peso de la diferencia de carga entre operarios
+ANYTIME_ROUND_SECONDS = 2.0  # Segundos de búsqueda local por ronda de AnytimePlanner
+ANYTIME_POLL_SECONDS = 0.5  # Cada cuánto comprueba el hilo de AnytimePlanner si debe detenerse
+START_HOUR = 8  # Hora de inicio de la jornada
+START_MINUTE = 0  # Minuto de inicio de la jornada
+DAY_START = START_HOUR * 60 + START_MINUTE  # Inicio de la jornada en minutos desde medianoche
+LUNCH_START = 13 * 60  # Hora de comer en minutos desde medianoche
+MINUTES_PER_DAY = 24 * 60  # Fin de la franja horaria de las tareas sin restricción de horario
+
+# Tiempos de desplazamiento
+COORDINATES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "poblaciones.csv")
+SAME_LOCATION_TRAVEL_TIME = 5  # Minutos entre ubicaciones de la misma población
+DEFAULT_TRAVEL_TIME = 30  # Minutos si no se conocen las coordenadas
+ROAD_FACTOR = 1.3  # Relación entre distancia por carretera y distancia en línea recta
+AVERAGE_SPEED_KMH = 50  # Velocidad media en carretera comarcal
+
+# Reglas de duración de las tareas
+DURATION_RULES_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "duraciones.json")
+DURATION_CACHE_SIZE = 4096  # Textos de observaciones distintos que se recuerdan
+DEFAULT_DURATION_RULES = {
+    'legios': {'patron': r'(\d+)\s*legio', 'palabra': 'legio', 'sin_numero': 1},
+    'bandas': [
+        {'desde': 1, 'hasta': 1, 'minutos': 45},  # 45 minutos
+        {'desde': 2, 'hasta': 3, 'minutos': 60},  # 1 hora
+        {'desde': 4, 'hasta': 5, 'minutos': 90},  # 1.5 horas
+        {'desde': 6, 'hasta': 7, 'minutos': 120},  # 2 horas
+        {'desde': 8, 'hasta': 9, 'minutos': 150},  # 2.5 horas
+        {'desde': 10, 'hasta': 11, 'minutos': 180},  # 3 horas
+    ],
+    'extras': [
+        {'palabras': ['revisió', 'revisio'], 'minutos': 45},  # +45 minutos si incluye revisión
+    ],
+}
+
+# Columnas del Excel usadas para construir las tareas (B-G y L)
+TASK_COLUMNS = {
+    'mantenimiento': 1,
+    'cod_cliente': 2,
+    'nombre_cliente': 3,
+    'direccion': 4,
+    'alias': 5,
+    'poblacion': 6,
+    'observaciones': 11,
+}
+
+# Columnas de códigos (mantenimiento y cliente), que identifican la tarea entre meses
+TASK_CODE_COLUMNS = ('mantenimiento', 'cod_cliente')
+# Un código numérico que se ha leído como decimal ("10079.0")
+DECIMAL_CODE_PATTERN = re.compile(r'^(-?\d+)\.0*$')
+
+# Columnas opcionales con la franja horaria en que se puede visitar al cliente (M y N)
+TASK_WINDOW_COLUMNS = {
+    'window_start': 12,
+    'window_end': 13,
+}
+# Formatos de entrada de tareas (misma disposición de columnas que el Excel) y filas por bloque
+TASK_FILE_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".parquet")
+TASK_CHUNK_ROWS = 50_000
+
+HOUR_PATTERN = re.compile(r'^\s*(\d{1,2})(?:\s*[:.h]\s*(\d{2})(?::\d{2})?)?\s*h?\s*$',
+                          re.IGNORECASE)  # "9", "9:30", "09:30:00", "9h"
+
+
+class DurationRules:
+    """Reglas para calcular la duración de una tarea a partir de sus observaciones.
+    
+    La duración base sale del número de legios (muestras de legionela): el patrón
+    se compila una vez y la banda se busca con bisect en una tabla ordenada de
+    rangos [desde, hasta] sin solapes. Los extras suman minutos si el texto
+    contiene alguna de sus palabras. Los resultados se memorizan por texto
+    normalizado en una caché LRU de tamaño cache_size.
+    """
+    
+    def __init__(self, rules, cache_size=DURATION_CACHE_SIZE):
+        """Prepara las reglas a partir de un diccionario con el formato de duraciones.json."""
+        legios = rules['legios']
+        self.pattern = re.compile(legios['patron'])
+        self.keyword = legios['palabra']
+        self.keyword_count = legios.get('sin_numero', 1)
+        
+        bands = sorted((band['desde'], band['hasta'], band['minutos']) for band in rules['bandas'])
+        for (_, previous_end, _), (start, end, _) in zip(bands, bands[1:]):
+            if start <= previous_end:
+                raise ValueError(f"Bandas de duración solapadas: {previous_end} y {start}")
+        self.band_starts = [start for start, _, _ in bands]
+        self.band_ends = [end for _, end, _ in bands]
+        self.band_minutes = [minutes for _, _, minutes in bands]
+        self.extras = [(tuple(extra['palabras']), extra['minutos']) for extra in rules.get('extras', [])]
+        
+        self.duration_of = lru_cache(maxsize=cache_size)(self.compute_duration)
+    
+    @staticmethod
+    def normalize(observaciones):
+        """Normaliza el texto de observaciones: minúsculas y espacios simples."""
+        return " ".join(observaciones.lower().split())
+    
+    def duration(self, observaciones):
+        """Devuelve la duración (minutos) de unas observaciones, usando la caché."""
+        return self.duration_of(self.normalize(observaciones))
+    
+    def compute_duration(self, descripcion):
+        """Calcula la duración de un texto ya normalizado, sin caché."""
+        # Contar legios
+        legio_match = self.pattern.search(descripcion)
+        if legio_match:
+            num_legios = int(legio_match.group(1))
+        elif self.keyword in descripcion:
+            num_legios = self.keyword_count
+        else:
+            num_legios = 0
+        
+        # Banda que contiene el número de legios (0 si no hay ninguna)
+        duracion = 0
+        i = bisect_right(self.band_starts, num_legios) - 1
+        if i >= 0 and num_legios <= self.band_ends[i]:
+            duracion = self.band_minutes[i]
+        
+        for words, minutes in self.extras:
+            if any(word in descripcion for word in words):
+                duracion += minutes
+        
+        return duracion
+    
+    @classmethod
+    def from_file(cls, path, cache_size=DURATION_CACHE_SIZE):
+        """Carga las reglas de un fichero JSON con el formato de duraciones.json."""
+        with open(path, encoding='utf-8') as f:
+            return cls(json.load(f), cache_size)
+
+
+# Reglas de duración activas (se cargan la primera vez que se necesitan)
+_duration_rules = None
+
+
+def set_duration_rules(duration_rules):
+    """Fija las reglas de duración a usar (None para volver a cargar DURATION_RULES_FILE)."""
+    global _duration_rules
+    _duration_rules = duration_rules
+
+
+def get_duration_rules():
+    """Devuelve las reglas de duración activas, cargándolas de DURATION_RULES_FILE si existe."""
+    global _duration_rules
+    if _duration_rules is None:
+        rules = DurationRules(DEFAULT_DURATION_RULES)
+        if os.path.exists(DURATION_RULES_FILE):
+            try:
+                rules = DurationRules.from_file(DURATION_RULES_FILE)
+            except Exception as e:
+                print(f"Error al cargar las reglas de duración: {e}")
+        _duration_rules = rules
+    return _duration_rules
+
+
+def parse_hour(value):
+    """Convierte una hora del Excel en minutos desde medianoche; None si está vacía o no se entiende.
+    
+    Acepta horas de Excel (datetime/time o fracción de día), números de horas
+    (9 o 9.5) y textos como "9", "9:30", "09.30", "09:30:00" o "9h".
+    """
+    if value is None or pd.isna(value):
+        return None
+    if hasattr(value, 'hour') and hasattr(value, 'minute'):
+        return value.hour * 60 + value.minute
+    if isinstance(value, (int, float, np.integer, np.floating)) and not isinstance(value, bool):
+        value = float(value)
+        if 0 <= value < 1:
+            return round(value * MINUTES_PER_DAY)  # Fracción de día de Excel
+        if 1 <= value <= 24:
+            return round(value * 60)
+        return None
+    match = HOUR_PATTERN.match(str(value))
+    if match:
+        hours, minutes = int(match.group(1)), int(match.group(2) or 0)
+        if hours <= 24 and minutes < 60:
+            return min(hours * 60 + minutes, MINUTES_PER_DAY)
+    return None
+
+
+def parse_time_window(start, end):
+    """Devuelve la franja (inicio, fin) en minutos; el día entero si falta o no es válida."""
+    window_start = parse_hour(start)
+    window_end = parse_hour(end)
+    if window_start is None:
+        window_start = 0
+    if window_end is None:
+        window_end = MINUTES_PER_DAY
+    if window_start >= window_end:
+        return 0, MINUTES_PER_DAY
+    return window_start, window_end
+
+
+class Task:
+    """Clase para representar una tarea con todos sus atributos.
+    
+    Las tareas se comparten entre los días de ruta sin copiarse: los datos de
+    cada visita (hora de inicio y tiempo de viaje) los guarda el RouteDayWeek.
+    La franja horaria (window_start, window_end, en minutos desde medianoche)
+    limita cuándo puede hacerse la visita; por defecto es el día entero.
+    """
+    
+    __slots__ = ('mantenimiento', 'cod_cliente', 'nombre_cliente', 'direccion',
+                 'alias', 'poblacion', 'observaciones', 'duracion', 'assigned',
+                 'window_start', 'window_end')
+    
+    def __init__(self, row=None):
+        """Inicializa una tarea a partir de una fila del Excel."""
+        if row is not None:
+            # Mapeo de las columnas del Excel
+            self.mantenimiento = normalize_code(row.iloc[1]) if not pd.isna(row.iloc[1]) else ""
+            self.cod_cliente = normalize_code(row.iloc[2]) if not pd.isna(row.iloc[2]) else ""
+            self.nombre_cliente = str(row.iloc[3]) if not pd.isna(row.iloc[3]) else ""
+            self.direccion = str(row.iloc[4]) if not pd.isna(row.iloc[4]) else ""
+            self.alias = str(row.iloc[5]) if not pd.isna(row.iloc[5]) else ""
+            self.poblacion = str(row.iloc[6]) if not pd.isna(row.iloc[6]) else ""
+            self.observaciones = str(row.iloc[11]) if not pd.isna(row.iloc[11]) else ""
+            self.window_start, self.window_end = parse_time_window(
+                row.iloc[12] if len(row) > 12 else None, row.iloc[13] if len(row) > 13 else None,
+            )
+        else:
+            self.mantenimiento = ""
+            self.cod_cliente = ""
+            self.nombre_cliente = ""
+            self.direccion = ""
+            self.alias = ""
+            self.poblacion = ""
+            self.observaciones = ""
+            self.window_start, self.window_end = 0, MINUTES_PER_DAY
+        
+        # Variables para la planificación
+        self.duracion = self.calcular_duracion() if hasattr(self, 'observaciones') else 0
+        self.assigned = False  # Flag para saber si la tarea ya ha sido asignada
+        
+    def calcular_duracion(self):
+        """Calcula la duración de la tarea basada en la descripción (ver DurationRules)."""
+        return get_duration_rules().duration(self.observaciones)
+    
+    @classmethod
+    def from_values(cls, mantenimiento, cod_cliente, nombre_cliente, direccion,
+                    alias, poblacion, observaciones, duracion, window_start=0, window_end=MINUTES_PER_DAY):
+        """Crea una tarea a partir de valores ya normalizados, sin recalcular la duración."""
+        task = cls.__new__(cls)
+        task.mantenimiento = mantenimiento
+        task.cod_cliente = cod_cliente
+        task.nombre_cliente = nombre_cliente
+        task.direccion = direccion
+        task.alias = alias
+        task.poblacion = poblacion
+        task.observaciones = observaciones
+        task.duracion = duracion
+        task.assigned = False
+        task.window_start = window_start
+        task.window_end = window_end
+        return task
+    
+    def has_window(self):
+        """Indica si la tarea tiene una franja horaria más estrecha que el día entero."""
+        return self.window_start > 0 or self.window_end < MINUTES_PER_DAY
+    
+    def fits_window(self, start_minute):
+        """Indica si una visita que empieza en start_minute cabe en la franja horaria."""
+        return self.window_start <= start_minute and start_minute + self.duracion <= self.window_end
+    
+    def is_valid(self):
+        """Verifica si la tarea tiene datos válidos."""
+        return bool(self.nombre_cliente and self.poblacion)
+    
+    def __str__(self):
+        """Representación en texto de la tarea."""
+        return f"{self.nombre_cliente} - {self.poblacion} - {self.observaciones} ({self.duracion} min)"
+
+
+def includes_lunch_break(last_end, start):
+    """Indica si entre el final de una visita y el inicio de la siguiente se come.
+    
+    Ambos valores son minutos desde medianoche: se come si la visita anterior
+    termina antes de LUNCH_START y la siguiente empezaría después.
+    """
+    return last_end < LUNCH_START < start
+
+
+def next_start_minute(last_end, travel_time, window_start=0):
+    """Calcula el inicio de una visita tras otra (o tras la salida, con last_end=DAY_START).
+    
+    La visita empieza al llegar o, si llega antes, al abrirse su franja horaria
+    (window_start). Si entre last_end y ese inicio se pasa por LUNCH_START, la
+    pausa para comer se hace durante la espera cuando cabe en ella; si no, la
+    llegada se retrasa LUNCH_DURATION.
+    """
+    arrival = last_end + travel_time
+    start = max(arrival, window_start)
+    if includes_lunch_break(last_end, start):
+        start = max(arrival + LUNCH_DURATION, window_start)
+    return start
+
+
+def lunch_minute(last_end, start):
+    """Minuto en que empieza la pausa para comer entre last_end y una visita que empieza en start.
+    
+    Es LUNCH_START si la pausa cabe entera antes de la visita; si no (porque la
+    visita empieza al abrirse su franja horaria), la pausa termina justo al
+    empezar la visita. Con la regla de next_start_minute nunca se solapa con
+    el viaje ni con la visita anterior.
+    """
+    return min(LUNCH_START, start - LUNCH_DURATION)
+
+
+def work_minutes(last_end, start, duration):
+    """Minutos de jornada de una visita: viaje, espera a la franja y duración, sin la pausa para comer."""
+    lunch = LUNCH_DURATION if includes_lunch_break(last_end, start) else 0
+    return start - last_end - lunch + duration
+
+
+def minutes_to_datetime(minutes, date):
+    """Convierte minutos desde medianoche en un datetime del día indicado."""
+    return datetime(date.year, date.month, date.day) + timedelta(minutes=minutes)
+
+
+def format_hour(minutes):
+    """Formatea minutos desde medianoche como HH:MM."""
+    return f"{minutes // 60:02d}:{minutes % 60:02d}"
+
+
+class Visit:
+    """Visita planificada: una tarea con su hora de inicio y su tiempo de viaje.
+    
+    Expone también los atributos de la tarea (nombre_cliente, poblacion, ...).
+    La hora se guarda en minutos desde medianoche (start_minute); start_time
+    la devuelve como datetime del día de la ruta.
+    """
+    
+    __slots__ = ('task', 'start_minute', 'travel_time', 'date')
+    
+    def __init__(self, task, start_minute, travel_time, date):
+        """Inicializa la visita a una tarea."""
+        self.task = task
+        self.start_minute = start_minute
+        self.travel_time = travel_time
+        self.date = date
+    
+    @property
+    def start_time(self):
+        """Hora de inicio de la visita como datetime."""
+        return minutes_to_datetime(self.start_minute, self.date)
+    
+    @property
+    def end_minute(self):
+        """Minuto del día en que termina la visita."""
+        return self.start_minute + self.task.duracion
+    
+    def __getattr__(self, name):
+        """Delega en la tarea los atributos que no son de la visita."""
+        return getattr(self.task, name)
+    
+    def __str__(self):
+        """Representación en texto de la visita."""
+        return str(self.task)
+
+
+class RouteDayWeek:
+    """Clase para representar un día de ruta de un operario en una semana específica."""
+    
+    def __init__(self, day_name, week_number, date=None):
+        """Inicializa un día de ruta con su semana y su fecha.
+        
+        Sin fecha, se usa la semana correspondiente a partir del primer lunes del mes actual.
+        """
+        self.day_name = day_name
+        self.week_number = week_number  # 1, 2, 3, ...
+        self.visit_tasks = []  # Tareas visitadas, en orden (sin copiar)
+        self.start_times = []  # Inicio de cada visita (minutos desde medianoche)
+        self.travel_times = []  # Minutos de viaje hasta cada visita
+        self.total_time = 0
+        self.start_location = ORIGIN_LOCATION
+        self.end_location = ORIGIN_LOCATION
+        self.return_travel_time = 0
+        self.slack = None  # Holgura hacia delante de cada visita (se calcula al pedirla)
+        
+        # Calcular la fecha real basada en la semana
+        if date is None:
+            day_offset = WORK_DAYS.index(day_name)
+            week_offset = (week_number - 1) * 7
+            date = first_monday_of_month(datetime.now()) + timedelta(days=day_offset + week_offset)
+        self.date = date
+        
+        # Formatear la fecha
+        self.date_str = self.date.strftime("%d/%m/%Y")
+    
+    @property
+    def tasks(self):
+        """Visitas del día, con los atributos de la tarea más start_time y travel_time."""
+        return [
+            Visit(task, start_minute, travel_time, self.date)
+            for task, start_minute, travel_time in zip(self.visit_tasks, self.start_times, self.travel_times)
+        ]
+    
+    def add_task(self, task, travel_time):
+        """Añade una tarea al día y actualiza los tiempos."""
+        # Calcular la hora de inicio de la tarea (esperando a su franja horaria si llega antes)
+        last_end = self.last_end_minute()
+        start_minute = next_start_minute(last_end, travel_time, task.window_start)
+        
+        # Guardar la visita
+        self.visit_tasks.append(task)
+        self.start_times.append(start_minute)
+        self.travel_times.append(travel_time)
+        
+        # Actualizar tiempos (la espera a la franja también es jornada) y ubicación
+        self.total_time += work_minutes(last_end, start_minute, task.duracion)
+        self.end_location = task.poblacion
+        self.slack = None
+        
+        return Visit(task, start_minute, travel_time, self.date)
+    
+    def finalize_day(self):
+        """Finaliza el día añadiendo el tiempo de viaje de regreso."""
+        if self.visit_tasks:
+            # Añadir tiempo de viaje de regreso a Vic
+            return_travel = estimate_travel_time(self.end_location, ORIGIN_LOCATION)
+            self.return_travel_time = return_travel
+            self.total_time += return_travel
+            return True
+        return False
+    
+    def rebuild(self, tasks):
+        """Vuelve a planificar el día con las tareas dadas, en ese orden."""
+        self.visit_tasks = []
+        self.start_times = []
+        self.travel_times = []
+        self.total_time = 0
+        self.end_location = ORIGIN_LOCATION
+        self.return_travel_time = 0
+        self.slack = None
+        for task in tasks:
+            self.add_task(task, estimate_travel_time(self.end_location, task.poblacion))
+        self.finalize_day()
+    
+    def cheapest_insertion(self, task):
+        """Devuelve (minutos de viaje añadidos, posición) de la inserción más barata que cabe.
+        
+        Trabaja sobre el día ya finalizado. La capacidad se comprueba como en
+        has_capacity_for, sin contar el viaje de vuelta; el coste sí lo incluye.
+        Las franjas horarias se comprueban con insertion_feasible. Si el día o la
+        tarea tienen franja, las esperas pueden cambiar con la inserción, así que
+        la capacidad se comprueba simulando el día entero. Devuelve None si la
+        tarea no cabe en ninguna posición.
+        """
+        locations = [ORIGIN_LOCATION] + [visit_task.poblacion for visit_task in self.visit_tasks]
+        edges = self.travel_times + [self.return_travel_time]  # viaje que entra en cada hueco
+        last = len(locations) - 1
+        available = ((WORK_HOURS * 60) - LUNCH_DURATION - (self.total_time - self.return_travel_time)
+                     - task.duracion)
+        # Insertar nunca ahorra más que el tramo que sustituye: si ni así cabe, no hace falta probar
+        if available + max(edges) < 0:
+            return None
+        capacity = (WORK_HOURS * 60) - LUNCH_DURATION
+        with_windows = task.has_window() or any(visit_task.has_window() for visit_task in self.visit_tasks)
+        best = None
+        for position, origin in enumerate(locations):
+            travel_in = estimate_travel_time(origin, task.poblacion)
+            destination = locations[position + 1] if position < last else ORIGIN_LOCATION
+            delta = travel_in + estimate_travel_time(task.poblacion, destination) - edges[position]
+            # Al final del día, el viaje de vuelta no cuenta para la capacidad
+            added_work = delta if position < last else travel_in
+            if added_work > available or (best is not None and delta >= best[0]):
+                continue
+            travel_out = estimate_travel_time(task.poblacion, destination) if position < last else None
+            if not self.insertion_feasible(task, position, travel_in, travel_out):
+                continue
+            if with_windows:
+                tasks = list(self.visit_tasks)
+                tasks.insert(position, task)
+                work = self.simulate_schedule(tasks)
+                if work is None or work > capacity:
+                    continue
+            best = (delta, position)
+        return best
+    
+    def insert_task(self, task, position):
+        """Inserta una tarea en la posición dada y recalcula solo este día."""
+        tasks = list(self.visit_tasks)
+        tasks.insert(position, task)
+        self.rebuild(tasks)
+    
+    def last_end_minute(self):
+        """Minuto en que termina la última visita del día (DAY_START si aún no hay ninguna)."""
+        if not self.visit_tasks:
+            return DAY_START
+        return self.start_times[-1] + self.visit_tasks[-1].duracion
+    
+    def calculate_start_minute(self, travel_time, window_start=0):
+        """Calcula la hora de inicio (minutos desde medianoche) para una tarea añadida al final."""
+        return next_start_minute(self.last_end_minute(), travel_time, window_start)
+    
+    def timeline(self):
+        """Devuelve la jornada como eventos (tipo, minuto, visita) en orden.
+        
+        Los tipos son 'sortida' (salida de Vic), 'visita', 'dinar' (pausa para
+        comer, con la misma regla que calculate_start_minute y en el minuto de
+        lunch_minute) y 'tornada' (salida de la última visita de vuelta a Vic).
+        """
+        if not self.visit_tasks:
+            return []
+        
+        events = [('sortida', DAY_START, None)]
+        last_end = DAY_START
+        for visit in self.tasks:
+            if includes_lunch_break(last_end, visit.start_minute):
+                events.append(('dinar', lunch_minute(last_end, visit.start_minute), None))
+            events.append(('visita', visit.start_minute, visit))
+            last_end = visit.end_minute
+        events.append(('tornada', last_end, None))
+        return events
+    
+    def fits_window(self, task, travel_time):
+        """Indica si la tarea, añadida al final del día, empieza y acaba dentro de su franja horaria."""
+        if not task.has_window():
+            return True
+        return task.fits_window(self.calculate_start_minute(travel_time, task.window_start))
+    
+    def forward_slack(self):
+        """Devuelve cuántos minutos puede retrasarse cada visita sin sacar de su franja a ninguna posterior.
+        
+        La holgura de una visita es el mínimo entre su propio margen (fin de la
+        franja menos duración menos inicio) y la holgura de la siguiente más la
+        espera antes de esta. Se calcula en O(n) una vez por versión del día.
+        """
+        if self.slack is None:
+            size = len(self.visit_tasks)
+            slack = [0] * size
+            following = MINUTES_PER_DAY  # Sin límite después de la última visita
+            for j in range(size - 1, -1, -1):
+                task = self.visit_tasks[j]
+                start_minute = self.start_times[j]
+                slack[j] = min(task.window_end - task.duracion - start_minute, following)
+                last_end = self.start_times[j - 1] + self.visit_tasks[j - 1].duracion if j > 0 else DAY_START
+                arrival = next_start_minute(last_end, self.travel_times[j])
+                following = slack[j] + start_minute - arrival
+            self.slack = slack
+        return self.slack
+    
+    def insertion_feasible(self, task, position, travel_in, travel_out):
+        """Indica si insertar la tarea en la posición dada respeta todas las franjas horarias.
+        
+        travel_in es el viaje desde la visita anterior (o desde Vic) y travel_out
+        el viaje hasta la visita que pasa a ser la siguiente (None al final). Con
+        las holguras de forward_slack la comprobación es O(1): basta con que el
+        retraso que sufre la siguiente visita no supere su holgura. Si la pausa
+        para comer aún puede cambiar de sitio detrás de la inserción (la visita
+        anterior acaba antes de LUNCH_START), el retraso real puede variar en
+        LUNCH_DURATION en cada sentido; solo si la holgura cae en ese margen se
+        simula el resto del día.
+        """
+        if position == 0:
+            last_end = DAY_START
+        else:
+            last_end = self.start_times[position - 1] + self.visit_tasks[position - 1].duracion
+        start_minute = next_start_minute(last_end, travel_in, task.window_start)
+        if start_minute + task.duracion > task.window_end:
+            return False
+        if position == len(self.visit_tasks):
+            return True
+        
+        slack = self.forward_slack()
+        next_task = self.visit_tasks[position]
+        next_start = next_start_minute(start_minute + task.duracion, travel_out, next_task.window_start)
+        delay = next_start - self.start_times[position]
+        
+        # Después de LUNCH_START ya no puede añadirse ni moverse la pausa para comer
+        if last_end >= LUNCH_START:
+            return delay <= slack[position]
+        if delay + LUNCH_DURATION <= slack[position]:
+            return True
+        if delay - LUNCH_DURATION > slack[position]:
+            return False
+        return self.schedule_fits_windows(
+            self.visit_tasks[:position] + [task] + self.visit_tasks[position:]
+        )
+    
+    def schedule_fits_windows(self, tasks):
+        """Simula el día con las tareas dadas, en ese orden, y comprueba sus franjas horarias."""
+        return self.simulate_schedule(tasks) is not None
+    
+    def simulate_schedule(self, tasks):
+        """Simula el día con las tareas dadas, en ese orden.
+        
+        Devuelve los minutos de jornada sin la vuelta a Vic (como los cuenta
+        has_capacity_for, con las esperas a las franjas) o None si alguna visita
+        queda fuera de su franja horaria.
+        """
+        last_end = DAY_START
+        origin = ORIGIN_LOCATION
+        work = 0
+        for task in tasks:
+            travel_time = estimate_travel_time(origin, task.poblacion)
+            start_minute = next_start_minute(last_end, travel_time, task.window_start)
+            if not task.fits_window(start_minute):
+                return None
+            work += work_minutes(last_end, start_minute, task.duracion)
+            last_end = start_minute + task.duracion
+            origin = task.poblacion
+        return work
+    
+    def fits_windows(self):
+        """Indica si todas las visitas del día están dentro de su franja horaria."""
+        return all(task.fits_window(start_minute)
+                   for task, start_minute in zip(self.visit_tasks, self.start_times))
+    
+    def has_capacity_for(self, task_duration, travel_time, window_start=0):
+        """Verifica si hay capacidad para añadir una tarea más al final del día.
+        
+        Con window_start se cuenta también la espera hasta que se abre la franja
+        horaria de la tarea, de modo que la última visita nunca acaba después
+        de DAY_START + WORK_HOURS.
+        """
+        last_end = self.last_end_minute()
+        start = next_start_minute(last_end, travel_time, window_start)
+        new_total_time = self.total_time + work_minutes(last_end, start, task_duration)
+        return new_total_time <= (WORK_HOURS * 60) - LUNCH_DURATION
+    
+    def get_full_day_name(self):
+        """Devuelve el nombre completo del día incluyendo la semana."""
+        return f"{self.day_name} (Semana {self.week_number} - {self.date_str})"
+
+
+def first_monday_of_month(date):
+    """Devuelve el primer lunes del mes de la fecha indicada."""
+    first_day_of_month = datetime(date.year, date.month, 1)
+    # 0 = Lunes
+    return first_day_of_month + timedelta(days=(7 - first_day_of_month.weekday()) % 7)
+
+
+class PlanningCalendar:
+    """Calendario de un plan: fechas y días laborables de cada semana del horizonte.
+    
+    Se calcula una vez por plan y lo comparten todos los operarios. La semana 1
+    es la que contiene start_date (por defecto, el primer lunes del mes actual);
+    los días anteriores a start_date y los festivos no son laborables.
+    """
+    
+    def __init__(self, start_date=None, num_weeks=MAX_WEEKS, holidays=()):
+        """Calcula las fechas de los días de trabajo de num_weeks semanas."""
+        if start_date is None:
+            start_date = first_monday_of_month(datetime.now())
+        self.start_date = datetime(start_date.year, start_date.month, start_date.day)
+        self.num_weeks = num_weeks
+        self.holidays = {datetime(day.year, day.month, day.day) for day in holidays}
+        
+        week_start = self.start_date - timedelta(days=self.start_date.weekday())
+        self.dates = {}  # (semana, día) -> fecha
+        self.working_days = []  # (semana, día) laborables, en orden de fecha
+        for week in range(1, num_weeks + 1):
+            for day_offset, day_name in enumerate(WORK_DAYS):
+                date = week_start + timedelta(days=(week - 1) * 7 + day_offset)
+                self.dates[(week, day_name)] = date
+                if date >= self.start_date and date not in self.holidays:
+                    self.working_days.append((week, day_name))
+    
+    def date_of(self, week_number, day_name):
+        """Devuelve la fecha de un día de una semana del plan."""
+        return self.dates[(week_number, day_name)]
+    
+    def day_order(self, week_number, day_name):
+        """Clave para ordenar los días de ruta por fecha."""
+        return (week_number, WORK_DAYS.index(day_name))
+
+
+class Operario:
+    """Clase para representar un operario con sus rutas asignadas en múltiples semanas.
+    
+    Los días de ruta se crean la primera vez que se piden con get_route_day.
+    """
+    
+    def __init__(self, operario_id, calendar=None):
+        """Inicializa un operario con ID y el calendario del plan."""
+        self.operario_id = operario_id
+        self.calendar = calendar if calendar is not None else PlanningCalendar()
+        self.route_days = {}  # (semana, día) -> RouteDayWeek
+    
+    def get_route_day(self, day_name, week_number):
+        """Obtiene un día de ruta específico en una semana específica."""
+        key = (week_number, day_name)
+        route_day = self.route_days.get(key)
+        if route_day is None:
+            route_day = RouteDayWeek(day_name, week_number, self.calendar.date_of(week_number, day_name))
+            self.route_days[key] = route_day
+        return route_day
+    
+    def active_days(self):
+        """Devuelve los días de ruta con tareas, en orden de fecha."""
+        return sorted(
+            (route_day for route_day in self.route_days.values() if route_day.visit_tasks),
+            key=lambda route_day: self.calendar.day_order(route_day.week_number, route_day.day_name),
+        )
+    
+    @property
+    def weeks(self):
+        """Días de ruta ya creados, agrupados por semana: {semana: {día: RouteDayWeek}}.
+        
+        Es una vista parcial: están todas las semanas del calendario, pero solo
+        los días que ya se han pedido con get_route_day (no todos los días
+        laborables). Para recorrer el calendario completo, usar
+        calendar.working_days con get_route_day.
+        """
+        weeks = {week: {} for week in range(1, self.calendar.num_weeks + 1)}
+        for week, day_name in sorted(self.route_days, key=lambda key: self.calendar.day_order(*key)):
+            weeks[week][day_name] = self.route_days[(week, day_name)]
+        return weeks
+
+
+class TravelTimeMatrix:
+    """Matriz precalculada de tiempos de viaje entre poblaciones."""
+    
+    EARTH_RADIUS_KM = 6371.0
+    
+    def __init__(self, names, latitudes, longitudes, matrix=None):
+        """Inicializa la matriz a partir de las coordenadas de cada población."""
+        self.names = list(names)
+        self.ids = {normalize_location(name): i for i, name in enumerate(self.names)}
+        self.latitudes = np.asarray(latitudes, dtype=float)
+        self.longitudes = np.asarray(longitudes, dtype=float)
+        self.matrix = matrix if matrix is not None else self.compute_matrix()
+    
+    def compute_matrix(self):
+        """Calcula la matriz NxN de tiempos de viaje (minutos) con la fórmula de haversine."""
+        lat = np.radians(self.latitudes)
+        lon = np.radians(self.longitudes)
+        dlat = lat[:, None] - lat[None, :]
+        dlon = lon[:, None] - lon[None, :]
+        a = np.sin(dlat / 2) ** 2 + np.cos(lat[:, None]) * np.cos(lat[None, :]) * np.sin(dlon / 2) ** 2
+        distance_km = 2 * self.EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0, 1)))
+        
+        # Tiempo de conducción por carretera, nunca menos que dentro de la misma población
+        minutes = np.ceil(distance_km * ROAD_FACTOR / AVERAGE_SPEED_KMH * 60)
+        minutes = np.maximum(minutes, SAME_LOCATION_TRAVEL_TIME).astype(np.int64)
+        np.fill_diagonal(minutes, SAME_LOCATION_TRAVEL_TIME)
+        return minutes
+    
+    def location_id(self, name):
+        """Devuelve el identificador entero de una población, o None si no se conoce."""
+        return self.ids.get(normalize_location(name))
+    
+    def travel_time(self, origin, destination):
+        """Devuelve el tiempo de viaje en minutos, o None si alguna población no se conoce."""
+        origin_id = self.ids.get(normalize_location(origin))
+        destination_id = self.ids.get(normalize_location(destination))
+        if origin_id is None or destination_id is None:
+            return None
+        return self.matrix.item(origin_id, destination_id)
+    
+    @classmethod
+    def from_file(cls, path, cache_dir=None):
+        """Carga las coordenadas de un CSV o JSON y reutiliza la matriz cacheada si existe.
+        
+        El CSV necesita las columnas poblacion, lat y lon. El JSON puede ser una lista de
+        objetos con esas claves o un diccionario {poblacion: {"lat": ..., "lon": ...}}.
+        """
+        with open(path, 'rb') as f:
+            content = f.read()
+        
+        if path.lower().endswith('.json'):
+            data = json.loads(content.decode('utf-8'))
+            if isinstance(data, dict):
+                data = [{'poblacion': name, **coords} for name, coords in data.items()]
+            coordinates = pd.DataFrame(data)
+        else:
+            coordinates = pd.read_csv(io.BytesIO(content))
+        
+        names = coordinates['poblacion'].astype(str).tolist()
+        latitudes = coordinates['lat'].to_numpy(dtype=float)
+        longitudes = coordinates['lon'].to_numpy(dtype=float)
+        
+        # La caché depende del fichero de coordenadas y de los parámetros del modelo
+        if cache_dir is None:
+            cache_dir = os.path.join(os.path.dirname(os.path.abspath(path)), ".travel_cache")
+        key = hashlib.sha256(content)
+        key.update(f"{ROAD_FACTOR}|{AVERAGE_SPEED_KMH}|{SAME_LOCATION_TRAVEL_TIME}".encode())
+        cache_path = os.path.join(cache_dir, f"{key.hexdigest()}.npy")
+        
+        matrix = None
+        if os.path.exists(cache_path):
+            try:
+                matrix = np.load(cache_path)
+                if matrix.shape != (len(names), len(names)):
+                    matrix = None
+            except (OSError, ValueError):
+                matrix = None
+        
+        travel_matrix = cls(names, latitudes, longitudes, matrix)
+        
+        if matrix is None:
+            try:
+                os.makedirs(cache_dir, exist_ok=True)
+                np.save(cache_path, travel_matrix.matrix)
+            except OSError as e:
+                print(f"No se pudo guardar la caché de tiempos de viaje: {e}")
+        
+        return travel_matrix
+
+
+def normalize_location(name):
+    """Normaliza el nombre de una población para buscarla en la matriz."""
+    return " ".join(str(name).split()).lower()
+
+
+# Matriz de tiempos de viaje activa (se carga la primera vez que se necesita)
+_travel_matrix = None
+_travel_matrix_loaded = False
+
+
+def set_travel_matrix(travel_matrix):
+    """Fija la matriz de tiempos de viaje a usar (None para usar los tiempos por defecto)."""
+    global _travel_matrix, _travel_matrix_loaded
+    _travel_matrix = travel_matrix
+    _travel_matrix_loaded = True
+
+
+def get_travel_matrix():
+    """Devuelve la matriz de tiempos de viaje activa, cargándola de COORDINATES_FILE si hace falta."""
+    global _travel_matrix, _travel_matrix_loaded
+    if not _travel_matrix_loaded:
+        _travel_matrix_loaded = True
+        if os.path.exists(COORDINATES_FILE):
+            try:
+                _travel_matrix = TravelTimeMatrix.from_file(COORDINATES_FILE)
+            except Exception as e:
+                print(f"Error al cargar las coordenadas de las poblaciones: {e}")
+    return _travel_matrix
+
+
+def estimate_travel_time(origin, destination):
+    """Estima el tiempo de viaje entre dos ubicaciones."""
+    travel_matrix = _travel_matrix if _travel_matrix_loaded else get_travel_matrix()
+    if travel_matrix is not None:
+        travel_time = travel_matrix.travel_time(origin, destination)
+        if travel_time is not None:
+            return travel_time
+    
+    # Poblaciones sin coordenadas: estimación simplificada
+    if origin == destination:
+        return SAME_LOCATION_TRAVEL_TIME
+    return DEFAULT_TRAVEL_TIME
+
+
+def format_time(datetime_obj):
+    """Formatea un objeto datetime a string HH:MM."""
+    return datetime_obj.strftime("%H:%M")
+
+
+def format_minutes(minutes):
+    """Formatea minutos como horas y minutos en texto."""
+    hours = minutes // 60
+    mins = minutes % 60
+    if hours > 0:
+        return f"{hours}h {mins}min" if mins > 0 else f"{hours}h"
+    return f"{mins}min"
+
+
+def normalize_column(column):
+    """Convierte una columna del Excel a texto, con cadena vacía en las celdas vacías."""
+    values = column.astype(object).where(column.notna(), "")
+    return values.map(str)
+
+
+def normalize_code(value):
+    """Convierte un código de la hoja a texto, sin el ".0" de los números leídos como decimales.
+    
+    pandas lee como decimales las columnas numéricas con celdas vacías (en Excel,
+    CSV escritos desde pandas y Parquet), y openpyxl como enteros: así el código
+    es el mismo sea cual sea el formato del archivo.
+    """
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value)
+    match = DECIMAL_CODE_PATTERN.match(text)
+    return match.group(1) if match else text
+
+
+def normalize_code_column(column):
+    """Normaliza una columna de códigos ya convertida a texto (ver normalize_code)."""
+    return column.map(normalize_code)
+
+
+def calcular_duraciones(observaciones):
+    """Calcula la duración de todas las tareas a partir de la columna de observaciones.
+    
+    Aplica las mismas reglas que Task.calcular_duracion, pero una sola vez por
+    texto distinto: las hojas mensuales repiten mucho las mismas observaciones.
+    """
+    codes, uniques = pd.factorize(observaciones, sort=False)
+    rules = get_duration_rules()
+    duraciones = np.array([rules.duration(text) for text in uniques], dtype=np.int64)
+    return duraciones[codes].tolist()
+
+
+class PlanningStats:
+    """Tiempos por etapa y contadores de una planificación.
+    
+    Es opcional: las funciones que aceptan stats=None solo lo actualizan cuando
+    se les pasa uno. Los contadores del bucle de asignación se acumulan en
+    variables locales y se vuelcan una vez por tarea, así que sin estadísticas
+    el coste es prácticamente nulo.
+    """
+    
+    STAGES = ("lectura_excel", "lectura_tareas", "asignacion", "cierre", "informe")
+    
+    def __init__(self):
+        self.stages = {}  # etapa -> segundos
+        self.tasks = 0
+        self.probes = 0
+        self.max_probes = 0
+        self.probe_histogram = {}  # intentos -> número de tareas
+        self.capacity_rejections = 0
+        self.travel_lookups = 0
+        self.cursor_wraparounds = 0
+        self.unassigned = 0
+    
+    @contextlib.contextmanager
+    def stage(self, name):
+        """Mide el tiempo de un bloque y lo suma a la etapa indicada."""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_time(name, time.perf_counter() - start)
+    
+    def add_time(self, name, seconds):
+        """Suma segundos a una etapa."""
+        self.stages[name] = self.stages.get(name, 0.0) + seconds
+    
+    def record_task(self, probes, rejections, lookups, assigned):
+        """Registra los intentos de asignación de una tarea."""
+        self.tasks += 1
+        self.probes += probes
+        self.max_probes = max(self.max_probes, probes)
+        self.probe_histogram[probes] = self.probe_histogram.get(probes, 0) + 1
+        self.capacity_rejections += rejections
+        self.travel_lookups += lookups
+        if not assigned:
+            self.unassigned += 1
+    
+    def as_dict(self):
+        """Devuelve las estadísticas como diccionario serializable a JSON."""
+        return {
+            'etapas': {name: self.stages[name] for name in self.STAGES if name in self.stages},
+            'tareas': self.tasks,
+            'intentos': self.probes,
+            'intentos_por_tarea': self.probes / self.tasks if self.tasks else 0.0,
+            'max_intentos': self.max_probes,
+            'histograma_intentos': {str(probes): count for probes, count in sorted(self.probe_histogram.items())},
+            'rechazos_capacidad': self.capacity_rejections,
+            'consultas_viaje': self.travel_lookups,
+            'vueltas_cursor': self.cursor_wraparounds,
+            'sin_asignar': self.unassigned,
+        }
+
+
+def stage_timer(stats, name):
+    """Devuelve el medidor de la etapa, o un contexto vacío si no hay estadísticas."""
+    return stats.stage(name) if stats is not None else contextlib.nullcontext()
+
+
+def read_time_windows(df, valid):
+    """Lee las franjas horarias de las filas válidas; el día entero si faltan las columnas M-N.
+    
+    Cada valor distinto se interpreta una sola vez con parse_hour. Devuelve dos
+    listas (inicio y fin en minutos), con las mismas reglas que parse_time_window.
+    """
+    size = int(valid.sum())
+    bounds = []
+    for name, index in TASK_WINDOW_COLUMNS.items():
+        default = 0 if name == 'window_start' else MINUTES_PER_DAY
+        minutes = np.full(size, default, dtype=np.int64)
+        if df.shape[1] > index:
+            codes, uniques = pd.factorize(df.iloc[:, index][valid], sort=False)
+            parsed = [parse_hour(value) for value in uniques]
+            parsed = np.array([-1 if value is None else value for value in parsed] + [-1], dtype=np.int64)
+            values = parsed[codes]  # El código -1 (celda vacía) cae en el -1 final
+            known = values >= 0
+            minutes[known] = values[known]
+        bounds.append(minutes)
+    
+    window_starts, window_ends = bounds
+    invalid = window_starts >= window_ends
+    window_starts[invalid] = 0
+    window_ends[invalid] = MINUTES_PER_DAY
+    return window_starts.tolist(), window_ends.tolist()
+
+
+def read_excel_data(df, stats=None):
+    """Lee el DataFrame y extrae las tareas.
+    
+    Trabaja por columnas: solo se leen las columnas B-G y L (y M-N, la franja
+    horaria, si existen), se normalizan (los códigos con normalize_code, igual
+    para todos los formatos) y validan enteras y la duración se calcula de una
+    sola pasada. Si se pasa un PlanningStats en stats, se mide la
+    etapa "lectura_tareas".
+    """
+    try:
+        with stage_timer(stats, "lectura_tareas"):
+            columns = {
+                name: normalize_column(df.iloc[:, index])
+                for name, index in TASK_COLUMNS.items()
+            }
+            for name in TASK_CODE_COLUMNS:
+                columns[name] = normalize_code_column(columns[name])
+            
+            # Una tarea es válida si tiene cliente y población
+            valid = (columns['nombre_cliente'] != "") & (columns['poblacion'] != "")
+            columns = {name: column[valid] for name, column in columns.items()}
+            duraciones = calcular_duraciones(columns['observaciones'])
+            window_starts, window_ends = read_time_windows(df, valid.to_numpy())
+            
+            # Construir las tareas en bloque
+            return [
+                Task.from_values(*values)
+                for values in zip(*(column.tolist() for column in columns.values()), duraciones,
+                                  window_starts, window_ends)
+            ]
+    
+    except Exception as e:
+        print(f"Error al procesar los datos del Excel: {e}")
+        return []
+
+
+def task_file_positions():
+    """Posiciones (empezando en 0) de las columnas que se leen: B-G, L y la franja M-N."""
+    return sorted({*TASK_COLUMNS.values(), *TASK_WINDOW_COLUMNS.values()})
+
+
+def positional_frame(rows, positions):
+    """Convierte filas leídas del Excel en un bloque para read_excel_data, con solo las columnas dadas.
+    
+    Los valores se guardan como objetos, tal como los devuelve openpyxl, para
+    que una columna de códigos con celdas vacías no pase a decimales.
+    """
+    columns = list(zip_longest(*rows))
+    frame = pd.DataFrame({
+        index: pd.Series(columns[index], dtype=object) for index in positions if index < len(columns)
+    })
+    return frame.reindex(columns=range(len(columns)))
+
+
+def iter_task_chunks(source, name=None, chunk_rows=TASK_CHUNK_ROWS):
+    """Lee un archivo de tareas por bloques de hasta chunk_rows filas.
+    
+    source es una ruta o un objeto de archivo; el formato se deduce de la
+    extensión de name (o de la ruta) entre TASK_FILE_EXTENSIONS. Solo se leen
+    las columnas de task_file_positions. Cada bloque es un DataFrame con las
+    columnas en su posición original, como el de pd.read_excel(header=None),
+    listo para read_excel_data. Los .xlsx se recorren fila a fila con openpyxl
+    en modo solo lectura, sin cargar el libro entero.
+    """
+    name = str(name if name is not None else getattr(source, 'name', source))
+    extension = os.path.splitext(name)[1].lower()
+    positions = task_file_positions()
+    
+    if extension in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+        
+        workbook = load_workbook(source, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(max_col=positions[-1] + 1, values_only=True)
+            chunk = []
+            for row in rows:
+                chunk.append(row)
+                if len(chunk) == chunk_rows:
+                    yield positional_frame(chunk, positions)
+                    chunk = []
+            if chunk:
+                yield positional_frame(chunk, positions)
+        finally:
+            workbook.close()
+    
+    elif extension == ".csv":
+        # Con chunksize, pandas no admite usecols como función: se mira antes cuántas columnas hay
+        width = pd.read_csv(source, header=None, dtype=str, nrows=1).shape[1]
+        if hasattr(source, 'seek'):
+            source.seek(0)
+        reader = pd.read_csv(source, header=None, dtype=str, chunksize=chunk_rows,
+                             usecols=[index for index in positions if index < width])
+        with reader:
+            for chunk in reader:
+                yield chunk.reindex(columns=range(chunk.columns.max() + 1))
+    
+    elif extension == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise ImportError("Para leer archivos Parquet hace falta instalar pyarrow") from e
+        
+        parquet_file = pq.ParquetFile(source)
+        names = parquet_file.schema_arrow.names
+        selected = [names[index] for index in positions if index < len(names)]
+        for batch in parquet_file.iter_batches(batch_size=chunk_rows, columns=selected):
+            chunk = batch.to_pandas(integer_object_nulls=True)
+            chunk.columns = [names.index(column) for column in chunk.columns]
+            yield chunk.reindex(columns=range(chunk.columns.max() + 1))
+    
+    elif extension == ".xls":
+        # El formato antiguo no admite lectura por filas: se lee entero, pero solo las columnas necesarias
+        df = pd.read_excel(source, header=None, usecols=lambda column: column in positions)
+        yield df.reindex(columns=range(df.columns.max() + 1))
+    
+    else:
+        raise ValueError(f"Formato de archivo de tareas no soportado: {extension or name} "
+                         f"(se admiten {', '.join(TASK_FILE_EXTENSIONS)})")
+
+
+def read_tasks_file(source, name=None, chunk_rows=TASK_CHUNK_ROWS, stats=None):
+    """Lee las tareas de un archivo Excel, CSV o Parquet por bloques (ver iter_task_chunks).
+    
+    Cada bloque pasa por read_excel_data y se descarta antes de leer el
+    siguiente, así que la memoria depende de chunk_rows y no del tamaño del
+    archivo. Con un PlanningStats en stats se miden las etapas "lectura_excel"
+    (lectura del archivo) y "lectura_tareas".
+    """
+    tasks = []
+    chunks = iter_task_chunks(source, name, chunk_rows)
+    while True:
+        with stage_timer(stats, "lectura_excel"):
+            chunk = next(chunks, None)
+        if chunk is None:
+            break
+        tasks.extend(read_excel_data(chunk, stats=stats))
+    return tasks
+
+
+class CapacityIndex:
+    """Índice de días de ruta por población final y capacidad restante.
+    
+    Para cada población en la que termina algún día se guarda una lista ordenada
+    de (capacidad restante, id del día), de modo que el día más ajustado que
+    admite una tarea se encuentra con una búsqueda binaria por población.
+    Los días vacíos son todos equivalentes, así que no se indexan: se abre el
+    siguiente hueco libre (por semana, día y operario) cuando hace falta.
+    
+    Asignar una tarea cuesta O(P·log n), con P las poblaciones en las que termina
+    algún día y n los días abiertos: se consulta cada población porque se
+    prefieren los días de la misma población y los de menor viaje, que un único
+    índice por capacidad no distingue. P está acotado por las poblaciones del
+    plan (unas decenas). Una tarea con franja horaria recorre además su cubo
+    desde el primer día con capacidad hasta el primero que respeta la franja, así
+    que en el peor caso cuesta O(n). Cada día consultado cuenta como un intento
+    en PlanningStats (probes), y benchmarks.py mide los intentos por tarea. Son
+    rechazos por capacidad las poblaciones sin ningún día con tiempo libre
+    suficiente y los días que respetan la franja pero no caben en la jornada;
+    los que solo incumplen la franja no cuentan.
+    """
+    
+    def __init__(self, operarios, calendar, stats=None):
+        """Prepara los huecos de todos los días laborables del calendario."""
+        self.stats = stats
+        self.capacity = (WORK_HOURS * 60) - LUNCH_DURATION
+        self.slots = [
+            (operario, week, day_name)
+            for week, day_name in calendar.working_days
+            for operario in operarios
+        ]
+        self.next_empty = 0
+        self.route_days = {}  # id del hueco -> RouteDayWeek
+        self.buckets = {}
+    
+    @classmethod
+    def for_insertion(cls, operarios, from_date=None):
+        """Índice de un plan ya generado para insert_tasks, con los días a partir de from_date.
+        
+        Los huecos siguen el orden de fecha y, a igualdad, de operario. Los días
+        con visitas se guardan en self.spare, ordenados por insertion_bound, y los
+        huecos sin visitas en self.empty_slots (un montículo por id de hueco).
+        """
+        calendar = operarios[0].calendar if operarios else PlanningCalendar()
+        index = cls(operarios, calendar)
+        index.spare = []
+        index.bounds = {}  # id del hueco -> clave en self.spare
+        index.empty_slots = []
+        for day_id, (operario, week, day_name) in enumerate(index.slots):
+            if from_date is not None and calendar.date_of(week, day_name) < from_date:
+                continue
+            route_day = operario.route_days.get((week, day_name))
+            if route_day is None or not route_day.visit_tasks:
+                index.empty_slots.append(day_id)
+                continue
+            index.route_days[day_id] = route_day
+            index.bounds[day_id] = index.insertion_bound(route_day)
+            index.spare.append((index.bounds[day_id], day_id))
+        index.spare.sort()
+        return index
+    
+    def insertion_bound(self, route_day):
+        """Cota de la duración de una tarea que aún podría insertarse en algún punto del día.
+        
+        Es la capacidad que le queda al día más el tramo de viaje más largo, que es
+        lo máximo que una inserción puede ahorrar (la misma cota que usa
+        cheapest_insertion para descartar el día).
+        """
+        edges = route_day.travel_times + [route_day.return_travel_time]
+        return self.capacity - (route_day.total_time - route_day.return_travel_time) + max(edges)
+    
+    def best_insertion(self, task):
+        """Devuelve (minutos de viaje añadidos, id del hueco, posición) de la inserción más barata, o None.
+        
+        Solo se prueban con cheapest_insertion los días cuya insertion_bound admite
+        la duración de la tarea (búsqueda binaria en self.spare) y el primer hueco
+        vacío; a igualdad de viaje gana el hueco más temprano. El coste por tarea
+        depende de los días con sitio para ella, no de todos los del plan.
+        """
+        best = None
+        for _, day_id in self.spare[bisect_left(self.spare, (task.duracion, -1)):]:
+            option = self.route_days[day_id].cheapest_insertion(task)
+            if option is not None and (best is None or (option[0], day_id) < best[:2]):
+                best = (option[0], day_id, option[1])
+        
+        if self.empty_slots:
+            # Un día vacío sale de Vic; el viaje de vuelta no cuenta para la capacidad
+            day_id = self.empty_slots[0]
+            travel_in = estimate_travel_time(ORIGIN_LOCATION, task.poblacion)
+            start_minute = next_start_minute(DAY_START, travel_in, task.window_start)
+            if (work_minutes(DAY_START, start_minute, task.duracion) <= self.capacity
+                    and task.fits_window(start_minute)):
+                cost = travel_in + estimate_travel_time(task.poblacion, ORIGIN_LOCATION)
+                if best is None or (cost, day_id) < best[:2]:
+                    best = (cost, day_id, 0)
+        return best
+    
+    def insert_at(self, task, day_id, position):
+        """Inserta la tarea en el día del hueco dado y actualiza su cota; devuelve el día."""
+        if day_id in self.bounds:
+            self.spare.pop(bisect_left(self.spare, (self.bounds[day_id], day_id)))
+            route_day = self.route_days[day_id]
+        else:
+            heapq.heappop(self.empty_slots)
+            operario, week, day_name = self.slots[day_id]
+            route_day = self.route_days[day_id] = operario.get_route_day(day_name, week)
+        route_day.insert_task(task, position)
+        task.assigned = True
+        self.bounds[day_id] = self.insertion_bound(route_day)
+        insort(self.spare, (self.bounds[day_id], day_id))
+        return route_day
+    
+    def insert(self, day_id):
+        """Inserta un día en el cubo de su población final."""
+        route_day = self.route_days[day_id]
+        bucket = self.buckets.setdefault(route_day.end_location, [])
+        insort(bucket, (self.capacity - route_day.total_time, day_id))
+    
+    def open_empty_day(self):
+        """Crea el día de ruta del siguiente hueco libre y devuelve su id."""
+        day_id = self.next_empty
+        self.next_empty += 1
+        operario, week, day_name = self.slots[day_id]
+        self.route_days[day_id] = operario.get_route_day(day_name, week)
+        return day_id
+    
+    def assign(self, task):
+        """Asigna la tarea al día factible más ajustado; devuelve False si no cabe en ninguno.
+        
+        Se prefieren los días que ya terminan en la población de la tarea, después
+        los de menor tiempo de viaje y, a igualdad, los que quedan más llenos.
+        """
+        best = None
+        probes = len(self.buckets)
+        lookups = len(self.buckets)
+        rejections = 0
+        for location, bucket in self.buckets.items():
+            travel_time = estimate_travel_time(location, task.poblacion)
+            needed = task.duracion + travel_time
+            k = bisect_left(bucket, (needed, -1))
+            if k == len(bucket):
+                # Ningún día de la población tiene tiempo libre suficiente
+                rejections += 1
+                continue
+            # Con franja horaria, el primer día que también la respeta y en el que
+            # cabe contando la espera hasta que se abre (needed es solo una cota inferior)
+            if task.has_window():
+                while k < len(bucket):
+                    route_day = self.route_days[bucket[k][1]]
+                    if route_day.fits_window(task, travel_time):
+                        if route_day.has_capacity_for(task.duracion, travel_time, task.window_start):
+                            last_end = route_day.last_end_minute()
+                            start_minute = next_start_minute(last_end, travel_time, task.window_start)
+                            needed = work_minutes(last_end, start_minute, task.duracion)
+                            break
+                        rejections += 1
+                    k += 1
+                    probes += 1
+                if k == len(bucket):
+                    continue
+            remaining, day_id = bucket[k]
+            key = (location != task.poblacion, travel_time, remaining - needed, day_id)
+            if best is None or key < best[0]:
+                best = (key, location, k, travel_time)
+        
+        # Siguiente día vacío, que sale de Vic con toda la capacidad libre
+        if self.next_empty < len(self.slots):
+            probes += 1
+            lookups += 1
+            travel_time = estimate_travel_time(ORIGIN_LOCATION, task.poblacion)
+            start_minute = next_start_minute(DAY_START, travel_time, task.window_start)
+            needed = work_minutes(DAY_START, start_minute, task.duracion)
+            if needed <= self.capacity and task.fits_window(start_minute):
+                key = (ORIGIN_LOCATION != task.poblacion, travel_time,
+                       self.capacity - needed, self.next_empty)
+                if best is None or key < best[0]:
+                    best = (key, None, None, travel_time)
+            elif needed > self.capacity:
+                rejections += 1
+        
+        # Cada población (y el día vacío) consulta un tiempo de viaje
+        if self.stats is not None:
+            self.stats.record_task(probes, rejections, lookups, best is not None)
+        
+        if best is None:
+            return False
+        
+        key, location, k, travel_time = best
+        if location is None:
+            day_id = self.open_empty_day()
+        else:
+            bucket = self.buckets[location]
+            day_id = bucket.pop(k)[1]
+            if not bucket:
+                del self.buckets[location]
+        
+        self.route_days[day_id].add_task(task, travel_time)
+        task.assigned = True
+        self.insert(day_id)
+        return True
+
+
+def sweep_clusters(duration_by_location, capacity=(WORK_HOURS * 60) - LUNCH_DURATION):
+    """Agrupa las poblaciones en zonas compactas barriendo por ángulo alrededor de Vic.
+    
+    Las poblaciones se ordenan por su ángulo visto desde ORIGIN_LOCATION (a igualdad,
+    de la más cercana a la más lejana), empezando justo después del mayor hueco
+    angular para no partir ninguna zona, y se cortan en grupos cuya duración total
+    de tareas no pasa de capacity. Una población que sola ya supera capacity forma
+    su propio grupo. Las poblaciones sin coordenadas van al final, por orden
+    alfabético y cada una en su grupo. Devuelve una lista de listas de poblaciones.
+    """
+    travel_matrix = get_travel_matrix()
+    origin_id = travel_matrix.location_id(ORIGIN_LOCATION) if travel_matrix is not None else None
+    if origin_id is None:
+        return [[location] for location in sorted(duration_by_location)]
+    
+    located = []
+    unknown = []
+    for location in sorted(duration_by_location):
+        location_id = travel_matrix.location_id(location)
+        if location_id is None:
+            unknown.append(location)
+        else:
+            located.append((location, location_id))
+    
+    clusters = []
+    if located:
+        ids = np.array([location_id for _, location_id in located])
+        lat0 = travel_matrix.latitudes[origin_id]
+        lon0 = travel_matrix.longitudes[origin_id]
+        dy = travel_matrix.latitudes[ids] - lat0
+        dx = (travel_matrix.longitudes[ids] - lon0) * np.cos(np.radians(lat0))
+        angles = np.arctan2(dy, dx)
+        distances = np.hypot(dx, dy)
+        
+        # Empezar el barrido después del mayor hueco entre ángulos consecutivos
+        sorted_angles = np.sort(angles)
+        gaps = np.diff(np.append(sorted_angles, sorted_angles[0] + 2 * np.pi))
+        start_angle = sorted_angles[(np.argmax(gaps) + 1) % len(sorted_angles)]
+        angles = np.mod(angles - start_angle, 2 * np.pi)
+        
+        cluster = []
+        cluster_duration = 0
+        for index in np.lexsort((distances, angles)):
+            location = located[index][0]
+            duration = duration_by_location[location]
+            if cluster and cluster_duration + duration > capacity:
+                clusters.append(cluster)
+                cluster = []
+                cluster_duration = 0
+            cluster.append(location)
+            cluster_duration += duration
+        clusters.append(cluster)
+    
+    return clusters + [[location] for location in unknown]
+
+
+def generate_routes(tasks, num_operarios, assignment="round_robin", rng=None, calendar=None,
+                    stats=None, location_order="alphabetical"):
+    """Genera rutas optimizadas para los operarios en múltiples semanas.
+    
+    Con assignment="round_robin" cada tarea prueba los días en rotación entre
+    operarios; con assignment="best_fit" se usa un CapacityIndex que elige el
+    día más ajustado, prefiriendo los que ya están en la misma población.
+    Si se pasa un random.Random en rng, el orden de las poblaciones se baraja y
+    las tareas de igual duración se desempatan al azar. El calendar
+    (PlanningCalendar) fija las fechas y el horizonte; por defecto, MAX_WEEKS
+    semanas desde el primer lunes del mes actual. Con un PlanningStats en stats
+    se miden las etapas "asignacion" y "cierre" y se cuentan los intentos por
+    tarea, los rechazos por capacidad, las consultas de tiempos de viaje y las
+    vueltas completas del cursor de días.
+    
+    Con location_order="sweep" las poblaciones se agrupan en zonas del tamaño
+    de una jornada (sweep_clusters) y se recorren zona a zona; en round_robin el
+    cursor solo pasa al siguiente día/operario al cambiar de zona, de modo que
+    cada jornada se llena con poblaciones cercanas.
+    """
+    if assignment not in ASSIGNMENT_MODES:
+        raise ValueError(f"Modo de asignación desconocido: {assignment}")
+    if location_order not in LOCATION_ORDERS:
+        raise ValueError(f"Orden de poblaciones desconocido: {location_order}")
+    
+    # Lista de operarios, con un calendario común
+    if calendar is None:
+        calendar = PlanningCalendar()
+    assignment_start = time.perf_counter()
+    operarios = [Operario(i+1, calendar) for i in range(num_operarios)]
+    capacity_index = CapacityIndex(operarios, calendar, stats) if assignment == "best_fit" else None
+    working_days = calendar.working_days
+    
+    # Agrupar tareas por población
+    tasks_by_location = {}
+    for task in tasks:
+        if task.poblacion not in tasks_by_location:
+            tasks_by_location[task.poblacion] = []
+        tasks_by_location[task.poblacion].append(task)
+    
+    # Ordenar poblaciones: alfabéticamente (cada una es su propia zona) o por zonas geográficas
+    if location_order == "sweep":
+        clusters = sweep_clusters({
+            location: sum(task.duracion for task in location_tasks)
+            for location, location_tasks in tasks_by_location.items()
+        })
+    else:
+        clusters = [[location] for location in sorted(tasks_by_location.keys())]
+    if rng is not None:
+        rng.shuffle(clusters)
+    advance_per_task = location_order != "sweep"
+    
+    # Variables para distribución (índice en los días laborables del calendario)
+    current_operario = 0
+    current_day = 0
+    wraparounds = 0
+    
+    # Para cada zona y cada población
+    for cluster in clusters:
+        for location in cluster:
+            location_tasks = tasks_by_location[location]
+            
+            # Ordenar tareas por duración (primero las más largas)
+            if rng is not None:
+                rng.shuffle(location_tasks)
+            location_tasks.sort(key=lambda x: x.duracion, reverse=True)
+            
+            # Asignar cada tarea
+            for task in location_tasks:
+                # Saltear tareas ya asignadas
+                if task.assigned:
+                    continue
+                
+                # Modo best_fit: el índice busca directamente el día más ajustado
+                if capacity_index is not None:
+                    if not capacity_index.assign(task):
+                        print(f"ADVERTENCIA: No se pudo asignar la tarea: {task}")
+                    continue
+                
+                # Intentar asignar la tarea
+                assigned = False
+                rejections = 0
+                
+                # Buscar un día, semana y operario que tenga espacio
+                for attempt in range(num_operarios * len(working_days)):
+                    op_index = current_operario % num_operarios
+                    week_num, day_name = working_days[current_day]
+                    
+                    # Obtener el día de ruta para esta semana
+                    route_day = operarios[op_index].get_route_day(day_name, week_num)
+                    
+                    # Estimar tiempo de viaje
+                    origin = route_day.end_location
+                    travel_time = estimate_travel_time(origin, task.poblacion)
+                    
+                    # Comprobar si cabe en la jornada y en su franja horaria
+                    has_capacity = route_day.has_capacity_for(task.duracion, travel_time, task.window_start)
+                    if has_capacity and route_day.fits_window(task, travel_time):
+                        # Asignar la tarea
+                        route_day.add_task(task, travel_time)
+                        task.assigned = True
+                        assigned = True
+                        break
+                    if not has_capacity:
+                        rejections += 1
+                    
+                    # Probar con el siguiente día/operario/semana
+                    current_operario = (current_operario + 1) % num_operarios
+                    if current_operario == 0:
+                        current_day = (current_day + 1) % len(working_days)
+                        if current_day == 0:
+                            wraparounds += 1
+                
+                if not assigned:
+                    print(f"ADVERTENCIA: No se pudo asignar la tarea: {task}")
+                
+                # Cada intento consulta un tiempo de viaje; solo los que no caben en la jornada
+                # son rechazos por capacidad (los que no respetan la franja, no)
+                if stats is not None:
+                    probes = attempt + 1 if assigned else num_operarios * len(working_days)
+                    stats.record_task(probes, rejections, probes, assigned)
+                
+                # Mover al siguiente operario para la próxima tarea
+                if advance_per_task:
+                    current_operario = (current_operario + 1) % num_operarios
+                    if current_operario == 0 and working_days:
+                        current_day = (current_day + 1) % len(working_days)
+                        if current_day == 0:
+                            wraparounds += 1
+        
+        # Con zonas, el cursor avanza una vez por zona
+        if not advance_per_task:
+            current_operario = (current_operario + 1) % num_operarios
+            if current_operario == 0 and working_days:
+                current_day = (current_day + 1) % len(working_days)
+                if current_day == 0:
+                    wraparounds += 1
+    
+    if stats is not None:
+        stats.cursor_wraparounds += wraparounds
+        stats.add_time("asignacion", time.perf_counter() - assignment_start)
+    
+    # Finalizar rutas (añadir viaje de vuelta)
+    with stage_timer(stats, "cierre"):
+        for operario in operarios:
+            for route_day in operario.route_days.values():
+                route_day.finalize_day()
+    
+    return operarios
+
+
+def plan_objective(tasks, operarios):
+    """Evalúa una planificación: viaje total, tareas sin asignar y desequilibrio de carga.
+    
+    Devuelve un diccionario con cada componente y el valor combinado 'objective'
+    (menor es mejor), con UNASSIGNED_PENALTY minutos por tarea sin asignar y la
+    diferencia de minutos entre el operario más y el menos cargado.
+    """
+    travel = total_travel_time(operarios)
+    unassigned = sum(1 for task in tasks if not task.assigned)
+    workloads = [
+        sum(route_day.total_time for route_day in operario.route_days.values())
+        for operario in operarios
+    ]
+    imbalance = max(workloads) - min(workloads) if workloads else 0
+    return {
+        'travel': travel,
+        'unassigned': unassigned,
+        'imbalance': imbalance,
+        'objective': travel + UNASSIGNED_PENALTY * unassigned + IMBALANCE_WEIGHT * imbalance,
+    }
+
+
+def task_records(tasks):
+    """Convierte las tareas en tuplas compactas y serializables para otros procesos."""
+    return [
+        (task.mantenimiento, task.cod_cliente, task.nombre_cliente, task.direccion,
+         task.alias, task.poblacion, task.observaciones, task.duracion,
+         task.window_start, task.window_end)
+        for task in tasks
+    ]
+
+
+def plan_layout(tasks, operarios):
+    """Describe un plan como índices en tasks por operario, semana y día."""
+    task_ids = {id(task): i for i, task in enumerate(tasks)}
+    return [
+        {
+            (route_day.week_number, route_day.day_name): [task_ids[id(task)] for task in route_day.visit_tasks]
+            for route_day in operario.active_days()
+        }
+        for operario in operarios
+    ]
+
+
+def build_plan(tasks, num_operarios, layout, calendar=None):
+    """Reconstruye los operarios de un plan descrito por plan_layout sobre las tareas dadas."""
+    for task in tasks:
+        task.assigned = False
+    
+    if calendar is None:
+        calendar = PlanningCalendar()
+    operarios = [Operario(i+1, calendar) for i in range(num_operarios)]
+    for operario, days in zip(operarios, layout):
+        for (week, day_name), task_ids in days.items():
+            day_tasks = [tasks[i] for i in task_ids]
+            operario.get_route_day(day_name, week).rebuild(day_tasks)
+            for task in day_tasks:
+                task.assigned = True
+    return operarios
+
+
+# Estado de cada proceso del modo multiarranque
+_multistart_state = {}
+
+
+def init_multistart_worker(records, num_operarios, assignment, travel_matrix, calendar,
+                           location_order="alphabetical"):
+    """Inicializa un proceso del modo multiarranque con las tareas compactas."""
+    set_travel_matrix(travel_matrix)
+    _multistart_state.update(
+        records=records, num_operarios=num_operarios, assignment=assignment, calendar=calendar,
+        location_order=location_order,
+    )
+
+
+def run_multistart(seed, start, deadline):
+    """Ejecuta un arranque de generate_routes y devuelve (objetivo, arranque, plan).
+    
+    El arranque 0 usa el orden original; el resto baraja el orden con una
+    semilla derivada de (seed, start), de modo que cada arranque es reproducible.
+    Devuelve None si hay límite de tiempo (deadline no es None) y el arranque
+    empieza después (salvo el arranque 0, que siempre se ejecuta para tener al
+    menos un plan).
+    """
+    if start > 0 and deadline is not None and time.time() >= deadline:
+        return None
+    
+    tasks = [Task.from_values(*record) for record in _multistart_state['records']]
+    rng = random.Random(f"{seed}-{start}") if start > 0 else None
+    num_operarios = _multistart_state['num_operarios']
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, num_operarios, _multistart_state['assignment'], rng,
+                                    _multistart_state['calendar'],
+                                    location_order=_multistart_state['location_order'])
+    
+    return plan_objective(tasks, operarios), start, plan_layout(tasks, operarios)
+
+
+def generate_routes_multistart(tasks, num_operarios, num_starts=32, seed=0, time_limit=None,
+                               assignment="round_robin", max_workers=None, calendar=None,
+                               location_order="alphabetical"):
+    """Ejecuta generate_routes con varios órdenes en paralelo y se queda con el mejor plan.
+    
+    Los arranques se reparten en un ProcessPoolExecutor que recibe las tareas como
+    tuplas compactas. Sin time_limit se ejecutan siempre los num_starts arranques
+    y, con la misma semilla, el resultado es reproducible. Con time_limit (en
+    segundos) se descartan los arranques que no han empezado a tiempo, así que
+    el resultado depende de la velocidad de la máquina; starts_completed indica
+    cuántos se han ejecutado. Devuelve los operarios del mejor plan y un
+    diccionario con su objetivo y estadísticas.
+    """
+    start_time = time.perf_counter()
+    deadline = time.time() + time_limit if time_limit is not None else None
+    records = task_records(tasks)
+    if calendar is None:
+        calendar = PlanningCalendar()
+    
+    results = []
+    with ProcessPoolExecutor(
+        max_workers=max_workers,
+        initializer=init_multistart_worker,
+        initargs=(records, num_operarios, assignment, get_travel_matrix(), calendar, location_order),
+    ) as executor:
+        futures = [executor.submit(run_multistart, seed, start, deadline) for start in range(num_starts)]
+        for future in futures:
+            result = future.result()
+            if result is not None:
+                results.append(result)
+    
+    # Mejor objetivo; a igualdad, el arranque de menor índice
+    objective, best_start, layout = min(results, key=lambda result: (result[0]['objective'], result[1]))
+    operarios = build_plan(tasks, num_operarios, layout, calendar)
+    
+    return operarios, {
+        **objective,
+        'best_start': best_start,
+        'starts_completed': len(results),
+        'elapsed_seconds': time.perf_counter() - start_time,
+    }
+
+
+def run_anytime_round(seed, start, improve_time):
+    """Ejecuta una ronda de AnytimePlanner y devuelve (objetivo, ronda, plan).
+    
+    Como run_multistart, pero el plan de cada arranque se mejora con
+    improve_routes durante improve_time segundos y se reordena con
+    resequence_days antes de evaluarlo.
+    """
+    tasks = [Task.from_values(*record) for record in _multistart_state['records']]
+    rng = random.Random(f"{seed}-{start}") if start > 0 else None
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, _multistart_state['num_operarios'], _multistart_state['assignment'],
+                                    rng, _multistart_state['calendar'],
+                                    location_order=_multistart_state['location_order'])
+        improve_routes(operarios, improve_time)
+        resequence_days(operarios)
+    
+    return plan_objective(tasks, operarios), start, plan_layout(tasks, operarios)
+
+
+class AnytimePlanner:
+    """Optimización continua en segundo plano a partir de un plan ya generado.
+    
+    Un hilo de control lanza rondas de run_anytime_round en un
+    ProcessPoolExecutor (la primera con el orden original y las siguientes con
+    órdenes barajados) y publica cada plan que mejora el objetivo de
+    plan_objective. La búsqueda se hace en otros procesos, así que no bloquea el
+    proceso que la lanza. progress() y best_plan() se pueden llamar en cualquier
+    momento desde otro hilo; stop() detiene la búsqueda conservando el mejor plan.
+    
+    La búsqueda también se detiene sola al pasar time_limit segundos, al
+    terminar max_rounds rondas o, con idle_timeout, si pasan esos segundos sin
+    que nadie llame a progress() (por ejemplo, porque la sesión que la lanzó ha
+    terminado). Las que sigan en marcha al salir del intérprete se detienen con
+    stop_anytime_planners. None en cualquiera de los límites lo desactiva.
+    """
+    
+    def __init__(self, tasks, operarios, assignment="round_robin", location_order="alphabetical", seed=0,
+                 round_time=ANYTIME_ROUND_SECONDS, max_workers=1, time_limit=None, max_rounds=None,
+                 idle_timeout=None):
+        """Prepara la búsqueda con el plan inicial de tasks y operarios como mejor plan."""
+        self.records = task_records(tasks)
+        self.num_operarios = len(operarios)
+        self.calendar = operarios[0].calendar if operarios else PlanningCalendar()
+        self.assignment = assignment
+        self.location_order = location_order
+        self.seed = seed
+        self.round_time = round_time
+        self.max_workers = max_workers
+        self.time_limit = time_limit
+        self.max_rounds = max_rounds
+        self.idle_timeout = idle_timeout
+        
+        self.lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.started = None
+        self.initial_objective = plan_objective(tasks, operarios)
+        self.best_objective = self.initial_objective
+        self.best_layout = plan_layout(tasks, operarios)
+        self.version = 0  # Número de planes mejores publicados
+        self.rounds = 0
+        self.history = [(0.0, self.initial_objective['objective'])]
+        self.error = None
+        self.stop_reason = None  # 'detenida', 'tiempo', 'rondas', 'inactividad' o 'error'
+        self.last_seen = None
+    
+    def start(self):
+        """Lanza la búsqueda en un hilo en segundo plano."""
+        self.started = self.last_seen = time.perf_counter()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        ANYTIME_PLANNERS.add(self)
+        self.thread.start()
+    
+    def stop(self, reason='detenida'):
+        """Pide que se detenga la búsqueda; la ronda en curso se descarta."""
+        with self.lock:
+            if self.stop_reason is None:
+                self.stop_reason = reason
+        self.stop_event.set()
+    
+    def limit_reached(self):
+        """Devuelve el límite que se ha alcanzado ('tiempo', 'rondas' o 'inactividad'), o None."""
+        now = time.perf_counter()
+        with self.lock:
+            if self.time_limit is not None and now - self.started >= self.time_limit:
+                return 'tiempo'
+            if self.max_rounds is not None and self.rounds >= self.max_rounds:
+                return 'rondas'
+            if self.idle_timeout is not None and now - self.last_seen >= self.idle_timeout:
+                return 'inactividad'
+        return None
+    
+    @property
+    def running(self):
+        """Indica si la búsqueda sigue en marcha."""
+        return self.thread is not None and self.thread.is_alive() and not self.stop_event.is_set()
+    
+    def run(self):
+        """Bucle del hilo de control: mantiene max_workers rondas en curso hasta que se detiene."""
+        executor = ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            initializer=init_multistart_worker,
+            initargs=(self.records, self.num_operarios, self.assignment, get_travel_matrix(), self.calendar,
+                      self.location_order),
+        )
+        try:
+            next_start = 0
+            pending = set()
+            while not self.stop_event.is_set():
+                reason = self.limit_reached()
+                if reason is not None:
+                    self.stop(reason)
+                    break
+                while len(pending) < self.max_workers and (self.max_rounds is None or next_start < self.max_rounds):
+                    pending.add(executor.submit(run_anytime_round, self.seed, next_start, self.round_time))
+                    next_start += 1
+                done, pending = wait(pending, timeout=ANYTIME_POLL_SECONDS, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if not self.stop_event.is_set():
+                        self.publish(*future.result())
+        except Exception as e:
+            self.error = f"{type(e).__name__}: {e}"
+            self.stop('error')
+        finally:
+            self.stop_event.set()
+            executor.shutdown(wait=False, cancel_futures=True)
+    
+    def publish(self, objective, start, layout):
+        """Registra una ronda terminada y se queda con su plan si mejora el objetivo."""
+        with self.lock:
+            self.rounds += 1
+            if objective['objective'] < self.best_objective['objective']:
+                self.best_objective = objective
+                self.best_layout = layout
+                self.version += 1
+            self.history.append((time.perf_counter() - self.started, self.best_objective['objective']))
+    
+    def progress(self):
+        """Devuelve el estado de la búsqueda: rondas, objetivo inicial y mejor, historial y tiempo.
+        
+        Cada llamada cuenta como actividad para idle_timeout.
+        """
+        with self.lock:
+            self.last_seen = time.perf_counter()
+            return {
+                'running': self.running,
+                'rounds': self.rounds,
+                'version': self.version,
+                'initial': dict(self.initial_objective),
+                'best': dict(self.best_objective),
+                'history': list(self.history),
+                'elapsed_seconds': time.perf_counter() - self.started if self.started is not None else 0.0,
+                'error': self.error,
+                'stop_reason': self.stop_reason,
+            }
+    
+    def best_plan(self):
+        """Reconstruye el mejor plan hasta ahora sobre tareas nuevas; devuelve (versión, tareas, operarios)."""
+        with self.lock:
+            version, layout = self.version, self.best_layout
+        tasks = [Task.from_values(*record) for record in self.records]
+        return version, tasks, build_plan(tasks, self.num_operarios, layout, self.calendar)
+
+
+# Búsquedas de AnytimePlanner lanzadas en este proceso (sin impedir que se liberen)
+ANYTIME_PLANNERS = weakref.WeakSet()
+
+
+@atexit.register
+def stop_anytime_planners():
+    """Detiene todas las búsquedas de AnytimePlanner que sigan en marcha (se llama al salir)."""
+    for planner in list(ANYTIME_PLANNERS):
+        planner.stop()
+
+
+def compare_location_orders(tasks, num_operarios, assignment="round_robin", calendar=None):
+    """Planifica las tareas con cada orden de poblaciones y compara los resultados.
+    
+    Trabaja sobre copias de las tareas, así que no modifica las dadas. Devuelve,
+    por orden, el objetivo de plan_objective más las consultas de tiempos de viaje,
+    y los minutos de viaje que ahorra "sweep" respecto al orden alfabético.
+    """
+    records = task_records(tasks)
+    results = {}
+    for location_order in LOCATION_ORDERS:
+        order_tasks = [Task.from_values(*record) for record in records]
+        stats = PlanningStats()
+        with contextlib.redirect_stdout(io.StringIO()):
+            operarios = generate_routes(order_tasks, num_operarios, assignment, calendar=calendar,
+                                        stats=stats, location_order=location_order)
+        results[location_order] = {
+            **plan_objective(order_tasks, operarios),
+            'travel_lookups': stats.travel_lookups,
+        }
+    results['travel_saved'] = results['alphabetical']['travel'] - results['sweep']['travel']
+    return results
+
+
+def total_travel_time(operarios):
+    """Suma los minutos de desplazamiento de todos los días (incluida la vuelta a Vic)."""
+    total = 0
+    for operario in operarios:
+        for route_day in operario.route_days.values():
+            total += sum(route_day.travel_times)
+            total += route_day.return_travel_time
+    return total
+
+
+class RouteImprover:
+    """Búsqueda local sobre las rutas generadas (2-opt, recolocar e intercambiar tareas).
+    
+    Cada movimiento se evalúa por la diferencia de coste sobre los días afectados,
+    con los tiempos de viaje entre las poblaciones del plan precalculados. Solo se
+    aceptan movimientos que mantienen cada día dentro de la capacidad de
+    has_capacity_for; al terminar, los días modificados se vuelven a planificar
+    con add_task, que aplica las reglas de la pausa para comer. Solo se usan los
+    días de ruta ya creados por el planificador. Los días con alguna tarea con
+    franja horaria quedan fijos: no se reordenan ni ceden o reciben tareas.
+    """
+    
+    def __init__(self, operarios):
+        """Prepara el estado de la búsqueda a partir de los operarios planificados."""
+        self.route_days = [
+            operario.route_days[key]
+            for operario in operarios
+            for key in sorted(operario.route_days, key=lambda key: operario.calendar.day_order(*key))
+        ]
+        
+        # Tiempos de viaje entre las poblaciones del plan (el índice 0 es Vic)
+        locations = [ORIGIN_LOCATION] + sorted(
+            {task.poblacion for route_day in self.route_days for task in route_day.visit_tasks}
+            - {ORIGIN_LOCATION}
+        )
+        location_ids = {location: i for i, location in enumerate(locations)}
+        self.travel = [[estimate_travel_time(a, b) for b in locations] for a in locations]
+        self.capacity = (WORK_HOURS * 60) - LUNCH_DURATION
+        
+        self.routes = [list(route_day.visit_tasks) for route_day in self.route_days]
+        self.stops = [[location_ids[task.poblacion] for task in route] for route in self.routes]
+        self.durations = [sum(task.duracion for task in route) for route in self.routes]
+        self.travel_totals = [self.route_travel(stops) for stops in self.stops]
+        self.fixed = [any(task.has_window() for task in route) for route in self.routes]
+        self.changed = set()
+        self.moves = {'two_opt': 0, 'relocate': 0, 'swap': 0}
+    
+    def route_travel(self, stops):
+        """Tiempo de viaje de una ruta Vic -> paradas -> Vic."""
+        if not stops:
+            return 0
+        travel = self.travel
+        total = travel[0][stops[0]] + travel[stops[-1]][0]
+        for a, b in zip(stops, stops[1:]):
+            total += travel[a][b]
+        return total
+    
+    def work_time(self, duration, travel_total, last):
+        """Minutos de jornada tal como los cuenta has_capacity_for (sin la vuelta a Vic)."""
+        if travel_total == 0:
+            return 0
+        return duration + travel_total - self.travel[last][0]
+    
+    def removal_delta(self, stops, i):
+        """Variación del viaje al quitar la parada i y última parada resultante."""
+        travel = self.travel
+        if len(stops) == 1:
+            return -self.route_travel(stops), 0
+        x = stops[i]
+        p = stops[i - 1] if i > 0 else 0
+        n = stops[i + 1] if i + 1 < len(stops) else 0
+        last = stops[-2] if i == len(stops) - 1 else stops[-1]
+        return travel[p][n] - travel[p][x] - travel[x][n], last
+    
+    def insertion_delta(self, stops, j, x):
+        """Variación del viaje al insertar la parada x en la posición j y última parada resultante."""
+        travel = self.travel
+        if not stops:
+            return travel[0][x] + travel[x][0], x
+        p = stops[j - 1] if j > 0 else 0
+        n = stops[j] if j < len(stops) else 0
+        last = x if j == len(stops) else stops[-1]
+        return travel[p][x] + travel[x][n] - travel[p][n], last
+    
+    def replacement_delta(self, stops, i, y):
+        """Variación del viaje al sustituir la parada i por y y última parada resultante."""
+        travel = self.travel
+        x = stops[i]
+        p = stops[i - 1] if i > 0 else 0
+        n = stops[i + 1] if i + 1 < len(stops) else 0
+        last = y if i == len(stops) - 1 else stops[-1]
+        return travel[p][y] + travel[y][n] - travel[p][x] - travel[x][n], last
+    
+    def update_day(self, d):
+        """Recalcula los totales de un día tras aplicar un movimiento."""
+        self.durations[d] = sum(task.duracion for task in self.routes[d])
+        self.travel_totals[d] = self.route_travel(self.stops[d])
+        self.changed.add(d)
+    
+    def two_opt(self, d):
+        """Aplica el mejor movimiento 2-opt (invertir un tramo) dentro de un día."""
+        stops = self.stops[d]
+        size = len(stops)
+        if size < 2 or self.fixed[d]:
+            return False
+        travel = self.travel
+        
+        # Sumas acumuladas del viaje en ambos sentidos para evaluar cada inversión en O(1)
+        forward = [0] * size
+        backward = [0] * size
+        for k in range(1, size):
+            forward[k] = forward[k - 1] + travel[stops[k - 1]][stops[k]]
+            backward[k] = backward[k - 1] + travel[stops[k]][stops[k - 1]]
+        
+        best = None
+        best_delta = 0
+        for i in range(size - 1):
+            p = stops[i - 1] if i > 0 else 0
+            for j in range(i + 1, size):
+                n = stops[j + 1] if j + 1 < size else 0
+                delta = (travel[p][stops[j]] + travel[stops[i]][n]
+                         - travel[p][stops[i]] - travel[stops[j]][n]
+                         + (backward[j] - backward[i]) - (forward[j] - forward[i]))
+                if delta < best_delta:
+                    last = stops[i] if j == size - 1 else stops[-1]
+                    new_travel = self.travel_totals[d] + delta
+                    if self.work_time(self.durations[d], new_travel, last) <= self.capacity:
+                        best, best_delta = (i, j), delta
+        
+        if best is None:
+            return False
+        i, j = best
+        self.stops[d][i:j + 1] = self.stops[d][i:j + 1][::-1]
+        self.routes[d][i:j + 1] = self.routes[d][i:j + 1][::-1]
+        self.update_day(d)
+        self.moves['two_opt'] += 1
+        return True
+    
+    def relocate(self, a, i):
+        """Mueve la tarea i del día a a la mejor posición factible de otro día."""
+        if self.fixed[a]:
+            return False
+        task = self.routes[a][i]
+        x = self.stops[a][i]
+        remove_delta, last_a = self.removal_delta(self.stops[a], i)
+        new_travel_a = self.travel_totals[a] + remove_delta
+        if self.work_time(self.durations[a] - task.duracion, new_travel_a, last_a) > self.capacity:
+            return False
+        
+        best = None
+        best_delta = 0
+        for b, stops_b in enumerate(self.stops):
+            if b == a or self.fixed[b]:
+                continue
+            duration_b = self.durations[b] + task.duracion
+            for j in range(len(stops_b) + 1):
+                insert_delta, last_b = self.insertion_delta(stops_b, j, x)
+                delta = remove_delta + insert_delta
+                if delta < best_delta:
+                    new_travel_b = self.travel_totals[b] + insert_delta
+                    if self.work_time(duration_b, new_travel_b, last_b) <= self.capacity:
+                        best, best_delta = (b, j), delta
+        
+        if best is None:
+            return False
+        b, j = best
+        del self.stops[a][i]
+        del self.routes[a][i]
+        self.stops[b].insert(j, x)
+        self.routes[b].insert(j, task)
+        self.update_day(a)
+        self.update_day(b)
+        self.moves['relocate'] += 1
+        return True
+    
+    def swap(self, a, i):
+        """Intercambia la tarea i del día a con la tarea de otro día que más reduce el viaje."""
+        if self.fixed[a]:
+            return False
+        task_a = self.routes[a][i]
+        x = self.stops[a][i]
+        
+        best = None
+        best_delta = 0
+        for b in range(a + 1, len(self.stops)):
+            if self.fixed[b]:
+                continue
+            stops_b = self.stops[b]
+            for j, y in enumerate(stops_b):
+                task_b = self.routes[b][j]
+                delta_a, last_a = self.replacement_delta(self.stops[a], i, y)
+                delta_b, last_b = self.replacement_delta(stops_b, j, x)
+                delta = delta_a + delta_b
+                if delta >= best_delta:
+                    continue
+                work_a = self.work_time(self.durations[a] - task_a.duracion + task_b.duracion,
+                                        self.travel_totals[a] + delta_a, last_a)
+                work_b = self.work_time(self.durations[b] - task_b.duracion + task_a.duracion,
+                                        self.travel_totals[b] + delta_b, last_b)
+                if work_a <= self.capacity and work_b <= self.capacity:
+                    best, best_delta = (b, j), delta
+        
+        if best is None:
+            return False
+        b, j = best
+        task_b = self.routes[b][j]
+        self.stops[a][i], self.stops[b][j] = self.stops[b][j], x
+        self.routes[a][i], self.routes[b][j] = task_b, task_a
+        self.update_day(a)
+        self.update_day(b)
+        self.moves['swap'] += 1
+        return True
+    
+    def run(self, time_limit):
+        """Aplica movimientos de mejora hasta que no haya más o se agote el tiempo."""
+        deadline = time.perf_counter() + time_limit
+        improved = True
+        while improved and time.perf_counter() < deadline:
+            improved = False
+            for d in range(len(self.stops)):
+                while self.two_opt(d):
+                    improved = True
+            
+            for a in range(len(self.stops)):
+                if time.perf_counter() >= deadline:
+                    break
+                i = 0
+                while i < len(self.stops[a]):
+                    if self.relocate(a, i):
+                        improved = True
+                    else:
+                        i += 1
+            
+            for a in range(len(self.stops)):
+                if time.perf_counter() >= deadline:
+                    break
+                for i in range(len(self.stops[a])):
+                    if self.swap(a, i):
+                        improved = True
+        
+        # Volver a planificar solo los días modificados
+        for d in sorted(self.changed):
+            self.route_days[d].rebuild(self.routes[d])
+
+
+def improve_routes(operarios, time_limit=5.0):
+    """Mejora las rutas de generate_routes con búsqueda local durante time_limit segundos.
+    
+    Devuelve un diccionario con el viaje total antes y después de la mejora, los
+    minutos ahorrados respecto al plan voraz y el número de movimientos aplicados.
+    """
+    start = time.perf_counter()
+    travel_before = total_travel_time(operarios)
+    
+    improver = RouteImprover(operarios)
+    improver.run(time_limit)
+    
+    travel_after = total_travel_time(operarios)
+    return {
+        'travel_before': travel_before,
+        'travel_after': travel_after,
+        'travel_saved': travel_before - travel_after,
+        'moves': dict(improver.moves),
+        'days_changed': len(improver.changed),
+        'elapsed_seconds': time.perf_counter() - start,
+    }
+
+
+def held_karp_order(travel):
+    """Orden óptimo de visita con programación dinámica sobre subconjuntos (Held-Karp).
+    
+    travel es una matriz NumPy (n+1)x(n+1) de tiempos de viaje en la que el índice
+    0 es Vic. Devuelve la permutación de 1..n que minimiza el viaje de ida y
+    vuelta. Cada capa de subconjuntos del mismo tamaño se calcula vectorizada,
+    con coste O(2^n · n^2).
+    """
+    n = len(travel) - 1
+    if n <= 1:
+        return list(range(1, n + 1))
+    
+    full = 1 << n
+    masks = np.arange(full)
+    popcount = np.zeros(full, dtype=np.int64)
+    for j in range(n):
+        popcount += (masks >> j) & 1
+    
+    cost = travel[1:, 1:]
+    dp = np.full((full, n), np.iinfo(np.int64).max // 4, dtype=np.int64)
+    parent = np.full((full, n), -1, dtype=np.int64)
+    for j in range(n):
+        dp[1 << j, j] = travel[0, j + 1]
+    
+    for size in range(2, n + 1):
+        layer = masks[popcount == size]
+        for j in range(n):
+            subsets = layer[(layer >> j) & 1 == 1]
+            candidates = dp[subsets ^ (1 << j)] + cost[:, j]
+            best = candidates.argmin(axis=1)
+            dp[subsets, j] = candidates[np.arange(len(subsets)), best]
+            parent[subsets, j] = best
+    
+    # Reconstruir el recorrido desde la última parada
+    last = int(np.argmin(dp[full - 1] + travel[1:, 0]))
+    mask = full - 1
+    order = []
+    while last >= 0:
+        order.append(last + 1)
+        previous = int(parent[mask, last])
+        mask ^= 1 << last
+        last = previous
+    return order[::-1]
+
+
+def heuristic_order(travel):
+    """Orden de visita por vecino más cercano desde Vic, mejorado con 2-opt."""
+    n = len(travel) - 1
+    order = []
+    current = 0
+    pending = set(range(1, n + 1))
+    while pending:
+        current = min(pending, key=lambda node: (travel[current, node], node))
+        pending.remove(current)
+        order.append(current)
+    
+    improved = True
+    while improved:
+        improved = False
+        route = [0] + order + [0]
+        for i in range(1, len(route) - 2):
+            for j in range(i + 1, len(route) - 1):
+                segment = route[i:j + 1]
+                before = sum(travel[a, b] for a, b in zip(route[i - 1:j + 1], route[i:j + 2]))
+                reversed_route = [route[i - 1]] + segment[::-1] + [route[j + 1]]
+                after = sum(travel[a, b] for a, b in zip(reversed_route, reversed_route[1:]))
+                if after < before:
+                    route[i:j + 1] = segment[::-1]
+                    improved = True
+        order = route[1:-1]
+    return order
+
+
+def resequence_days(operarios, max_exact_stops=EXACT_SEQUENCING_MAX_STOPS):
+    """Reordena las visitas de cada día para minimizar el viaje desde Vic y de vuelta.
+    
+    Las tareas de una misma población se visitan seguidas, así que se ordenan
+    las poblaciones del día: con held_karp_order (exacto) hasta max_exact_stops
+    poblaciones y con heuristic_order por encima. Los días con el mismo conjunto
+    de poblaciones reutilizan el orden ya calculado. Solo se cambia un día si
+    ahorra viaje, sigue cabiendo en la jornada (como en has_capacity_for) y
+    respeta las franjas horarias; los días cambiados se vuelven a planificar,
+    con sus horas y su viaje de vuelta.
+    """
+    start = time.perf_counter()
+    travel_before = total_travel_time(operarios)
+    capacity = (WORK_HOURS * 60) - LUNCH_DURATION
+    orders = {}  # poblaciones del día (ordenadas) -> orden de visita
+    counts = {'exact_days': 0, 'heuristic_days': 0, 'cache_hits': 0, 'days_changed': 0}
+    
+    for operario in operarios:
+        for route_day in operario.active_days():
+            # Tareas agrupadas por población, en el orden en que aparecen
+            groups = {}
+            for task in route_day.visit_tasks:
+                groups.setdefault(task.poblacion, []).append(task)
+            key = tuple(sorted(groups))
+            
+            order = orders.get(key)
+            if order is not None:
+                counts['cache_hits'] += 1
+            else:
+                locations = [ORIGIN_LOCATION] + list(key)
+                travel = np.array([[estimate_travel_time(a, b) for b in locations] for a in locations],
+                                  dtype=np.int64)
+                if len(key) <= max_exact_stops:
+                    order = [locations[i] for i in held_karp_order(travel)]
+                    counts['exact_days'] += 1
+                else:
+                    order = [locations[i] for i in heuristic_order(travel)]
+                    counts['heuristic_days'] += 1
+                orders[key] = order
+            
+            tasks = [task for location in order for task in groups[location]]
+            if tasks == route_day.visit_tasks:
+                continue
+            
+            # Comprobar el nuevo orden sin tocar el día
+            candidate = RouteDayWeek(route_day.day_name, route_day.week_number, route_day.date)
+            candidate.rebuild(tasks)
+            old_travel = sum(route_day.travel_times) + route_day.return_travel_time
+            new_travel = sum(candidate.travel_times) + candidate.return_travel_time
+            new_work = candidate.total_time - candidate.return_travel_time
+            old_work = route_day.total_time - route_day.return_travel_time
+            if new_travel < old_travel and new_work <= max(capacity, old_work) and candidate.fits_windows():
+                route_day.rebuild(tasks)
+                counts['days_changed'] += 1
+    
+    travel_after = total_travel_time(operarios)
+    return {
+        'travel_before': travel_before,
+        'travel_after': travel_after,
+        'travel_saved': travel_before - travel_after,
+        **counts,
+        'elapsed_seconds': time.perf_counter() - start,
+    }
+
+
+def insert_tasks(operarios, tasks, from_date=None):
+    """Añade tareas nuevas a un plan ya generado, sin replanificar el resto.
+    
+    Cada tarea (primero las más largas) va al hueco factible que menos viaje
+    añade entre todos los días laborables de todos los operarios, incluidos los
+    que aún no tienen tareas; a igualdad, al día más temprano. Con from_date solo
+    se consideran los días a partir de esa fecha. Los días candidatos salen de
+    un CapacityIndex (for_insertion), así que cada tarea solo prueba los días
+    con sitio para ella. Solo se recalculan los días que reciben tareas; el
+    resto queda intacto.
+    """
+    placed = []
+    unassigned = []
+    days_changed = []
+    index = CapacityIndex.for_insertion(operarios, from_date)
+    for task in sorted(tasks, key=lambda x: x.duracion, reverse=True):
+        best = index.best_insertion(task)
+        if best is None:
+            print(f"ADVERTENCIA: No se pudo asignar la tarea: {task}")
+            unassigned.append(task)
+            continue
+        
+        _, day_id, position = best
+        route_day = index.insert_at(task, day_id, position)
+        placed.append((task, route_day))
+        if route_day not in days_changed:
+            days_changed.append(route_day)
+    
+    return {'placed': placed, 'unassigned': unassigned, 'days_changed': days_changed}
+
+
+def remove_tasks(operarios, tasks):
+    """Quita tareas canceladas de un plan ya generado, sin replanificar el resto.
+    
+    Las tareas se buscan por identidad en los días de ruta; solo se recalculan
+    los días de los que se quitan tareas. Devuelve las tareas quitadas, las que
+    no estaban en el plan y los días modificados.
+    """
+    pending = {id(task): task for task in tasks}
+    removed = []
+    days_changed = []
+    for operario in operarios:
+        for route_day in operario.route_days.values():
+            cancelled = [task for task in route_day.visit_tasks if id(task) in pending]
+            if not cancelled:
+                continue
+            route_day.rebuild([task for task in route_day.visit_tasks if id(task) not in pending])
+            for task in cancelled:
+                del pending[id(task)]
+                task.assigned = False
+                removed.append(task)
+            days_changed.append(route_day)
+    
+    return {'removed': removed, 'not_found': list(pending.values()), 'days_changed': days_changed}
+
+
+# Columnas de la tabla plana del plan (una fila por visita)
+PLAN_TABLE_COLUMNS = ['operario', 'semana', 'dia', 'fecha', 'orden', 'inicio', 'fin', 'viaje', 'espera',
+                      'duracion', 'vuelta', 'poblacion', 'cliente', 'direccion', 'tarea', 'franja_inicio', 'franja_fin',
+                      'cod_cliente', 'mantenimiento']
+
+
+def plan_table(operarios):
+    """Convierte el plan en una tabla plana con una fila por visita, en un solo recorrido.
+    
+    Las filas siguen el orden de operarios, fechas y visitas. inicio y fin son
+    minutos desde medianoche, viaje el desplazamiento hasta la visita, espera
+    los minutos hasta que se abre su franja horaria y vuelta el regreso a Vic
+    (solo en la última visita de cada día, 0 en las demás), de modo que la suma
+    de viaje, espera, duracion y vuelta de un día es su total_time. La columna
+    comida indica si se come justo antes de la visita (también antes de la
+    primera, si empieza después de LUNCH_START) e inicio_comida a qué minuto,
+    con la regla de lunch_minute (0 si no se come). Los resúmenes, el informe y
+    la aplicación se calculan agrupando esta tabla.
+    """
+    columns = {name: [] for name in PLAN_TABLE_COLUMNS}
+    for operario in operarios:
+        for route_day in operario.active_days():
+            size = len(route_day.visit_tasks)
+            tasks = route_day.visit_tasks
+            columns['operario'].extend([operario.operario_id] * size)
+            columns['semana'].extend([route_day.week_number] * size)
+            columns['dia'].extend([route_day.day_name] * size)
+            columns['fecha'].extend([route_day.date] * size)
+            columns['orden'].extend(range(size))
+            columns['inicio'].extend(route_day.start_times)
+            columns['fin'].extend(start + task.duracion for start, task in zip(route_day.start_times, tasks))
+            columns['viaje'].extend(route_day.travel_times)
+            columns['espera'].extend([0] * size)
+            columns['duracion'].extend(task.duracion for task in tasks)
+            columns['vuelta'].extend([0] * (size - 1) + [route_day.return_travel_time])
+            columns['poblacion'].extend(task.poblacion for task in tasks)
+            columns['cliente'].extend(task.nombre_cliente for task in tasks)
+            columns['direccion'].extend(task.direccion for task in tasks)
+            columns['tarea'].extend(task.observaciones for task in tasks)
+            columns['franja_inicio'].extend(task.window_start for task in tasks)
+            columns['franja_fin'].extend(task.window_end for task in tasks)
+            columns['cod_cliente'].extend(task.cod_cliente for task in tasks)
+            columns['mantenimiento'].extend(task.mantenimiento for task in tasks)
+    
+    table = pd.DataFrame(columns, columns=PLAN_TABLE_COLUMNS)
+    integer_columns = ['operario', 'semana', 'orden', 'inicio', 'fin', 'viaje', 'espera', 'duracion', 'vuelta',
+                       'franja_inicio', 'franja_fin']
+    table[integer_columns] = table[integer_columns].astype(np.int64)
+    table['fecha'] = pd.to_datetime(table['fecha'])
+    
+    # Se come antes de la visita si la anterior del mismo día (o la salida) acaba antes de LUNCH_START
+    # y esta empieza después; la espera es lo que queda entre ambas sin el viaje ni la pausa
+    previous_end = table['fin'].shift(1).where(table['orden'] > 0, DAY_START)
+    table['comida'] = (previous_end < LUNCH_START) & (table['inicio'] > LUNCH_START)
+    table['espera'] = (table['inicio'] - previous_end - table['viaje']
+                       - LUNCH_DURATION * table['comida']).astype(np.int64)
+    lunch_start = np.minimum(LUNCH_START, table['inicio'] - LUNCH_DURATION)
+    table['inicio_comida'] = lunch_start.where(table['comida'], 0).astype(np.int64)
+    return table
+
+
+def unassigned_table(tasks):
+    """Devuelve las tareas sin asignar como tabla, con las mismas columnas de texto que plan_table."""
+    unassigned = [task for task in tasks if not task.assigned]
+    return pd.DataFrame({
+        'cliente': [task.nombre_cliente for task in unassigned],
+        'poblacion': [task.poblacion for task in unassigned],
+        'direccion': [task.direccion for task in unassigned],
+        'tarea': [task.observaciones for task in unassigned],
+        'duracion': np.array([task.duracion for task in unassigned], dtype=np.int64),
+    })
+
+
+def day_totals(table):
+    """Agrupa la tabla del plan por operario y día: tareas, minutos de trabajo (con las esperas) y de viaje."""
+    return (
+        table.assign(minutos=table['viaje'] + table['espera'] + table['duracion'] + table['vuelta'],
+                     minutos_viaje=table['viaje'] + table['vuelta'])
+        .groupby(['operario', 'semana', 'dia', 'fecha'], sort=False)
+        .agg(tareas=('orden', 'size'), minutos=('minutos', 'sum'), minutos_viaje=('minutos_viaje', 'sum'))
+        .reset_index()
+    )
+
+
+def week_totals(table):
+    """Agrupa la tabla del plan por operario y semana: tareas, días, minutos de trabajo y de viaje."""
+    return (
+        day_totals(table)
+        .groupby(['operario', 'semana'], sort=False)
+        .agg(tareas=('tareas', 'sum'), dias=('fecha', 'size'), minutos=('minutos', 'sum'),
+             minutos_viaje=('minutos_viaje', 'sum'))
+        .reset_index()
+    )
+
+
+def operario_totals(table, operarios):
+    """Agrupa la tabla del plan por operario, incluidos los operarios sin tareas (con ceros)."""
+    ids = pd.Index([operario.operario_id for operario in operarios], name='operario')
+    return (
+        week_totals(table)
+        .groupby('operario', sort=False)
+        .agg(tareas=('tareas', 'sum'), dias=('dias', 'sum'), minutos=('minutos', 'sum'),
+             minutos_viaje=('minutos_viaje', 'sum'))
+        .reindex(ids, fill_value=0)
+        .reset_index()
+    )
+
+
+def format_column(values, formatter):
+    """Aplica un formateador a una columna una sola vez por valor distinto."""
+    codes, uniques = pd.factorize(values, sort=False)
+    formatted = np.array([formatter(value) for value in uniques] + [""], dtype=object)
+    return formatted[codes]
+
+
+# Formato en disco de los planes guardados (SavedPlan)
+PLAN_FILE_FORMAT = "eix-planificacion"
+PLAN_FILE_VERSION = 1
+PLAN_FILE_COLUMNS = ['operario', 'semana', 'dia', 'orden', 'cod_cliente', 'mantenimiento', 'poblacion',
+                     'duracion', 'franja_inicio', 'franja_fin']
+PLAN_KEY_COLUMNS = ['cod_cliente', 'mantenimiento', 'ocurrencia']  # Identifican una tarea entre meses
+
+
+class SavedPlan:
+    """Plan terminado guardado en disco para usarlo como punto de partida del mes siguiente.
+    
+    Se guarda como JSON por columnas (una lista por columna de PLAN_FILE_COLUMNS,
+    una posición por visita) con el formato y la versión, la fecha de inicio,
+    las semanas y los operarios del plan. Las visitas se identifican por
+    cod_cliente y mantenimiento; si un par se repite, por su número de aparición,
+    que se calcula al emparejarlas con las tareas de otro mes (pair_occurrences).
+    visits solo tiene las columnas de PLAN_FILE_COLUMNS.
+    """
+    
+    def __init__(self, visits, start_date, num_weeks, num_operarios):
+        """Inicializa el plan guardado a partir de la tabla de visitas (columnas PLAN_FILE_COLUMNS)."""
+        self.visits = visits[PLAN_FILE_COLUMNS].reset_index(drop=True)
+        self.start_date = start_date
+        self.num_weeks = num_weeks
+        self.num_operarios = num_operarios
+    
+    @classmethod
+    def from_plan(cls, operarios, table=None):
+        """Crea el plan guardado de unos operarios planificados (o de su tabla de plan_table)."""
+        if table is None:
+            table = plan_table(operarios)
+        calendar = operarios[0].calendar if operarios else PlanningCalendar()
+        return cls(table[PLAN_FILE_COLUMNS].copy(), calendar.start_date, calendar.num_weeks, len(operarios))
+    
+    def to_bytes(self):
+        """Serializa el plan en el formato en disco."""
+        data = {
+            'formato': PLAN_FILE_FORMAT,
+            'version': PLAN_FILE_VERSION,
+            'inicio': self.start_date.strftime("%Y-%m-%d"),
+            'semanas': self.num_weeks,
+            'operarios': self.num_operarios,
+            'visitas': {column: self.visits[column].tolist() for column in PLAN_FILE_COLUMNS},
+        }
+        return json.dumps(data, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+    
+    def save(self, path):
+        """Guarda el plan en un archivo."""
+        with open(path, 'wb') as f:
+            f.write(self.to_bytes())
+    
+    @classmethod
+    def from_bytes(cls, content):
+        """Lee un plan guardado con to_bytes; lanza ValueError si el formato o la versión no son válidos."""
+        try:
+            data = json.loads(content.decode('utf-8') if isinstance(content, bytes) else content)
+        except ValueError as e:
+            raise ValueError(f"El plan guardado no es un JSON válido: {e}") from e
+        if not isinstance(data, dict) or data.get('formato') != PLAN_FILE_FORMAT:
+            raise ValueError("El archivo no es un plan guardado por el planificador")
+        if data.get('version') != PLAN_FILE_VERSION:
+            raise ValueError(f"Versión de plan guardado no soportada: {data.get('version')} "
+                             f"(se esperaba {PLAN_FILE_VERSION})")
+        
+        visits = pd.DataFrame({column: data['visitas'][column] for column in PLAN_FILE_COLUMNS},
+                              columns=PLAN_FILE_COLUMNS)
+        visits[['cod_cliente', 'mantenimiento', 'poblacion', 'dia']] = (
+            visits[['cod_cliente', 'mantenimiento', 'poblacion', 'dia']].astype(str))
+        integer_columns = ['operario', 'semana', 'orden', 'duracion', 'franja_inicio', 'franja_fin']
+        visits[integer_columns] = visits[integer_columns].astype(np.int64)
+        return cls(visits, datetime.strptime(data['inicio'], "%Y-%m-%d"), data['semanas'], data['operarios'])
+    
+    @classmethod
+    def from_file(cls, path):
+        """Lee un plan guardado de un archivo."""
+        with open(path, 'rb') as f:
+            return cls.from_bytes(f.read())
+
+
+def key_occurrences(frame):
+    """Numera las filas que repiten cod_cliente y mantenimiento (0, 1, ...).
+    
+    Dentro de cada par se numeran por población y duración, de modo que las
+    tareas repetidas que no han cambiado reciben el mismo número en los dos
+    meses aunque aparezcan en otro orden.
+    """
+    ordered = frame.sort_values(['cod_cliente', 'mantenimiento', 'poblacion', 'duracion'], kind='stable')
+    return ordered.groupby(['cod_cliente', 'mantenimiento'], sort=False).cumcount().reindex(frame.index)
+
+
+def task_keys(tasks):
+    """Devuelve la tabla (cod_cliente, mantenimiento, ocurrencia, poblacion, duracion) de las tareas."""
+    keys = pd.DataFrame({
+        'cod_cliente': [task.cod_cliente for task in tasks],
+        'mantenimiento': [task.mantenimiento for task in tasks],
+        'poblacion': [task.poblacion for task in tasks],
+        'duracion': np.array([task.duracion for task in tasks], dtype=np.int64),
+    })
+    keys.insert(2, 'ocurrencia', key_occurrences(keys))
+    return keys
+
+
+def pair_occurrences(previous, current):
+    """Numera a la vez las tareas repetidas de dos meses para emparejarlas por clave.
+    
+    Dentro de cada par (cod_cliente, mantenimiento) reciben primero el mismo
+    número las tareas que no han cambiado de población ni de duración; las
+    demás se numeran a continuación, en el orden de key_occurrences. Así, si
+    de dos tareas repetidas una desaparece, la que sigue igual no se empareja
+    con la que ya no está. Devuelve los números de previous y de current.
+    """
+    columns = ['cod_cliente', 'mantenimiento', 'poblacion', 'duracion']
+    left = previous[columns].assign(copia=previous.groupby(columns).cumcount().to_numpy(),
+                                    fila=np.arange(len(previous)))
+    right = current[columns].assign(copia=current.groupby(columns).cumcount().to_numpy(),
+                                    fila=np.arange(len(current)))
+    exact = left.merge(right, on=columns + ['copia'], suffixes=('_anterior', ''))
+    matched = exact.groupby(['cod_cliente', 'mantenimiento']).size()
+    
+    numbers = []
+    for side, rows in ((left, exact['fila_anterior']), (right, exact['fila'])):
+        occurrences = np.full(len(side), -1, dtype=np.int64)
+        occurrences[rows.to_numpy()] = exact.groupby(['cod_cliente', 'mantenimiento']).cumcount().to_numpy()
+        rest = side[occurrences < 0]
+        if len(rest):
+            offset = matched.reindex(pd.MultiIndex.from_frame(rest[['cod_cliente', 'mantenimiento']]),
+                                     fill_value=0).to_numpy()
+            occurrences[rest['fila'].to_numpy()] = offset + key_occurrences(rest).to_numpy()
+        numbers.append(occurrences)
+    return pd.Series(numbers[0], index=previous.index), pd.Series(numbers[1], index=current.index)
+
+
+def warm_start_routes(tasks, num_operarios, saved_plan, calendar=None, stats=None):
+    """Planifica las tareas partiendo del plan guardado del mes anterior.
+    
+    Cada tarea que estaba en saved_plan con la misma población, duración y
+    franja horaria vuelve al mismo operario, semana y día del calendario nuevo
+    (en el mismo orden), si ese día es laborable y todavía cabe. Solo las demás
+    (nuevas, modificadas o que ya no caben) pasan por la asignación, con
+    insert_tasks; las tareas que ya no están simplemente no se siembran.
+    Devuelve los operarios y la tabla de cambios de plan_diff.
+    """
+    for task in tasks:
+        task.assigned = False
+    if calendar is None:
+        calendar = PlanningCalendar()
+    operarios = [Operario(i+1, calendar) for i in range(num_operarios)]
+    
+    with stage_timer(stats, "asignacion"):
+        seed_saved_plan(tasks, operarios, saved_plan)
+        
+        # Solo las tareas nuevas, modificadas o que no han cabido pasan por la asignación
+        insert_tasks(operarios, [task for task in tasks if not task.assigned])
+    
+    return operarios, plan_diff(saved_plan, tasks, operarios)
+
+
+def restore_routes(tasks, num_operarios, saved_plan, calendar=None):
+    """Reconstruye los operarios de un plan guardado a partir de las mismas tareas.
+    
+    Sirve para recuperar un plan calculado en otro proceso (por ejemplo, en el
+    servicio de planificación) sin volver a planificar: las tareas vuelven a su
+    día y en su orden, y las que no estaban en el plan quedan sin asignar.
+    Por defecto se usa el calendario del plan guardado.
+    """
+    for task in tasks:
+        task.assigned = False
+    if calendar is None:
+        calendar = PlanningCalendar(saved_plan.start_date, saved_plan.num_weeks)
+    operarios = [Operario(i+1, calendar) for i in range(num_operarios)]
+    seed_saved_plan(tasks, operarios, saved_plan)
+    return operarios
+
+
+def seed_saved_plan(tasks, operarios, saved_plan):
+    """Coloca cada tarea del plan guardado en su operario, semana y día, en el orden guardado.
+    
+    Las tareas se emparejan con las visitas por clave (pair_occurrences). Una
+    visita se salta si su día no es laborable en el calendario de los
+    operarios, si la tarea ha cambiado de población, duración o franja, o si
+    ya no cabe. Las tareas colocadas quedan marcadas como asignadas.
+    """
+    if not operarios:
+        return
+    keys = task_keys(tasks)
+    visits = saved_plan.visits.copy()
+    visits['ocurrencia'], keys['ocurrencia'] = pair_occurrences(visits, keys)
+    keys = keys[PLAN_KEY_COLUMNS]
+    keys['tarea'] = np.arange(len(tasks))
+    visits = visits.merge(keys, on=PLAN_KEY_COLUMNS, how='inner')
+    working_days = set(operarios[0].calendar.working_days)
+    
+    # Sembrar los días en el orden del plan guardado, comprobando capacidad y franjas
+    visits = visits.sort_values(['operario', 'semana', 'dia', 'orden'], kind='stable')
+    seeded_days = []
+    route_day = None
+    for visit in visits.itertuples(index=False):
+        if visit.operario > len(operarios) or (visit.semana, visit.dia) not in working_days:
+            continue
+        if route_day is None or (route_day.week_number, route_day.day_name) != (visit.semana, visit.dia) \
+                or seeded_days[-1][0] != visit.operario:
+            route_day = operarios[visit.operario - 1].get_route_day(visit.dia, visit.semana)
+            seeded_days.append((visit.operario, route_day))
+        task = tasks[visit.tarea]
+        if (task.poblacion != visit.poblacion or task.duracion != visit.duracion
+                or task.window_start != visit.franja_inicio or task.window_end != visit.franja_fin):
+            continue
+        travel_time = estimate_travel_time(route_day.end_location, task.poblacion)
+        if (route_day.has_capacity_for(task.duracion, travel_time, task.window_start)
+                and route_day.fits_window(task, travel_time)):
+            route_day.add_task(task, travel_time)
+            task.assigned = True
+    for _, route_day in seeded_days:
+        route_day.finalize_day()
+
+
+def plan_diff(saved_plan, tasks, operarios):
+    """Compara un plan con el plan guardado del mes anterior, tarea a tarea.
+    
+    Devuelve una tabla con la clave de cada tarea, el día (operario, semana y
+    día) en cada plan y su estado: 'igual' (mismo día), 'movida' (otro día),
+    'nueva' (no estaba), 'eliminada' (ya no está), 'sin_asignar' (está pero no
+    se ha podido planificar) y si ha cambiado su población o duración.
+    """
+    slots = {}
+    for operario in operarios:
+        for route_day in operario.active_days():
+            for task in route_day.visit_tasks:
+                slots[id(task)] = (operario.operario_id, route_day.week_number, route_day.day_name)
+    
+    current = task_keys(tasks)
+    current_slots = [slots.get(id(task), (0, 0, "")) for task in tasks]
+    current['operario'] = [slot[0] for slot in current_slots]
+    current['semana'] = [slot[1] for slot in current_slots]
+    current['dia'] = [slot[2] for slot in current_slots]
+    
+    previous = saved_plan.visits[['cod_cliente', 'mantenimiento', 'poblacion', 'duracion',
+                                  'operario', 'semana', 'dia']].copy()
+    previous['ocurrencia'], current['ocurrencia'] = pair_occurrences(previous, current)
+    diff = previous.merge(current, on=PLAN_KEY_COLUMNS, how='outer', suffixes=('_anterior', ''), indicator=True)
+    was_planned = diff['_merge'] != 'right_only'
+    is_present = diff['_merge'] != 'left_only'
+    is_planned = is_present & (diff['operario'].fillna(0) > 0)
+    same_day = ((diff['operario'] == diff['operario_anterior']) & (diff['semana'] == diff['semana_anterior'])
+                & (diff['dia'] == diff['dia_anterior']))
+    diff['estado'] = np.select(
+        [~is_present, ~is_planned, ~was_planned, same_day],
+        ['eliminada', 'sin_asignar', 'nueva', 'igual'],
+        default='movida',
+    )
+    diff['modificada'] = was_planned & is_present & (
+        (diff['poblacion'] != diff['poblacion_anterior']) | (diff['duracion'] != diff['duracion_anterior']))
+    
+    columns = ['cod_cliente', 'mantenimiento', 'ocurrencia', 'estado', 'modificada',
+               'poblacion_anterior', 'operario_anterior', 'semana_anterior', 'dia_anterior',
+               'poblacion', 'operario', 'semana', 'dia']
+    diff = diff[columns]
+    diff.loc[~is_planned, ['operario', 'semana', 'dia']] = None
+    for column in ('operario_anterior', 'semana_anterior', 'operario', 'semana'):
+        diff[column] = diff[column].astype('Int64')
+    return diff.sort_values(['cod_cliente', 'mantenimiento', 'ocurrencia'], ignore_index=True)
+
+
+def diff_counts(diff):
+    """Cuenta las tareas de cada estado de plan_diff (y las modificadas), para los resúmenes."""
+    counts = {state: 0 for state in ('igual', 'movida', 'nueva', 'eliminada', 'sin_asignar')}
+    counts.update({state: int(count) for state, count in diff['estado'].value_counts().items()})
+    counts['modificadas'] = int(diff['modificada'].sum())
+    return counts
+
+
+# Columnas del informe Excel (una hoja por operario)
+REPORT_COLUMNS = ['Semana', 'Dia', 'Fecha', 'Hora', 'Cliente', 'Poblacion',
+                  'Direccion', 'Tarea', 'Duracion', 'Tiempo_Viaje']
+
+
+def report_rows(table):
+    """Genera las filas del informe de un operario, como tuplas en el orden de REPORT_COLUMNS.
+    
+    table son las filas de plan_table de un solo operario. Por cada semana con
+    tareas hay un encabezado de semana y, por cada día con tareas, un
+    encabezado de día seguido de la salida de Vic, las visitas con la pausa
+    para comer y la vuelta a Vic. Las horas y duraciones se formatean por
+    columnas antes de recorrer las filas.
+    """
+    hours = format_column(table['inicio'].to_numpy(), format_hour)
+    end_hours = format_column(table['fin'].to_numpy(), format_hour)
+    lunch_hours = format_column(table['inicio_comida'].to_numpy(), format_hour)
+    durations = format_column(table['duracion'].to_numpy(), format_minutes)
+    travels = format_column(table['viaje'].to_numpy(), format_minutes)
+    returns = format_column(table['vuelta'].to_numpy(), format_minutes)
+    dates = format_column(table['fecha'].to_numpy(), lambda date: pd.Timestamp(date).strftime("%d/%m/%Y"))
+    sortida = format_hour(DAY_START)
+    lunch = f'{LUNCH_DURATION} min'
+    
+    # La última visita de cada día es la que va seguida de una visita de orden 0 (o la última fila)
+    orders = table['orden'].to_numpy()
+    last_of_day = np.append(orders[1:] == 0, True)
+    
+    columns = zip(table['semana'], table['dia'], orders, table['comida'], table['cliente'],
+                  table['poblacion'], table['direccion'], table['tarea'], dates, hours, end_hours,
+                  durations, travels, returns, lunch_hours, last_of_day)
+    current_week = None
+    for (week, day, order, comida, cliente, poblacion, direccion, tarea, date, hour, end_hour,
+         duration, travel, return_travel, dinar, last) in columns:
+        if order == 0:
+            # Añadir encabezado de semana
+            if week != current_week:
+                current_week = week
+                yield (f"SEMANA {week}", "", "", "", "", "", "", "", "", "")
+            
+            # Añadir encabezado de día y salida de Vic
+            yield ("", day, date, "", "", "", "", "", "", "")
+            yield ("", "", "", sortida, 'Eix Ambiental', 'Vic', '-', 'Sortida', '-', '-')
+        if comida:
+            yield ("", "", "", dinar, '-', '-', '-', 'Pausa per dinar', lunch, '-')
+        
+        yield ("", "", "", hour, cliente, poblacion, direccion, tarea, duration, travel)
+        
+        # Vuelta a Vic tras la última visita del día
+        if last:
+            yield ("", "", "", end_hour, 'Eix Ambiental', 'Vic', '-', 'Tornada', '-', return_travel)
+
+
+def timeline_report_rows(operario):
+    """Genera las filas del informe de un operario directamente de sus días de ruta.
+    
+    Da las mismas filas que report_rows sobre la tabla del plan, pero recorre
+    operario.active_days() y la timeline() de cada día sin construir ninguna
+    tabla, así que la memoria no depende del tamaño del plan.
+    """
+    sortida = format_hour(DAY_START)
+    lunch = f'{LUNCH_DURATION} min'
+    current_week = None
+    for route_day in operario.active_days():
+        # Añadir encabezado de semana
+        if route_day.week_number != current_week:
+            current_week = route_day.week_number
+            yield (f"SEMANA {current_week}", "", "", "", "", "", "", "", "", "")
+        
+        # Añadir encabezado de día
+        yield ("", route_day.day_name, route_day.date.strftime("%d/%m/%Y"), "", "", "", "", "", "", "")
+        for kind, minute, visit in route_day.timeline():
+            hour = format_hour(minute)
+            if kind == 'sortida':
+                yield ("", "", "", sortida, 'Eix Ambiental', 'Vic', '-', 'Sortida', '-', '-')
+            elif kind == 'dinar':
+                yield ("", "", "", hour, '-', '-', '-', 'Pausa per dinar', lunch, '-')
+            elif kind == 'visita':
+                yield ("", "", "", hour, visit.nombre_cliente, visit.poblacion, visit.direccion,
+                       visit.observaciones, format_minutes(visit.duracion), format_minutes(visit.travel_time))
+            else:
+                yield ("", "", "", hour, 'Eix Ambiental', 'Vic', '-', 'Tornada', '-',
+                       format_minutes(route_day.return_travel_time))
+
+
+def operario_tables(operarios, table=None):
+    """Devuelve [(operario_id, filas de plan_table)] de los operarios con tareas, en orden."""
+    if table is None:
+        table = plan_table(operarios)
+    return [(operario_id, rows) for operario_id, rows in table.groupby('operario', sort=False)]
+
+
+def create_excel_report(operarios, output_buffer, streaming=False, stats=None, table=None):
+    """Crea un informe Excel con las rutas generadas.
+    
+    Las filas salen de la tabla del plan (plan_table), que se construye si no se
+    pasa en table. Con streaming=True no se construye ninguna tabla: las filas
+    salen de la timeline() de cada día (timeline_report_rows) y se escriben
+    directamente en un libro de openpyxl en modo solo escritura, así que la
+    memoria no crece con el plan (table se ignora). Con un PlanningStats en stats
+    se mide la etapa "informe".
+    """
+    report_start = time.perf_counter()
+    try:
+        if streaming:
+            write_excel_report_streaming(operarios, output_buffer)
+            return True
+        
+        sheets = operario_tables(operarios, table)
+        
+        # Crear un ExcelWriter
+        with pd.ExcelWriter(output_buffer, engine='openpyxl') as writer:
+            # Para cada operario con tareas, crear una hoja
+            for operario_id, rows in sheets:
+                df = pd.DataFrame(list(report_rows(rows)), columns=REPORT_COLUMNS)
+                df.to_excel(writer, sheet_name=f'Operario {operario_id}', index=False)
+        
+        return True
+    
+    except Exception as e:
+        print(f"Error al crear el informe Excel: {e}")
+        return False
+    
+    finally:
+        if stats is not None:
+            stats.add_time("informe", time.perf_counter() - report_start)
+
+
+def write_excel_report_streaming(operarios, output_buffer):
+    """Escribe el informe fila a fila en un libro de openpyxl en modo solo escritura.
+    
+    Hay una hoja por operario con tareas y sus filas salen de timeline_report_rows.
+    """
+    from openpyxl import Workbook
+    from openpyxl.cell import WriteOnlyCell
+    from openpyxl.styles import Alignment, Border, Font, Side
+    
+    workbook = Workbook(write_only=True)
+    
+    # Mismo formato de encabezado que pandas
+    side = Side(style='thin')
+    header_font = Font(bold=True)
+    header_border = Border(left=side, right=side, top=side, bottom=side)
+    header_alignment = Alignment(horizontal='center', vertical='top')
+    
+    operarios = [operario for operario in operarios if any(route_day.visit_tasks
+                                                            for route_day in operario.route_days.values())]
+    if not operarios:
+        raise ValueError("No hay rutas con tareas para el informe")
+    
+    for operario in operarios:
+        sheet = workbook.create_sheet(f'Operario {operario.operario_id}')
+        header = []
+        for column in REPORT_COLUMNS:
+            cell = WriteOnlyCell(sheet, value=column)
+            cell.font = header_font
+            cell.border = header_border
+            cell.alignment = header_alignment
+            header.append(cell)
+        sheet.append(header)
+        
+        # Las celdas vacías no se escriben, igual que hace pandas
+        for row in timeline_report_rows(operario):
+            sheet.append([value if value != "" else None for value in row])
+    
+    workbook.save(output_buffer)
+
+
+def plan_summary(tasks, operarios, table=None):
+    """Devuelve el resumen de la planificación como diccionario serializable a JSON.
+    
+    Los totales salen de agrupar la tabla del plan, que se construye si no se
+    pasa en table.
+    """
+    if table is None:
+        table = plan_table(operarios)
+    totals = operario_totals(table, operarios)
+    
+    # Mismos componentes que plan_objective, sin volver a recorrer los días
+    travel = int(totals['minutos_viaje'].sum())
+    unassigned = sum(1 for task in tasks if not task.assigned)
+    imbalance = int(totals['minutos'].max() - totals['minutos'].min()) if len(totals) else 0
+    return {
+        'tareas': len(tasks),
+        'poblaciones': len(set(task.poblacion for task in tasks)),
+        'duracion_total': sum(task.duracion for task in tasks),
+        'asignadas': len(tasks) - unassigned,
+        'sin_asignar': unassigned,
+        'minutos_viaje': travel,
+        'desequilibrio': imbalance,
+        'objetivo': travel + UNASSIGNED_PENALTY * unassigned + IMBALANCE_WEIGHT * imbalance,
+        'operarios': [
+            {key: int(value) for key, value in row.items()}
+            for row in totals[['operario', 'tareas', 'dias', 'minutos', 'minutos_viaje']]
+            .to_dict('records')
+        ],
+    }
+
+
+def print_summary(tasks, operarios, table=None):
+    """Imprime un resumen de la planificación."""
+    if table is None:
+        table = plan_table(operarios)
+    
+    summary = []
+    summary.append("\n===== RESUMEN DE PLANIFICACIÓN =====")
+    summary.append(f"Total de tareas: {len(tasks)}")
+    summary.append(f"Poblaciones: {len(set(task.poblacion for task in tasks))}")
+    num_weeks = operarios[0].calendar.num_weeks if operarios else MAX_WEEKS
+    summary.append(f"Días de trabajo: {', '.join(WORK_DAYS)} (hasta {num_weeks} semanas)")
+    
+    total_minutes = sum(task.duracion for task in tasks)
+    summary.append(f"Duración total de tareas: {format_minutes(total_minutes)} (sin contar desplazamientos)")
+    
+    summary.append("\n--- Distribución por operario ---")
+    weeks = week_totals(table)
+    totals = operario_totals(table, operarios)
+    week_lines = {
+        operario_id: [
+            f"  Operario {operario_id} - Semana {week}: {week_tasks} tareas, {format_minutes(week_time)}"
+            for week, week_tasks, week_time in zip(rows['semana'], rows['tareas'], rows['minutos'])
+        ]
+        for operario_id, rows in weeks.groupby('operario', sort=False)
+    }
+    for operario_id, total_tasks, total_time in zip(totals['operario'], totals['tareas'], totals['minutos']):
+        summary.extend(week_lines.get(operario_id, []))
+        summary.append(f"  Operario {operario_id} - TOTAL: {total_tasks} tareas, {format_minutes(total_time)}")
+    
+    # Verificar si quedaron tareas sin asignar
+    unassigned = [task for task in tasks if not task.assigned]
+    if unassigned:
+        summary.append(f"\nAdvertencia: {len(unassigned)} tareas no pudieron ser asignadas")
+    
+    return "\n".join(summary)
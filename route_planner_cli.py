@@ -0,0 +1,318 @@
+"""Planificación por lotes de los Excel mensuales, sin navegador.
+
+Uso:
+    python route_planner_cli.py ENTRADAS... [-o DIRECTORIO] [-n OPERARIOS] [opciones]
+
+Cada entrada puede ser un archivo, un directorio (se usan todos sus
+.xlsx/.xls/.csv/.parquet) o un patrón glob. Los archivos se planifican en
+paralelo y, por cada uno, se escriben el informe Excel y un resumen JSON en el
+directorio de salida. Con --service URL se envían a un servicio de
+planificación (planning_service.py) en lugar de planificarse en procesos locales.
+
+Para que el arranque sea rápido, este módulo solo importa la biblioteca
+estándar: pandas, numpy y openpyxl se cargan en los procesos de trabajo cuando
+llega la etapa que los necesita.
+"""
+
+import argparse
+import contextlib
+import glob
+import io
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from datetime import datetime
+
+import planning_service
+import travel_times
+from planner_options import ASSIGNMENT_MODES, LOCATION_ORDERS
+
+# Las mismas extensiones que acepta route_planner.read_tasks_file
+INPUT_EXTENSIONS = (".xlsx", ".xlsm", ".xls", ".csv", ".parquet")
+
+
+def find_input_files(inputs):
+    """Expande archivos, directorios y patrones glob en una lista ordenada de archivos de tareas."""
+    files = []
+    for entry in inputs:
+        if os.path.isdir(entry):
+            candidates = [os.path.join(entry, name) for name in os.listdir(entry)]
+        elif os.path.isfile(entry):
+            candidates = [entry]
+        else:
+            candidates = glob.glob(entry, recursive=True)
+        
+        for path in candidates:
+            name = os.path.basename(path)
+            # Saltar los archivos temporales de Excel (~$...)
+            if os.path.isfile(path) and name.lower().endswith(INPUT_EXTENSIONS) and not name.startswith("~$"):
+                files.append(os.path.abspath(path))
+    
+    return sorted(set(files))
+
+
+def plan_file(path, output_dir, options):
+    """Planifica un archivo y escribe su informe y su resumen; devuelve el resumen."""
+    stem = os.path.splitext(os.path.basename(path))[0]
+    report_path = os.path.join(output_dir, f"{stem}_planificacion.xlsx")
+    summary_path = os.path.join(output_dir, f"{stem}_resumen.json")
+    plan_path = os.path.join(output_dir, f"{stem}_plan.json")
+    diff_path = os.path.join(output_dir, f"{stem}_cambios.csv")
+    summary = {'archivo': path, 'informe': None, 'estado': 'error', 'error': None, 'tiempos': {}}
+    timings = summary['tiempos']
+    
+    # Las advertencias del planificador se guardan en el resumen en lugar de mezclarse en la consola
+    log = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(log):
+            start = time.perf_counter()
+            import route_planner
+            timings['importar'] = time.perf_counter() - start
+            stats = route_planner.PlanningStats() if options['stats'] else None
+            
+            start = time.perf_counter()
+            tasks = route_planner.read_tasks_file(path, stats=stats)
+            timings['leer'] = time.perf_counter() - start
+            if not tasks:
+                raise ValueError("No se pudieron cargar tareas del archivo Excel. Verifique el formato.")
+            
+            if options['routing_url']:
+                start = time.perf_counter()
+                summary['rutas'] = use_road_travel_times(route_planner, tasks, options)
+                timings['rutas'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            calendar = route_planner.PlanningCalendar(options['start_date'], options['weeks'], options['holidays'])
+            if options['warm_start']:
+                saved_plan = route_planner.SavedPlan.from_file(options['warm_start'])
+                operarios, diff = route_planner.warm_start_routes(
+                    tasks, options['operarios'], saved_plan, calendar, stats=stats,
+                )
+                diff.to_csv(diff_path, index=False)
+                summary['cambios'] = route_planner.diff_counts(diff)
+                summary['informe_cambios'] = diff_path
+            else:
+                operarios = route_planner.generate_routes(
+                    tasks, options['operarios'], assignment=options['assignment'], calendar=calendar,
+                    stats=stats, location_order=options['location_order'],
+                )
+            if options['location_order'] != "alphabetical" and not options['warm_start']:
+                summary['agrupacion'] = route_planner.compare_location_orders(
+                    tasks, options['operarios'], options['assignment'], calendar,
+                )
+            if options['improve'] > 0:
+                summary['mejora'] = route_planner.improve_routes(operarios, options['improve'])
+            if options['resequence']:
+                summary['secuenciacion'] = route_planner.resequence_days(operarios)
+            timings['planificar'] = time.perf_counter() - start
+            
+            start = time.perf_counter()
+            table = route_planner.plan_table(operarios)
+            if not route_planner.create_excel_report(operarios, report_path, streaming=True, stats=stats,
+                                                     table=table):
+                raise RuntimeError("Error al crear el informe Excel")
+            timings['informe'] = time.perf_counter() - start
+            
+            summary.update(route_planner.plan_summary(tasks, operarios, table))
+            summary['resumen'] = route_planner.print_summary(tasks, operarios, table)
+            summary['informe'] = report_path
+            if options['save_plan']:
+                route_planner.SavedPlan.from_plan(operarios, table).save(plan_path)
+                summary['plan_guardado'] = plan_path
+            if stats is not None:
+                summary['estadisticas'] = stats.as_dict()
+            summary['estado'] = 'ok'
+    except Exception as e:
+        summary['error'] = f"{type(e).__name__}: {e}"
+    
+    summary['advertencias'] = [line for line in log.getvalue().splitlines() if line.strip()]
+    with open(summary_path, 'w', encoding='utf-8') as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+def plan_locally(files, output_dir, options, workers=None):
+    """Planifica los archivos en procesos locales; devuelve sus resúmenes según terminan."""
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(plan_file, path, output_dir, options) for path in files]
+        for future in as_completed(futures):
+            yield future.result()
+
+
+def plan_with_service(files, output_dir, options, url):
+    """Planifica los archivos en el servicio de planificación; devuelve sus resúmenes según terminan.
+    
+    Todos los archivos se envían primero (esperando si la cola del servicio está
+    llena) y luego se espera a cada uno. Se escriben los mismos archivos que con
+    plan_file.
+    """
+    client = planning_service.PlanningClient(url)
+    job_options = {name: options[name] for name in planning_service.JOB_OPTIONS}
+    if options['start_date'] is not None:
+        job_options['start_date'] = options['start_date'].strftime("%Y-%m-%d")
+    job_options['holidays'] = [day.strftime("%Y-%m-%d") for day in options['holidays']]
+    previous_plan = None
+    if options['warm_start']:
+        with open(options['warm_start'], 'rb') as f:
+            previous_plan = f.read()
+    
+    jobs = []
+    for path in files:
+        summary = {'archivo': path, 'informe': None, 'estado': 'error', 'error': None, 'tiempos': {}}
+        start = time.perf_counter()
+        try:
+            with open(path, 'rb') as f:
+                content = f.read()
+            while True:
+                try:
+                    job = client.submit(content, os.path.basename(path), job_options, previous_plan)
+                    break
+                except planning_service.PlanningServiceError as e:
+                    if e.status != 503:
+                        raise
+                    time.sleep(planning_service.POLL_INTERVAL)
+            jobs.append((path, summary, job['id'], start))
+        except (OSError, planning_service.PlanningServiceError) as e:
+            summary['error'] = f"{type(e).__name__}: {e}"
+            yield summary
+    
+    for path, summary, job_id, start in jobs:
+        stem = os.path.splitext(os.path.basename(path))[0]
+        outputs = [('informe', 'informe', f"{stem}_planificacion.xlsx")]
+        if options['save_plan']:
+            outputs.append(('plan', 'plan_guardado', f"{stem}_plan.json"))
+        if options['warm_start']:
+            outputs.append(('cambios', 'informe_cambios', f"{stem}_cambios.csv"))
+        try:
+            job = client.wait(job_id)
+            summary.update(job['resumen'])
+            summary['archivo'] = path
+            for part, key, name in outputs:
+                output_path = os.path.join(output_dir, name)
+                with open(output_path, 'wb') as f:
+                    f.write(client.download(job_id, part))
+                summary[key] = output_path
+            summary['tiempos']['servicio'] = time.perf_counter() - start
+            summary['estado'] = 'ok'
+        except (OSError, planning_service.PlanningServiceError) as e:
+            summary['estado'] = 'error'
+            summary['error'] = f"{type(e).__name__}: {e}"
+        with open(os.path.join(output_dir, f"{stem}_resumen.json"), 'w', encoding='utf-8') as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        yield summary
+
+
+def use_road_travel_times(route_planner, tasks, options):
+    """Activa los tiempos por carretera del servidor de rutas para las poblaciones de las tareas."""
+    travel_matrix = route_planner.get_travel_matrix()
+    if travel_matrix is None:
+        return {'peticiones': 0, 'pares_cache': 0, 'pares_pedidos': 0}
+    
+    server = travel_times.RoutingServerProvider(options['routing_url'], travel_times.coordinates_of(travel_matrix))
+    cache = travel_times.SQLiteTravelTimeCache(options['routing_cache'])
+    provider = travel_times.CachedTravelTimeProvider(server, cache)
+    locations = {task.poblacion for task in tasks}
+    route_planner.set_travel_matrix(travel_times.road_travel_matrix(locations, provider, travel_matrix))
+    return {'peticiones': server.requests, 'pares_cache': cache.hits, 'pares_pedidos': cache.misses}
+
+
+def parse_dates(value):
+    """Convierte una lista de fechas AAAA-MM-DD separadas por comas en datetimes."""
+    try:
+        return [datetime.strptime(day.strip(), "%Y-%m-%d") for day in value.split(",") if day.strip()]
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"fechas no válidas (AAAA-MM-DD separadas por comas): {value}") from None
+
+
+def parse_args(argv=None):
+    """Lee los argumentos de la línea de comandos."""
+    parser = argparse.ArgumentParser(
+        description="Planifica en lote los Excel mensuales de tareas de Eix Ambiental.",
+    )
+    parser.add_argument("inputs", nargs="+", help="archivos, directorios o patrones glob de entrada")
+    parser.add_argument("-o", "--output-dir", default="planificaciones",
+                        help="directorio de salida (por defecto: planificaciones)")
+    parser.add_argument("-n", "--operarios", type=int, default=1, help="número de operarios")
+    parser.add_argument("--weeks", type=int, default=4, help="semanas a planificar")
+    parser.add_argument("--start", type=lambda value: datetime.strptime(value, "%Y-%m-%d"),
+                        default=None, help="fecha de inicio (AAAA-MM-DD); por defecto, el primer lunes del mes")
+    parser.add_argument("--festius", type=parse_dates, default=[], metavar="FECHAS",
+                        help="festivos que no se planifican (AAAA-MM-DD separadas por comas)")
+    parser.add_argument("--assignment", choices=ASSIGNMENT_MODES, default="round_robin",
+                        help="modo de asignación de generate_routes")
+    parser.add_argument("--location-order", choices=LOCATION_ORDERS, default="alphabetical",
+                        help="orden de las poblaciones: alfabético o por zonas geográficas alrededor de Vic")
+    parser.add_argument("--improve", type=float, default=0,
+                        help="segundos de búsqueda local tras la asignación (0 = sin mejora)")
+    parser.add_argument("--resequence", action="store_true",
+                        help="reordena las visitas de cada día con el orden de menor viaje")
+    parser.add_argument("--warm-start", default=None, metavar="PLAN",
+                        help="parte del plan guardado del mes anterior (un _plan.json de --save-plan); "
+                             "solo se asignan las tareas nuevas o modificadas y se escribe un _cambios.csv")
+    parser.add_argument("--save-plan", action="store_true",
+                        help="guarda el plan de cada archivo (_plan.json) para usarlo con --warm-start")
+    parser.add_argument("-j", "--workers", type=int, default=None,
+                        help="procesos en paralelo (por defecto, uno por núcleo)")
+    parser.add_argument("--routing-url", default=None,
+                        help="URL de un servidor de rutas con la API table de OSRM para usar tiempos por carretera")
+    parser.add_argument("--routing-cache", default=None,
+                        help="archivo SQLite de la caché de tiempos por carretera (por defecto, .travel_cache)")
+    parser.add_argument("--stats", action="store_true",
+                        help="añade al resumen JSON los tiempos por etapa y los contadores del planificador")
+    parser.add_argument("--service", default=None, metavar="URL",
+                        help="envía los archivos a un servicio de planificación (planning_service.py serve) "
+                             "en lugar de planificarlos en procesos locales")
+    args = parser.parse_args(argv)
+    if args.service and args.routing_url:
+        parser.error("--routing-url no se puede usar con --service")
+    return args
+
+
+def main(argv=None):
+    """Punto de entrada de la línea de comandos."""
+    args = parse_args(argv)
+    files = find_input_files(args.inputs)
+    if not files:
+        print("No se han encontrado archivos Excel de entrada.", file=sys.stderr)
+        return 2
+    
+    os.makedirs(args.output_dir, exist_ok=True)
+    options = {
+        'operarios': args.operarios,
+        'weeks': args.weeks,
+        'start_date': args.start,
+        'holidays': args.festius,
+        'assignment': args.assignment,
+        'location_order': args.location_order,
+        'improve': args.improve,
+        'resequence': args.resequence,
+        'stats': args.stats,
+        'warm_start': args.warm_start,
+        'save_plan': args.save_plan,
+        'routing_url': args.routing_url,
+        'routing_cache': args.routing_cache or travel_times.CACHE_FILE,
+    }
+    
+    start = time.perf_counter()
+    failures = 0
+    if args.service:
+        summaries = plan_with_service(files, args.output_dir, options, args.service)
+    else:
+        summaries = plan_locally(files, args.output_dir, options, args.workers)
+    for summary in summaries:
+        name = os.path.basename(summary['archivo'])
+        if summary['estado'] == 'ok':
+            print(f"{name}: {summary['asignadas']}/{summary['tareas']} tareas asignadas, "
+                  f"{summary['minutos_viaje']} min de viaje -> {summary['informe']}")
+        else:
+            failures += 1
+            print(f"{name}: ERROR {summary['error']}", file=sys.stderr)
+    
+    print(f"{len(files) - failures}/{len(files)} archivos planificados en {time.perf_counter() - start:.1f}s")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
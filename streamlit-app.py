@@ -6,11 +6,325 @@ import os
 from datetime import datetime, timedelta
 import io
 import base64
+import hashlib
+import json
+import time
 
 # Importar funciones directamente del archivo route_planner.py
-from route_planner import (read_excel_data, generate_routes, 
-                           create_excel_report, print_summary, 
-                           MAX_WEEKS, Task, Operario, RouteDayWeek)import streamlit as st
+from route_planner import (read_tasks_file, generate_routes, create_excel_report, MAX_WEEKS,
+                           PlanningCalendar, first_monday_of_month,
+                           ASSIGNMENT_MODES, LOCATION_ORDERS, improve_routes,
+                           compare_location_orders, resequence_days, format_hour,
+                           PlanningStats, plan_table, unassigned_table,
+                           week_totals, day_totals, format_column, report_rows,
+                           REPORT_COLUMNS, WORK_DAYS, MINUTES_PER_DAY, AnytimePlanner,
+                           SavedPlan, warm_start_routes, diff_counts, restore_routes, plan_diff)
+from planning_service import PlanningClient, PlanningServiceError
+
+# Límites de las cachés (compartidas por todas las sesiones del servidor)
+TASKS_CACHE_ENTRIES = 8
+PLANS_CACHE_ENTRIES = 32
+REPORTS_CACHE_ENTRIES = 8
+
+# Filas por página en las tablas de resultados
+PAGE_ROWS = 200
+
+# Segundos entre actualizaciones de la página mientras hay una optimización continua en marcha
+ANYTIME_REFRESH_SECONDS = 2
+# La optimización continua se detiene sola tras ANYTIME_TIME_LIMIT_SECONDS o si la página deja de
+# actualizarse durante ANYTIME_IDLE_SECONDS (la sesión se ha cerrado)
+ANYTIME_TIME_LIMIT_SECONDS = 600
+ANYTIME_IDLE_SECONDS = 60
+
+# Servicio de planificación (planning_service.py); vacío para planificar en la propia sesión
+PLANNING_SERVICE_URL = os.environ.get("PLANNING_SERVICE_URL", "")
+SERVICE_TIMEOUT_SECONDS = 600
+IMPROVE_SECONDS = 5.0  # Búsqueda local de "Mejorar rutas", el tiempo por defecto de improve_routes
+
+# Formato de las columnas de minutos en las tablas de resultados
+MINUTES_COLUMNS = {
+    "Duración": st.column_config.NumberColumn("Duración", format="%d min"),
+    "Viaje": st.column_config.NumberColumn("Viaje", format="%d min"),
+}
+
+
+@st.cache_data(max_entries=TASKS_CACHE_ENTRIES, show_spinner=False)
+def load_tasks(file_hash, file_name, _file_bytes):
+    """Lee las tareas del archivo (Excel, CSV o Parquet), cacheadas por el hash del contenido."""
+    return read_tasks_file(io.BytesIO(_file_bytes), file_name)
+
+
+@st.cache_resource(max_entries=PLANS_CACHE_ENTRIES, show_spinner=False)
+def load_plan(file_hash, file_name, num_operarios, start_date, num_weeks, holidays, assignment, location_order,
+              improve, resequence, collect_stats, warm_hash, _file_bytes, _saved_plan=None):
+    """Genera la planificación, cacheada por archivo y opciones del planificador.
+    
+    El resultado se comparte entre sesiones y solo se usa para mostrarlo. Con
+    collect_stats se lee el Excel sin pasar por la caché de tareas, para que los
+    tiempos de lectura de las estadísticas sean reales. Con un plan guardado
+    (_saved_plan, identificado por warm_hash) se parte de él con
+    warm_start_routes en lugar de generate_routes.
+    """
+    stats = PlanningStats() if collect_stats else None
+    if stats is not None:
+        tasks = read_tasks_file(io.BytesIO(_file_bytes), file_name, stats=stats)
+    else:
+        # load_tasks devuelve una copia nueva, así que marcar tareas asignadas no afecta a otros planes
+        tasks = load_tasks(file_hash, file_name, _file_bytes)
+    calendar = PlanningCalendar(start_date, num_weeks, holidays)
+    clustering = None
+    diff = None
+    if _saved_plan is not None:
+        operarios, diff = warm_start_routes(tasks, num_operarios, _saved_plan, calendar, stats=stats)
+    else:
+        clustering = (compare_location_orders(tasks, num_operarios, assignment, calendar)
+                      if location_order != "alphabetical" else None)
+        operarios = generate_routes(tasks, num_operarios, assignment=assignment, calendar=calendar, stats=stats,
+                                    location_order=location_order)
+    improvement = improve_routes(operarios) if improve else None
+    sequencing = resequence_days(operarios) if resequence else None
+    table = plan_table(operarios)
+    return {
+        'tasks': tasks,
+        'operarios': operarios,
+        'table': table,
+        'views': plan_views(table, unassigned_table(tasks)),
+        'improvement': improvement,
+        'sequencing': sequencing,
+        'clustering': clustering,
+        'diff': diff,
+        'stats': stats,
+    }
+
+
+@st.cache_resource(max_entries=PLANS_CACHE_ENTRIES, show_spinner=False)
+def load_service_plan(service_url, file_hash, file_name, num_operarios, start_date, num_weeks, holidays,
+                      assignment, location_order, improve, resequence, warm_hash, _file_bytes, _saved_plan=None,
+                      _warm_bytes=None):
+    """Genera la planificación en el servicio de planificación, con la misma forma que load_plan.
+    
+    El servicio planifica en sus propios procesos, así que esta sesión solo lee
+    las tareas y las coloca en el plan devuelto con restore_routes. Incluye el
+    informe Excel del servicio en 'report'. Lanza PlanningServiceError si el
+    servicio no responde o el trabajo falla.
+    """
+    client = PlanningClient(service_url)
+    job = client.submit(_file_bytes, file_name, {
+        'operarios': num_operarios,
+        'weeks': num_weeks,
+        'start_date': start_date.strftime("%Y-%m-%d"),
+        'holidays': [day.strftime("%Y-%m-%d") for day in holidays],
+        'assignment': assignment,
+        'location_order': location_order,
+        'improve': IMPROVE_SECONDS if improve else 0,
+        'resequence': resequence,
+    }, _warm_bytes)
+    job = client.wait(job['id'], timeout=SERVICE_TIMEOUT_SECONDS)
+    summary = job['resumen']
+    saved_plan = SavedPlan.from_bytes(client.download(job['id'], 'plan'))
+    
+    tasks = load_tasks(file_hash, file_name, _file_bytes)
+    operarios = restore_routes(tasks, num_operarios, saved_plan, PlanningCalendar(start_date, num_weeks, holidays))
+    table = plan_table(operarios)
+    return {
+        'tasks': tasks,
+        'operarios': operarios,
+        'table': table,
+        'views': plan_views(table, unassigned_table(tasks)),
+        'improvement': summary.get('mejora'),
+        'sequencing': summary.get('secuenciacion'),
+        'clustering': summary.get('agrupacion'),
+        'diff': plan_diff(_saved_plan, tasks, operarios) if _saved_plan is not None else None,
+        'stats': None,
+        'report': client.download(job['id'], 'informe'),
+    }
+
+
+@st.cache_data(max_entries=REPORTS_CACHE_ENTRIES, show_spinner=False)
+def build_report(plan_key, _operarios, collect_stats=False):
+    """Genera el informe Excel de un plan, cacheado por la clave del plan.
+    
+    Devuelve (informe, segundos): con collect_stats, el tiempo de la etapa
+    "informe" se mide en un PlanningStats propio, para no modificar las
+    estadísticas del plan cacheado; sin él, los segundos son None.
+    """
+    stats = PlanningStats() if collect_stats else None
+    output = io.BytesIO()
+    if not create_excel_report(_operarios, output, streaming=True, stats=stats):
+        return None, None
+    return output.getvalue(), stats.stages.get("informe") if stats is not None else None
+
+
+@st.cache_data(max_entries=REPORTS_CACHE_ENTRIES, show_spinner=False)
+def build_plan_file(plan_key, _operarios, _table):
+    """Genera el plan guardado (JSON) de un plan, para partir de él el mes siguiente."""
+    return SavedPlan.from_plan(_operarios, _table).to_bytes()
+
+
+@st.cache_data(max_entries=TASKS_CACHE_ENTRIES, show_spinner=False)
+def load_saved_plan(warm_hash, _warm_bytes):
+    """Lee un plan guardado, cacheado por el hash del archivo; devuelve (plan, mensaje de error)."""
+    try:
+        return SavedPlan.from_bytes(_warm_bytes), None
+    except (ValueError, KeyError) as e:
+        return None, str(e)
+
+
+def parse_holidays(text):
+    """Convierte fechas dd/mm/aaaa separadas por comas en una tupla ordenada de fechas.
+    
+    Lanza ValueError si alguna fecha no es válida.
+    """
+    days = {datetime.strptime(day.strip(), "%d/%m/%Y").date() for day in text.split(",") if day.strip()}
+    return tuple(sorted(days))
+
+
+def format_duration(minutes):
+    """Formatea una columna de minutos como "Xh Ymin"."""
+    return (minutes // 60).astype(str) + "h " + (minutes % 60).astype(str) + "min"
+
+
+def plan_views(table, unassigned):
+    """Prepara una sola vez, por columnas, las tablas que se muestran de un plan.
+    
+    Devuelve las visitas (una fila por visita, con las columnas por las que se
+    filtra), los totales por operario y semana, los días con tareas (para
+    elegir el detalle) y las tareas sin asignar.
+    """
+    has_window = ((table['franja_inicio'] > 0) | (table['franja_fin'] < MINUTES_PER_DAY)).to_numpy()
+    windows = (format_column(table['franja_inicio'].to_numpy(), format_hour) + "-"
+               + format_column(table['franja_fin'].to_numpy(), format_hour))
+    visits = pd.DataFrame({
+        "Operario": table['operario'].to_numpy(),
+        "Semana": table['semana'].to_numpy(),
+        "Día": table['dia'].to_numpy(),
+        "Fecha": format_column(table['fecha'].to_numpy(), lambda date: pd.Timestamp(date).strftime("%d/%m/%Y")),
+        "Hora": format_column(table['inicio'].to_numpy(), format_hour),
+        "Fin": format_column(table['fin'].to_numpy(), format_hour),
+        "Cliente": table['cliente'].to_numpy(),
+        "Población": table['poblacion'].to_numpy(),
+        "Dirección": table['direccion'].to_numpy(),
+        "Tarea": table['tarea'].to_numpy(),
+        "Duración": table['duracion'].to_numpy(),
+        "Viaje": table['viaje'].to_numpy(),
+        "Franja": np.where(has_window, windows, ""),
+    })
+    
+    weeks = week_totals(table)
+    week_view = pd.DataFrame({
+        "Operario": weeks['operario'].to_numpy(),
+        "Semana": weeks['semana'].to_numpy(),
+        "Días": weeks['dias'].to_numpy(),
+        "Tareas": weeks['tareas'].to_numpy(),
+        "Tiempo Total": format_duration(weeks['minutos']).to_numpy(),
+        "Viaje": format_duration(weeks['minutos_viaje']).to_numpy(),
+    })
+    
+    days = day_totals(table)
+    days['etiqueta'] = ("Operario " + days['operario'].astype(str) + " - " + days['dia']
+                        + " (Semana " + days['semana'].astype(str) + " - "
+                        + days['fecha'].dt.strftime("%d/%m/%Y") + ")")
+    
+    unassigned_view = pd.DataFrame({
+        "Cliente": unassigned['cliente'].to_numpy(),
+        "Población": unassigned['poblacion'].to_numpy(),
+        "Dirección": unassigned['direccion'].to_numpy(),
+        "Tarea": unassigned['tarea'].to_numpy(),
+        "Duración": unassigned['duracion'].to_numpy(),
+    })
+    return {'visits': visits, 'weeks': week_view, 'days': days, 'unassigned': unassigned_view}
+
+
+def show_paginated(df, key, **kwargs):
+    """Muestra un DataFrame en un solo st.dataframe, de PAGE_ROWS en PAGE_ROWS filas.
+    
+    Solo se envía al navegador la página elegida, así que el coste de dibujarla
+    no depende del tamaño de la tabla. La clave del selector de página incluye
+    el número de filas para volver a la primera página al cambiar los filtros.
+    """
+    pages = max(1, -(-len(df) // PAGE_ROWS))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Página (de {pages})", min_value=1, max_value=pages, value=1,
+                               key=f"{key}_page_{len(df)}")
+    st.dataframe(df.iloc[(page - 1) * PAGE_ROWS:page * PAGE_ROWS], hide_index=True,
+                 use_container_width=True, **kwargs)
+    st.caption(f"{len(df)} filas")
+
+
+def show_stats_panel(stats, report_seconds=None):
+    """Muestra en la barra lateral los tiempos por etapa y los contadores del planificador.
+    
+    report_seconds es el tiempo del informe, si se ha generado (ver build_report).
+    """
+    data = stats.as_dict()
+    if report_seconds is not None:
+        data['etapas']["informe"] = report_seconds
+    with st.sidebar:
+        st.header("Estadísticas")
+        st.table(pd.DataFrame(
+            [{"Etapa": name, "Tiempo (ms)": f"{seconds * 1000:.1f}"} for name, seconds in data['etapas'].items()]
+        ))
+        st.metric("Intentos por tarea", f"{data['intentos_por_tarea']:.1f}", help=f"Máximo: {data['max_intentos']}")
+        st.table(pd.DataFrame([
+            {"Contador": "Rechazos por capacidad", "Valor": data['rechazos_capacidad']},
+            {"Contador": "Consultas de tiempo de viaje", "Valor": data['consultas_viaje']},
+            {"Contador": "Vueltas del cursor de días", "Valor": data['vueltas_cursor']},
+            {"Contador": "Tareas sin asignar", "Valor": data['sin_asignar']},
+        ]))
+        st.download_button(
+            label="Descargar estadísticas (JSON)",
+            data=json.dumps(data, ensure_ascii=False, indent=2),
+            file_name="estadisticas_planificacion.json",
+            mime="application/json",
+        )
+
+
+def best_anytime_plan(anytime):
+    """Devuelve el mejor plan de la optimización continua, con sus tablas recalculadas solo si ha cambiado."""
+    cached = st.session_state.get('anytime_plan')
+    if cached is None or cached['planner'] is not anytime or cached['version'] != anytime.version:
+        version, tasks, operarios = anytime.best_plan()
+        table = plan_table(operarios)
+        cached = {
+            'planner': anytime,
+            'version': version,
+            'operarios': operarios,
+            'table': table,
+            'views': plan_views(table, unassigned_table(tasks)),
+        }
+        st.session_state['anytime_plan'] = cached
+    return cached
+
+
+def show_anytime_progress(anytime):
+    """Muestra el progreso de la optimización continua y el botón para detenerla."""
+    progress = anytime.progress()
+    initial, best = progress['initial'], progress['best']
+    col1, col2, col3, col4 = st.columns(4)
+    col1.metric("Rondas", progress['rounds'], help=f"Planes mejores encontrados: {progress['version']}")
+    col2.metric("Viaje", f"{best['travel']} min", delta=best['travel'] - initial['travel'], delta_color="inverse")
+    col3.metric("Sin asignar", best['unassigned'], delta=best['unassigned'] - initial['unassigned'],
+                delta_color="inverse")
+    col4.metric("Desequilibrio", f"{best['imbalance']} min", delta=best['imbalance'] - initial['imbalance'],
+                delta_color="inverse")
+    if len(progress['history']) > 1:
+        st.line_chart(pd.DataFrame(progress['history'], columns=["Segundos", "Objetivo"]).set_index("Segundos"))
+    
+    if progress['error']:
+        st.error(f"La optimización continua se ha detenido por un error: {progress['error']}")
+    if progress['running']:
+        st.caption(f"Buscando desde hace {progress['elapsed_seconds']:.0f} s. "
+                   f"Se muestra el mejor plan encontrado hasta ahora.")
+        if st.button("Detener optimización"):
+            anytime.stop()
+            st.rerun()
+    elif progress['stop_reason'] == 'tiempo':
+        st.caption(f"Optimización detenida al llegar al límite de {ANYTIME_TIME_LIMIT_SECONDS // 60} minutos. "
+                   f"Se muestra el mejor plan encontrado.")
+    else:
+        st.caption("Optimización detenida. Se muestra el mejor plan encontrado.")
+
 
 # Configuración de la página
 st.set_page_config(
@@ -31,23 +345,57 @@ with st.sidebar:
     st.header("Configuración")
     
     # Carga de archivo
-    uploaded_file = st.file_uploader("Cargar archivo Excel", type=["xlsx", "xls"])
+    uploaded_file = st.file_uploader("Cargar archivo Excel", type=["xlsx", "xls", "csv", "parquet"],
+                                     help="También se admiten CSV y Parquet con las mismas columnas que el Excel")
+    
+    # Plan guardado del mes anterior (opcional): solo se asignan las tareas nuevas o modificadas
+    warm_file = st.file_uploader("Plan del mes anterior (opcional)", type=["json"])
     
     # Número de operarios
     num_operarios = st.radio("Número de operarios", [1, 2, 3], horizontal=True)
     
+    # Horizonte de planificación
+    start_date = st.date_input("Inicio de la planificación", first_monday_of_month(datetime.now()))
+    num_weeks = st.number_input("Semanas a planificar", min_value=1, max_value=26, value=MAX_WEEKS)
+    holidays_text = st.text_input("Festivos", placeholder="dd/mm/aaaa, dd/mm/aaaa",
+                                  help="Días que no se planifican, separados por comas")
+    try:
+        holidays = parse_holidays(holidays_text)
+    except ValueError:
+        st.error("Festivos no válidos: escriba fechas dd/mm/aaaa separadas por comas")
+        holidays = ()
+    
+    # Opciones del planificador
+    assignment = st.selectbox("Modo de asignación", ASSIGNMENT_MODES)
+    location_order = st.selectbox("Orden de las poblaciones", LOCATION_ORDERS)
+    improve = st.checkbox("Mejorar rutas (búsqueda local)")
+    resequence = st.checkbox("Reordenar las visitas de cada día")
+    collect_stats = st.checkbox("Mostrar estadísticas del planificador")
+    service_url = st.text_input("Servicio de planificación (opcional)", PLANNING_SERVICE_URL,
+                                help="URL de planning_service.py; las planificaciones se calculan allí en lugar "
+                                     "de en esta sesión (salvo con estadísticas, que miden esta sesión)")
+    
     # Información
-    st.info(f"Las tareas se planificarán de lunes a jueves, hasta un máximo de {MAX_WEEKS} semanas.")
+    st.info(f"Las tareas se planificarán de lunes a jueves, hasta un máximo de {num_weeks} semanas.")
     
     # Botón para generar
     generate_button = st.button("Generar Planificación", type="primary", disabled=not uploaded_file)
 
+# Hash del archivo cargado: la planificación se sigue mostrando en las siguientes
+# ejecuciones (al cambiar opciones o descargar) mientras no cambie el archivo
+file_hash = None
+if uploaded_file:
+    file_bytes = uploaded_file.getvalue()
+    file_hash = hashlib.sha256(file_bytes).hexdigest()
+    if generate_button:
+        st.session_state['planned_file'] = file_hash
+
 # Área principal para resultados
-if uploaded_file and generate_button:
+refresh = False
+if file_hash and st.session_state.get('planned_file') == file_hash:
     with st.spinner("Procesando el archivo Excel..."):
         # Leer datos
-        df = pd.read_excel(uploaded_file, header=None)
-        tasks = read_excel_data(df)
+        tasks = load_tasks(file_hash, uploaded_file.name, file_bytes)
         
         if tasks:
             # Mostrar información de tareas cargadas
@@ -55,7 +403,82 @@ if uploaded_file and generate_button:
             
             # Generar rutas
             with st.spinner(f"Generando planificación para {num_operarios} operarios..."):
-                operarios = generate_routes(tasks, num_operarios)
+                saved_plan, warm_hash, warm_bytes = None, None, None
+                if warm_file is not None:
+                    warm_bytes = warm_file.getvalue()
+                    warm_hash = hashlib.sha256(warm_bytes).hexdigest()
+                    saved_plan, warm_error = load_saved_plan(warm_hash, warm_bytes)
+                    if warm_error:
+                        st.error(f"No se puede usar el plan del mes anterior: {warm_error}")
+                        warm_hash, warm_bytes = None, None
+                plan_key = (file_hash, uploaded_file.name, num_operarios, start_date, int(num_weeks), holidays,
+                            assignment, location_order, improve, resequence, collect_stats, warm_hash)
+                plan = None
+                if service_url and not collect_stats:
+                    try:
+                        plan = load_service_plan(service_url, file_hash, uploaded_file.name, num_operarios, start_date,
+                                                 int(num_weeks), holidays, assignment, location_order, improve,
+                                                 resequence, warm_hash, file_bytes, saved_plan, warm_bytes)
+                    except (PlanningServiceError, TimeoutError) as e:
+                        st.warning(f"No se ha podido usar el servicio de planificación ({e}); "
+                                   f"se planifica en esta sesión.")
+                if plan is None:
+                    plan = load_plan(*plan_key, file_bytes, saved_plan)
+                operarios = plan['operarios']
+            
+            if plan['clustering']:
+                st.info(f"La agrupación por zonas geográficas ha reducido el desplazamiento en "
+                        f"{plan['clustering']['travel_saved']} minutos respecto al orden alfabético")
+            
+            if plan['diff'] is not None:
+                counts = diff_counts(plan['diff'])
+                st.info(f"Respecto al mes anterior: {counts['igual']} tareas en el mismo día, "
+                        f"{counts['movida']} movidas, {counts['nueva']} nuevas y {counts['eliminada']} eliminadas")
+                with st.expander("Ver cambios respecto al mes anterior"):
+                    show_paginated(plan['diff'][plan['diff']['estado'] != 'igual'], "diff")
+            
+            if plan['improvement']:
+                st.info(f"La búsqueda local ha reducido el desplazamiento en "
+                        f"{plan['improvement']['travel_saved']} minutos")
+            
+            if plan['sequencing']:
+                st.info(f"El reordenamiento de {plan['sequencing']['days_changed']} días ha reducido el "
+                        f"desplazamiento en {plan['sequencing']['travel_saved']} minutos")
+            
+            # Optimización continua en segundo plano (una por sesión, ligada al plan generado)
+            anytime = st.session_state.get('anytime')
+            if anytime is not None and st.session_state.get('anytime_key') != plan_key:
+                anytime.stop()
+                anytime = None
+                st.session_state.pop('anytime', None)
+                st.session_state.pop('anytime_plan', None)
+            
+            st.subheader("Optimización continua")
+            if anytime is None:
+                st.caption("Sigue mejorando el plan en segundo plano con nuevos arranques y búsqueda local. "
+                           "Cada ronda aplica siempre la búsqueda local y el reordenamiento de las visitas, "
+                           "aunque no estén marcados.")
+                if plan['diff'] is not None:
+                    st.caption("Las rondas planifican desde cero: no parten del plan del mes anterior, así que "
+                               "el mejor plan puede mover más tareas de día que el plan inicial.")
+                if st.button("Optimizar en segundo plano"):
+                    anytime = AnytimePlanner(plan['tasks'], operarios, assignment, location_order,
+                                             time_limit=ANYTIME_TIME_LIMIT_SECONDS,
+                                             idle_timeout=ANYTIME_IDLE_SECONDS)
+                    anytime.start()
+                    st.session_state['anytime'] = anytime
+                    st.session_state['anytime_key'] = plan_key
+            if anytime is not None:
+                show_anytime_progress(anytime)
+                refresh = anytime.running
+                
+                # A partir de aquí se muestra y se descarga el mejor plan encontrado
+                best = best_anytime_plan(anytime)
+                operarios = best['operarios']
+                plan = {**plan, 'table': best['table'], 'views': best['views']}
+                report_key = plan_key + (best['version'],)
+            else:
+                report_key = plan_key
             
             # Mostrar resumen
             st.subheader("Resumen de Planificación")
@@ -74,93 +497,97 @@ if uploaded_file and generate_button:
                 st.metric("Duración total", f"{hours}h {minutes}min")
                 st.metric("Días de trabajo", "Lunes a Jueves")
             
-            # Crear y descargar Excel
-            with st.spinner("Generando informe Excel..."):
-                # Crear Excel en memoria
-                output = io.BytesIO()
-                success = create_excel_report(operarios, output)
+            # Crear y descargar Excel (solo cuando se pide)
+            report_seconds = None
+            if st.button("Preparar informe Excel"):
+                st.session_state['report_plan'] = plan_key
+            
+            if st.session_state.get('report_plan') == plan_key:
+                with st.spinner("Generando informe Excel..."):
+                    # El informe del servicio solo vale para el plan tal como lo devolvió
+                    report = plan.get('report') if report_key == plan_key else None
+                    if report is None:
+                        report, report_seconds = build_report(report_key, operarios, plan['stats'] is not None)
                 
-                if success:
+                if report:
                     # Botón para descargar el Excel
-                    output.seek(0)
                     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
                     excel_filename = f"Planificacion_Rutas_{timestamp}.xlsx"
                     
                     st.download_button(
                         label="📥 Descargar Planificación Excel",
-                        data=output,
+                        data=report,
                         file_name=excel_filename,
                         mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
                     )
             
-            # Mostrar distribución por operario
+            # Plan guardado para partir de él el mes siguiente
+            st.download_button(
+                label="Descargar plan (para el mes siguiente)",
+                data=build_plan_file(report_key, operarios, plan['table']),
+                file_name=f"Plan_{start_date:%Y%m%d}.json",
+                mime="application/json",
+            )
+            
+            # Resultados: tablas precalculadas del plan, filtradas y paginadas
+            views = plan['views']
+            visits = views['visits']
+            
             st.subheader("Distribución por Operario")
+            st.dataframe(views['weeks'], hide_index=True, use_container_width=True)
             
-            for operario in operarios:
-                with st.expander(f"Operario {operario.operario_id}", expanded=True):
-                    # Crear una tabla para este operario
-                    op_data = []
-                    total_tasks = 0
-                    
-                    # Obtener datos por semana
-                    for week in range(1, MAX_WEEKS + 1):
-                        week_tasks = sum(len(day.tasks) for day in operario.weeks[week].values())
-                        week_time = sum(day.total_time for day in operario.weeks[week].values())
-                        
-                        if week_tasks > 0:
-                            hours = week_time // 60
-                            minutes = week_time % 60
-                            op_data.append({
-                                "Semana": f"Semana {week}",
-                                "Tareas": week_tasks,
-                                "Tiempo Total": f"{hours}h {minutes}min"
-                            })
-                            total_tasks += week_tasks
-                    
-                    # Añadir fila de total
-                    if op_data:
-                        op_df = pd.DataFrame(op_data)
-                        st.table(op_df)
-                        
-                        # Detalle por día
-                        st.write("Detalle por día:")
-                        for week in range(1, MAX_WEEKS + 1):
-                            for day_name in ["Lunes", "Martes", "Miércoles", "Jueves"]:
-                                day_route = operario.weeks[week][day_name]
-                                if day_route.tasks:
-                                    with st.expander(f"{day_name} (Semana {week} - {day_route.date_str})"):
-                                        day_data = []
-                                        for task in day_route.tasks:
-                                            day_data.append({
-                                                "Hora": task.start_time.strftime("%H:%M"),
-                                                "Cliente": task.nombre_cliente,
-                                                "Población": task.poblacion,
-                                                "Tarea": task.observaciones,
-                                                "Duración": f"{task.duracion} min"
-                                            })
-                                        if day_data:
-                                            st.table(pd.DataFrame(day_data))
-                    else:
-                        st.write("No hay tareas asignadas para este operario.")
+            st.subheader("Visitas")
+            col1, col2, col3 = st.columns(3)
+            with col1:
+                operario_filter = st.multiselect("Operario", [operario.operario_id for operario in operarios],
+                                                 key="filter_operario")
+            with col2:
+                week_filter = st.multiselect("Semana", sorted(visits["Semana"].unique().tolist()),
+                                             key="filter_semana")
+            with col3:
+                day_filter = st.multiselect("Día", WORK_DAYS, key="filter_dia")
+            
+            days = views['days']
+            visit_mask = np.ones(len(visits), dtype=bool)
+            day_mask = np.ones(len(days), dtype=bool)
+            for values, visit_column, day_column in ((operario_filter, "Operario", 'operario'),
+                                                     (week_filter, "Semana", 'semana'),
+                                                     (day_filter, "Día", 'dia')):
+                if values:
+                    visit_mask &= visits[visit_column].isin(values).to_numpy()
+                    day_mask &= days[day_column].isin(values).to_numpy()
+            show_paginated(visits[visit_mask], "visits", column_config=MINUTES_COLUMNS)
+            
+            # Detalle de un día, solo cuando se pide
+            filtered_days = days[day_mask]
+            day_label = st.selectbox("Detalle de un día", filtered_days['etiqueta'], index=None,
+                                     placeholder="Elegir un día...")
+            if day_label is not None:
+                day = filtered_days[filtered_days['etiqueta'] == day_label].iloc[0]
+                table = plan['table']
+                day_rows = table[(table['operario'] == day['operario']) & (table['fecha'] == day['fecha'])]
+                detail = pd.DataFrame(list(report_rows(day_rows)), columns=REPORT_COLUMNS)
+                st.dataframe(detail.iloc[2:, 3:], hide_index=True, use_container_width=True)
+                st.caption(f"{day['tareas']} tareas, {day['minutos'] // 60}h {day['minutos'] % 60}min de jornada, "
+                           f"{day['minutos_viaje']} min de viaje")
+            
+            if plan['stats'] is not None:
+                show_stats_panel(plan['stats'], report_seconds)
             
             # Verificar si quedaron tareas sin asignar
-            unassigned = [task for task in tasks if not task.assigned]
-            if unassigned:
+            unassigned = views['unassigned']
+            if len(unassigned):
                 st.warning(f"{len(unassigned)} tareas no pudieron ser asignadas")
                 with st.expander("Ver tareas no asignadas"):
-                    unassigned_data = []
-                    for task in unassigned:
-                        unassigned_data.append({
-                            "Cliente": task.nombre_cliente,
-                            "Población": task.poblacion,
-                            "Dirección": task.direccion,
-                            "Tarea": task.observaciones,
-                            "Duración": f"{task.duracion} min"
-                        })
-                    st.table(pd.DataFrame(unassigned_data))
+                    show_paginated(unassigned, "unassigned", column_config=MINUTES_COLUMNS)
         else:
             st.error("No se pudieron cargar tareas del archivo Excel. Verifique el formato.")
 
 # Footer
 st.markdown("---")
 st.caption("Planificador de Rutas - Eix Ambiental © 2025")
+
+# Mientras la optimización continua siga en marcha, volver a dibujar la página con el mejor plan
+if refresh:
+    time.sleep(ANYTIME_REFRESH_SECONDS)
+    st.rerun()
@@ -0,0 +1,115 @@
+"""Pruebas de la aplicación Streamlit con un archivo de tareas sintético."""
+
+import io
+import os
+
+import pandas as pd
+import pytest
+import streamlit as st
+from streamlit.testing.v1 import AppTest
+
+from benchmarks import generate_synthetic_tasks
+
+APP_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "streamlit-app.py")
+PAGE_ROWS = 200  # Filas por página de la aplicación
+
+
+@pytest.fixture
+def app(monkeypatch):
+    """Devuelve una función que abre la aplicación con un CSV sintético de rows filas ya planificado."""
+    st.cache_data.clear()
+    st.cache_resource.clear()
+    
+    def open_app(rows, operarios=3):
+        content = generate_synthetic_tasks(rows, 20, 5).to_csv(header=False, index=False).encode('utf-8')
+    
+        class Upload(io.BytesIO):
+            name = "mes.csv"
+    
+        # AppTest no simula la subida de archivos: solo se sube el de tareas
+        monkeypatch.setattr(st, 'file_uploader',
+                            lambda label, *args, **kwargs: Upload(content) if label == "Cargar archivo Excel" else None)
+        at = AppTest.from_file(APP_FILE, default_timeout=120).run()
+        at.radio[0].set_value(operarios)
+        at.button[0].click()
+        at.run()
+        assert not at.exception
+        return at
+    
+    return open_app
+
+
+def page_selector(at):
+    """Selector de página de la tabla de visitas (None si cabe en una página)."""
+    return next((widget for widget in at.number_input if widget.label.startswith("Página")), None)
+
+
+def visits_caption(at):
+    """Número de filas de la tabla de visitas, según su pie."""
+    return next(int(caption.value.split()[0]) for caption in at.caption if caption.value.endswith(" filas"))
+
+
+def test_visits_are_shown_one_page_at_a_time(app):
+    at = app(700)
+    total = visits_caption(at)
+    pages = -(-total // PAGE_ROWS)
+    assert pages >= 2
+    assert page_selector(at).label == f"Página (de {pages})"
+    assert len(at.dataframe[1].value) == PAGE_ROWS
+    
+    shown = []
+    for page in range(1, pages + 1):
+        page_selector(at).set_value(page)
+        at.run()
+        shown.append(at.dataframe[1].value)
+    shown = pd.concat(shown)
+    assert len(shown) == total
+    assert not shown.duplicated().any()
+
+
+def test_filters_return_to_the_first_page(app):
+    at = app(700)
+    total = visits_caption(at)
+    page_selector(at).set_value(2)
+    at.run()
+    
+    at.multiselect[0].set_value([2])
+    at.run()
+    assert not at.exception
+    visits = at.dataframe[1].value
+    assert set(visits["Operario"]) == {2}
+    selector = page_selector(at)
+    assert selector is None or selector.value == 1
+    assert len(visits) == min(visits_caption(at), PAGE_ROWS)
+    assert visits_caption(at) < total
+
+
+def test_plans_and_tasks_are_cached_across_reruns(app, monkeypatch):
+    import route_planner
+    
+    calls = {'read_tasks_file': 0, 'generate_routes': 0}
+    for name in calls:
+        function = getattr(route_planner, name)
+        
+        def counting(*args, _name=name, _function=function, **kwargs):
+            calls[_name] += 1
+            return _function(*args, **kwargs)
+        
+        monkeypatch.setattr(route_planner, name, counting)
+    
+    at = app(300)
+    assert calls == {'read_tasks_file': 1, 'generate_routes': 1}
+    first = at.dataframe[1].value
+    
+    # Volver a ejecutar la página (un filtro, una descarga) no vuelve a planificar
+    at.run()
+    assert calls == {'read_tasks_file': 1, 'generate_routes': 1}
+    
+    # Otro número de operarios es otro plan, pero las tareas ya están leídas
+    at.radio[0].set_value(2)
+    at.run()
+    assert calls == {'read_tasks_file': 1, 'generate_routes': 2}
+    at.radio[0].set_value(3)
+    at.run()
+    assert calls == {'read_tasks_file': 1, 'generate_routes': 2}
+    pd.testing.assert_frame_equal(at.dataframe[1].value, first)
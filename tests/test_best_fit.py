@@ -0,0 +1,83 @@
+"""Pruebas de la asignación best_fit: el día más ajustado y el coste por tarea."""
+
+import contextlib
+import io
+from datetime import datetime
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (ORIGIN_LOCATION, CapacityIndex, Operario, PlanningCalendar, PlanningStats,
+                           estimate_travel_time, generate_routes, read_excel_data)
+
+
+def brute_force_choice(index, task):
+    """Recorre todos los días abiertos y el siguiente vacío; devuelve el día que debería elegirse.
+    
+    Devuelve el RouteDayWeek elegido, 'vacio' para el siguiente hueco libre o None
+    si la tarea no cabe. Solo vale para tareas sin franja horaria.
+    """
+    options = []
+    for day_id, route_day in index.route_days.items():
+        travel_time = estimate_travel_time(route_day.end_location, task.poblacion)
+        remaining = index.capacity - route_day.total_time - (task.duracion + travel_time)
+        if remaining >= 0:
+            options.append(((route_day.end_location != task.poblacion, travel_time, remaining, day_id), route_day))
+    if index.next_empty < len(index.slots):
+        travel_time = estimate_travel_time(ORIGIN_LOCATION, task.poblacion)
+        remaining = index.capacity - (task.duracion + travel_time)
+        if remaining >= 0:
+            options.append(((ORIGIN_LOCATION != task.poblacion, travel_time, remaining, index.next_empty), 'vacio'))
+    return min(options, key=lambda option: option[0])[1] if options else None
+
+
+def test_best_fit_picks_the_tightest_feasible_day():
+    calendar = PlanningCalendar(datetime(2026, 3, 2), 2)
+    operarios = [Operario(i + 1, calendar) for i in range(2)]
+    index = CapacityIndex(operarios, calendar)
+    tasks = read_excel_data(generate_synthetic_tasks(300, 15, 5))
+    tasks.sort(key=lambda task: (task.poblacion, -task.duracion))
+    
+    placed = 0
+    for task in tasks:
+        expected = brute_force_choice(index, task)
+        days_before = set(index.route_days)
+        assert index.assign(task) == (expected is not None)
+        if expected is None:
+            assert not task.assigned
+            continue
+        placed += 1
+        if expected == 'vacio':
+            (day_id,) = set(index.route_days) - days_before
+            route_day = index.route_days[day_id]
+        else:
+            route_day = expected
+        assert route_day.visit_tasks[-1] is task
+    
+    # El horizonte no alcanza para todas: también se prueban tareas que no caben
+    assert 0 < placed < len(tasks)
+
+
+def test_best_fit_probes_are_bounded_by_the_end_locations():
+    # Sin franjas, cada tarea consulta una vez cada población final y el día vacío
+    tasks = read_excel_data(generate_synthetic_tasks(600, 20, 3))
+    stats = PlanningStats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_routes(tasks, 3, assignment="best_fit", calendar=PlanningCalendar(datetime(2026, 3, 2), 4),
+                        stats=stats)
+    locations = {task.poblacion for task in tasks} | {ORIGIN_LOCATION}
+    assert stats.tasks == len(tasks)
+    assert stats.max_probes <= len(locations) + 1
+    assert stats.travel_lookups == stats.probes
+
+
+def test_best_fit_days_respect_capacity_and_windows():
+    tasks = read_excel_data(generate_synthetic_tasks(500, 20, 9, window_ratio=0.3))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 3, assignment="best_fit",
+                                    calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    capacity = CapacityIndex(operarios, operarios[0].calendar).capacity
+    
+    days = [route_day for operario in operarios for route_day in operario.active_days()]
+    assert sum(len(route_day.visit_tasks) for route_day in days) == sum(task.assigned for task in tasks)
+    for route_day in days:
+        assert route_day.fits_windows()
+        assert route_day.total_time - route_day.return_travel_time <= capacity
@@ -0,0 +1,63 @@
+"""Pruebas del calendario del plan: fechas de cada semana, días anteriores al inicio y festivos."""
+
+import contextlib
+import io
+from datetime import date, datetime
+
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from planning_service import normalize_options
+from route_planner import WORK_DAYS, PlanningCalendar, generate_routes, read_excel_data
+from route_planner_cli import parse_args
+
+
+def test_calendar_dates_start_and_holidays():
+    # Empieza un miércoles; el lunes de la semana 2 es festivo
+    calendar = PlanningCalendar(datetime(2026, 3, 4), 2, holidays=[date(2026, 3, 9), date(2026, 12, 25)])
+    
+    assert calendar.date_of(1, "Lunes") == datetime(2026, 3, 2)
+    assert calendar.date_of(2, "Jueves") == datetime(2026, 3, 12)
+    assert calendar.working_days == [
+        (1, "Miércoles"), (1, "Jueves"), (2, "Martes"), (2, "Miércoles"), (2, "Jueves"),
+    ]
+    assert [calendar.date_of(*day) for day in calendar.working_days] == sorted(
+        calendar.date_of(*day) for day in calendar.working_days
+    )
+
+
+def test_calendar_without_holidays_has_every_work_day():
+    calendar = PlanningCalendar(datetime(2026, 3, 2), 4)
+    assert len(calendar.working_days) == 4 * len(WORK_DAYS)
+    assert calendar.date_of(4, "Lunes") == datetime(2026, 3, 23)
+
+
+def test_holidays_get_no_visits():
+    holidays = [datetime(2026, 3, 3), datetime(2026, 3, 11)]
+    calendar = PlanningCalendar(datetime(2026, 3, 2), 2, holidays)
+    tasks = read_excel_data(generate_synthetic_tasks(400, 20, 4))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 2, calendar=calendar)
+    
+    planned = {route_day.date for operario in operarios for route_day in operario.active_days()}
+    assert planned
+    assert not planned & set(holidays)
+    assert planned <= {calendar.date_of(*day) for day in calendar.working_days}
+    # La vista por semanas tiene todas las semanas, aunque solo los días ya creados
+    assert set(operarios[0].weeks) == {1, 2}
+
+
+def test_holidays_reach_the_cli_and_the_service():
+    args = parse_args(["entradas", "--festius", "2026-04-06, 2026-05-01"])
+    assert args.festius == [datetime(2026, 4, 6), datetime(2026, 5, 1)]
+    assert parse_args(["entradas"]).festius == []
+    with pytest.raises(SystemExit), contextlib.redirect_stderr(io.StringIO()):
+        parse_args(["entradas", "--festius", "06/04/2026"])
+    
+    options = normalize_options({'holidays': ["2026-05-01", "2026-04-06", "2026-05-01"]})
+    assert options['holidays'] == ["2026-04-06", "2026-05-01"]
+    assert normalize_options({})['holidays'] == []
+    with pytest.raises(ValueError):
+        normalize_options({'holidays': "2026-04-06"})
+    with pytest.raises(ValueError):
+        normalize_options({'holidays': ["06/04/2026"]})
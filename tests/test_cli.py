@@ -0,0 +1,67 @@
+"""Pruebas de la planificación por lotes desde la línea de comandos."""
+
+import contextlib
+import io
+import json
+import os
+import subprocess
+import sys
+
+from benchmarks import generate_synthetic_tasks
+from route_planner_cli import find_input_files, main
+
+
+def write_month(path, seed):
+    """Escribe un CSV sintético de tareas con la disposición del Excel."""
+    generate_synthetic_tasks(150, 15, seed).to_csv(path, header=False, index=False)
+    return str(path)
+
+
+def test_find_input_files(tmp_path):
+    month = tmp_path / "mensual"
+    month.mkdir()
+    for name in ["marzo.xlsx", "abril.csv", "mayo.parquet", "~$marzo.xlsx", "notas.txt"]:
+        (month / name).write_bytes(b"")
+    other = tmp_path / "otro.csv"
+    other.write_bytes(b"")
+    
+    expected = sorted(str(month / name) for name in ["marzo.xlsx", "abril.csv", "mayo.parquet"])
+    assert find_input_files([str(month)]) == expected
+    # Un archivo que aparece por varias entradas se planifica una sola vez
+    assert find_input_files([str(month), str(month / "*.csv"), str(other)]) == sorted(expected + [str(other)])
+    assert find_input_files([str(tmp_path / "no_existe.xlsx")]) == []
+
+
+def test_batch_plans_every_file_and_reports_failures(tmp_path):
+    inputs = tmp_path / "entradas"
+    inputs.mkdir()
+    write_month(inputs / "marzo.csv", 1)
+    write_month(inputs / "abril.csv", 2)
+    (inputs / "roto.csv").write_text("no,es,un,excel\n", encoding='utf-8')
+    output_dir = tmp_path / "salida"
+    
+    out, err = io.StringIO(), io.StringIO()
+    with contextlib.redirect_stdout(out), contextlib.redirect_stderr(err):
+        code = main([str(inputs), "-o", str(output_dir), "-n", "2", "-j", "2", "--save-plan",
+                     "--start", "2026-03-02"])
+    
+    assert code == 1
+    assert "2/3 archivos planificados" in out.getvalue()
+    assert "roto.csv: ERROR" in err.getvalue()
+    for stem in ["marzo", "abril"]:
+        with open(output_dir / f"{stem}_resumen.json", encoding='utf-8') as f:
+            summary = json.load(f)
+        assert summary['estado'] == 'ok'
+        assert summary['tareas'] > 0
+        assert os.path.getsize(summary['informe']) > 0
+        assert os.path.exists(summary['plan_guardado'])
+    with open(output_dir / "roto_resumen.json", encoding='utf-8') as f:
+        summary = json.load(f)
+    assert summary['estado'] == 'error' and summary['error']
+
+
+def test_cli_starts_without_the_planner_dependencies():
+    code = "import sys, route_planner_cli; print(sorted({'pandas', 'numpy', 'openpyxl'} & set(sys.modules)))"
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=root, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == "[]"
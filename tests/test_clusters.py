@@ -0,0 +1,58 @@
+"""Pruebas de la agrupación de poblaciones por zonas (location_order="sweep")."""
+
+from datetime import datetime
+from itertools import combinations
+
+import pandas as pd
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (ASSIGNMENT_MODES, COORDINATES_FILE, LUNCH_DURATION, ORIGIN_LOCATION, WORK_HOURS,
+                           PlanningCalendar, compare_location_orders, estimate_travel_time, read_excel_data,
+                           sweep_clusters)
+
+CAPACITY = (WORK_HOURS * 60) - LUNCH_DURATION
+
+
+def known_locations():
+    """Poblaciones del fichero de coordenadas, sin Vic."""
+    names = pd.read_csv(COORDINATES_FILE)['poblacion'].astype(str).tolist()
+    return [name for name in names if name != ORIGIN_LOCATION]
+
+
+def mean_travel(pairs):
+    """Tiempo de viaje medio entre los pares de poblaciones dados."""
+    pairs = list(pairs)
+    return sum(estimate_travel_time(a, b) for a, b in pairs) / len(pairs)
+
+
+def test_clusters_split_every_location_within_a_day():
+    durations = {location: 45 + 15 * (i % 7) for i, location in enumerate(known_locations())}
+    durations["Població 1"] = 60
+    durations["Població 2"] = 60
+    durations[known_locations()[0]] = CAPACITY + 30  # Una población que sola ya no cabe en una jornada
+    clusters = sweep_clusters(durations)
+    
+    assert sorted(location for cluster in clusters for location in cluster) == sorted(durations)
+    for cluster in clusters:
+        assert len(cluster) == 1 or sum(durations[location] for location in cluster) <= CAPACITY
+    assert [known_locations()[0]] in clusters
+    # Las poblaciones sin coordenadas van al final, cada una en su grupo
+    assert clusters[-2:] == [["Població 1"], ["Població 2"]]
+
+
+def test_clusters_are_compact():
+    durations = {location: 120 for location in known_locations()}
+    clusters = sweep_clusters(durations)
+    assert len(clusters) > 2
+    inside = mean_travel(pair for cluster in clusters for pair in combinations(cluster, 2))
+    overall = mean_travel(combinations(durations, 2))
+    assert inside < overall / 2
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_sweep_saves_travel_without_touching_the_tasks(assignment):
+    tasks = read_excel_data(generate_synthetic_tasks(400, 40, 1))
+    result = compare_location_orders(tasks, 2, assignment, PlanningCalendar(datetime(2026, 3, 2), 4))
+    assert not any(task.assigned for task in tasks)
+    assert result['travel_saved'] == result['alphabetical']['travel'] - result['sweep']['travel'] > 0
@@ -0,0 +1,66 @@
+"""Pruebas de las reglas de duración: bandas de legios, extras, caché y reglas del fichero."""
+
+import pandas as pd
+import pytest
+
+from route_planner import (DEFAULT_DURATION_RULES, DURATION_RULES_FILE, DurationRules, Task, calcular_duraciones,
+                           get_duration_rules)
+
+
+@pytest.mark.parametrize('observaciones, minutes', [
+    ("", 0),
+    ("Neteja dipòsit", 0),
+    ("legio", 45),
+    ("1 legio", 45),
+    ("2 legios", 60),
+    ("3 LEGIOS", 60),
+    ("5legios", 90),
+    ("6 legios", 120),
+    # 7 y 9 estaban en dos ramas del if/elif original: gana la primera
+    ("7 legios", 120),
+    ("8 legios", 150),
+    ("9 legios", 150),
+    ("11 legios", 180),
+    # Por encima de la última banda no hay duración
+    ("12 legios", 0),
+    ("0 legios", 0),
+    ("Revisió anual", 45),
+    ("revisio", 45),
+    ("4 legios + revisió", 135),
+    ("12 legios i revisió", 45),
+    ("  2   LEGIOS   ", 60),
+])
+def test_default_rules(observaciones, minutes):
+    assert DurationRules(DEFAULT_DURATION_RULES).duration(observaciones) == minutes
+
+
+def test_rules_file_matches_the_defaults():
+    rules = DurationRules.from_file(DURATION_RULES_FILE)
+    defaults = DurationRules(DEFAULT_DURATION_RULES)
+    for count in range(0, 14):
+        for text in (f"{count} legios", f"{count} legios revisió"):
+            assert rules.duration(text) == defaults.duration(text)
+
+
+def test_overlapping_bands_are_rejected():
+    rules = dict(DEFAULT_DURATION_RULES, bandas=[
+        {'desde': 1, 'hasta': 3, 'minutos': 45},
+        {'desde': 3, 'hasta': 5, 'minutos': 60},
+    ])
+    with pytest.raises(ValueError):
+        DurationRules(rules)
+
+
+def test_durations_are_cached_by_normalized_text():
+    rules = DurationRules(DEFAULT_DURATION_RULES, cache_size=8)
+    assert rules.duration("2 legios") == rules.duration(" 2  LEGIOS") == 60
+    info = rules.duration_of.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (1, 1, 8)
+
+
+def test_column_and_task_durations_agree():
+    texts = ["7 legios", "legio", "12 legios", "Revisió 3 legios", "", "9 legios"]
+    expected = [get_duration_rules().duration(text) for text in texts]
+    assert calcular_duraciones(pd.Series(texts)) == expected
+    task = Task.from_values("ACS", "1", "Client", "Carrer 1", "", "Vic", "Revisió 3 legios", 0)
+    assert task.calcular_duracion() == 105
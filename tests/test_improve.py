@@ -0,0 +1,93 @@
+"""Pruebas de la búsqueda local (2-opt, recolocar e intercambiar) sobre las rutas generadas."""
+
+import contextlib
+import io
+from collections import Counter
+from datetime import datetime
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (LUNCH_DURATION, WORK_HOURS, Operario, PlanningCalendar, Task, estimate_travel_time,
+                           generate_routes, improve_routes, read_excel_data, total_travel_time)
+
+
+def make_task(poblacion, duration=30, window_start=0):
+    """Crea una tarea en la población dada."""
+    task = Task.from_values("ACS", poblacion, "Client", "Carrer 1", "", poblacion, "", duration)
+    if window_start:
+        task.window_start = window_start
+    return task
+
+
+def make_plan(*days):
+    """Planifica un operario con un día de ruta por lista de tareas (o poblaciones), en ese orden."""
+    operario = Operario(1, PlanningCalendar(datetime(2026, 3, 2), 1))
+    for day_name, tasks in zip(["Lunes", "Martes", "Miércoles", "Jueves"], days):
+        route_day = operario.get_route_day(day_name, 1)
+        for task in tasks:
+            if isinstance(task, str):
+                task = make_task(task)
+            route_day.add_task(task, estimate_travel_time(route_day.end_location, task.poblacion))
+            task.assigned = True
+        route_day.finalize_day()
+    return [operario]
+
+
+def visits(operarios):
+    """Poblaciones de cada día, por (semana, día)."""
+    return {key: [task.poblacion for task in route_day.visit_tasks]
+            for operario in operarios for key, route_day in operario.route_days.items()}
+
+
+def test_two_opt_removes_a_zigzag():
+    operarios = make_plan(["Alpens", "Aiguafreda", "Alpens", "Aiguafreda"])
+    travel = total_travel_time(operarios)
+    result = improve_routes(operarios, time_limit=5.0)
+    
+    assert result['moves']['two_opt'] >= 1
+    assert result['travel_before'] == travel
+    assert result['travel_saved'] == travel - total_travel_time(operarios) > 0
+    day = visits(operarios)[(1, "Lunes")]
+    assert sorted(day) == ["Aiguafreda", "Aiguafreda", "Alpens", "Alpens"]
+    assert day in (["Alpens", "Alpens", "Aiguafreda", "Aiguafreda"], ["Aiguafreda", "Aiguafreda", "Alpens", "Alpens"])
+
+
+def test_relocate_joins_visits_to_the_same_town():
+    operarios = make_plan(["Alpens", "Alpens"], ["Aiguafreda", "Alpens"])
+    result = improve_routes(operarios, time_limit=5.0)
+    
+    assert result['travel_saved'] > 0
+    assert result['moves']['relocate'] + result['moves']['swap'] >= 1
+    # Las tres visitas a Alpens acaban en el mismo día
+    days = visits(operarios)
+    assert sorted(days[(1, "Lunes")] + days[(1, "Martes")]) == ["Aiguafreda"] + ["Alpens"] * 3
+    assert any(day.count("Alpens") == 3 for day in days.values())
+
+
+def test_days_with_windows_stay_fixed():
+    windowed = make_task("Aiguafreda", window_start=12 * 60)
+    operarios = make_plan(["Alpens", "Alpens"], [windowed, make_task("Alpens")])
+    result = improve_routes(operarios, time_limit=5.0)
+    
+    assert visits(operarios)[(1, "Martes")] == ["Aiguafreda", "Alpens"]
+    assert visits(operarios)[(1, "Lunes")] == ["Alpens", "Alpens"]
+    assert result['travel_saved'] == 0
+
+
+def test_improve_routes_keeps_tasks_and_capacity():
+    tasks = read_excel_data(generate_synthetic_tasks(300, 20, 4, window_ratio=0.1))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 2, calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    
+    def planned():
+        return Counter(id(task) for operario in operarios for route_day in operario.route_days.values()
+                       for task in route_day.visit_tasks)
+    
+    before = planned()
+    result = improve_routes(operarios, time_limit=5.0)
+    
+    assert planned() == before
+    assert result['travel_after'] == total_travel_time(operarios) <= result['travel_before']
+    for operario in operarios:
+        for route_day in operario.route_days.values():
+            assert route_day.fits_windows()
+            assert route_day.total_time - route_day.return_travel_time <= (WORK_HOURS * 60) - LUNCH_DURATION
@@ -0,0 +1,79 @@
+"""Pruebas de la replanificación incremental: los días que no se tocan quedan idénticos."""
+
+import contextlib
+import io
+import pickle
+from datetime import datetime
+
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (ASSIGNMENT_MODES, PlanningCalendar, generate_routes, insert_tasks,
+                           read_excel_data, remove_tasks)
+
+
+def plan(assignment, held_out=0):
+    """Planifica tareas sintéticas con franjas y devuelve (operarios, tareas apartadas)."""
+    tasks = read_excel_data(generate_synthetic_tasks(160, 25, 11, window_ratio=0.3))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks[held_out:], 3, assignment=assignment,
+                                    calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    return operarios, tasks[:held_out]
+
+
+def day_bytes(operarios):
+    """Serializa cada día de ruta con todas sus visitas y tiempos, por (operario, semana, día)."""
+    return {
+        (operario.operario_id, *key): pickle.dumps((
+            [(task.cod_cliente, task.mantenimiento, task.poblacion, task.duracion)
+             for task in route_day.visit_tasks],
+            route_day.start_times, route_day.travel_times, route_day.total_time,
+            route_day.return_travel_time, route_day.end_location,
+        ))
+        for operario in operarios
+        for key, route_day in operario.route_days.items()
+    }
+
+
+def changed_keys(operarios, days_changed):
+    """Claves (operario, semana, día) de los días de ruta dados."""
+    return {
+        (operario.operario_id, *key)
+        for operario in operarios
+        for key, route_day in operario.route_days.items()
+        if any(route_day is changed for changed in days_changed)
+    }
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_insert_keeps_untouched_days_identical(assignment):
+    operarios, new_tasks = plan(assignment, held_out=12)
+    before = day_bytes(operarios)
+    with contextlib.redirect_stdout(io.StringIO()):
+        result = insert_tasks(operarios, new_tasks)
+    after = day_bytes(operarios)
+    
+    assert result['placed']
+    changed = changed_keys(operarios, result['days_changed'])
+    for key, content in before.items():
+        if key not in changed:
+            assert after[key] == content
+    assert all(before.get(key) != after[key] for key in changed)
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_remove_keeps_untouched_days_identical(assignment):
+    operarios, _ = plan(assignment)
+    days = [route_day for operario in operarios for route_day in operario.active_days()]
+    cancelled = [days[1].visit_tasks[0], days[-1].visit_tasks[-1]]
+    before = day_bytes(operarios)
+    result = remove_tasks(operarios, cancelled)
+    after = day_bytes(operarios)
+    
+    assert result['removed'] == cancelled and not result['not_found']
+    changed = changed_keys(operarios, result['days_changed'])
+    assert changed == changed_keys(operarios, [days[1], days[-1]])
+    for key, content in before.items():
+        if key not in changed:
+            assert after[key] == content
+    assert all(before[key] != after[key] for key in changed)
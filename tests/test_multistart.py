@@ -0,0 +1,24 @@
+"""Pruebas de la planificación con varios arranques en paralelo."""
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import generate_routes_multistart, plan_layout, read_excel_data
+
+
+def run(seed, **kwargs):
+    """Planifica con varios arranques y devuelve (estadísticas sin el tiempo, plan)."""
+    tasks = read_excel_data(generate_synthetic_tasks(200, 20, 4))
+    operarios, stats = generate_routes_multistart(tasks, 2, num_starts=4, seed=seed, max_workers=2, **kwargs)
+    stats.pop('elapsed_seconds')
+    return stats, plan_layout(tasks, operarios)
+
+
+def test_same_seed_gives_the_same_plan():
+    first = run(7)
+    assert first[0]['starts_completed'] == 4
+    assert run(7) == first
+
+
+def test_time_limit_records_the_starts_completed():
+    stats, _ = run(7, time_limit=0.0)
+    assert stats['starts_completed'] == 1
+    assert stats['best_start'] == 0
@@ -0,0 +1,82 @@
+"""Pruebas de la tabla plana del plan y de los totales que se calculan a partir de ella."""
+
+import contextlib
+import io
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (PLAN_TABLE_COLUMNS, PlanningCalendar, day_totals, generate_routes, operario_totals,
+                           plan_table, print_summary, read_excel_data, unassigned_table, week_totals)
+
+
+@pytest.fixture(scope='module')
+def plan():
+    """Tareas con franjas y su plan con 3 operarios en 2 semanas (alguna tarea queda sin asignar)."""
+    tasks = read_excel_data(generate_synthetic_tasks(400, 20, 12, window_ratio=0.3))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 3, calendar=PlanningCalendar(datetime(2026, 3, 2), 2))
+    return tasks, operarios
+
+
+def test_plan_table_layout(plan):
+    tasks, operarios = plan
+    table = plan_table(operarios)
+    
+    assert list(table.columns) == PLAN_TABLE_COLUMNS + ['comida', 'inicio_comida']
+    assert len(table) == sum(task.assigned for task in tasks)
+    for column in ['operario', 'semana', 'orden', 'inicio', 'fin', 'viaje', 'espera', 'duracion', 'vuelta',
+                   'franja_inicio', 'franja_fin', 'inicio_comida']:
+        assert table[column].dtype == np.int64, column
+    assert table['comida'].dtype == bool
+    assert (table['espera'] >= 0).all()
+    assert (table['fin'] - table['inicio'] == table['duracion']).all()
+    
+    # Una fila por visita, en el orden de operarios, fechas y visitas del día
+    expected = [
+        (operario.operario_id, route_day.date, position, task.nombre_cliente, start_minute)
+        for operario in operarios
+        for route_day in operario.active_days()
+        for position, (task, start_minute) in enumerate(zip(route_day.visit_tasks, route_day.start_times))
+    ]
+    rows = zip(table['operario'], table['fecha'], table['orden'], table['cliente'], table['inicio'])
+    assert [(operario, date.to_pydatetime(), order, client, start)
+            for operario, date, order, client, start in rows] == expected
+
+
+def test_totals_add_up_to_each_day(plan):
+    tasks, operarios = plan
+    table = plan_table(operarios)
+    
+    days = day_totals(table)
+    route_days = [route_day for operario in operarios for route_day in operario.active_days()]
+    assert list(days['tareas']) == [len(route_day.visit_tasks) for route_day in route_days]
+    assert list(days['minutos']) == [route_day.total_time for route_day in route_days]
+    assert list(days['minutos_viaje']) == [sum(route_day.travel_times) + route_day.return_travel_time
+                                           for route_day in route_days]
+    
+    weeks = week_totals(table)
+    assert weeks['tareas'].sum() == len(table)
+    assert weeks['minutos'].sum() == days['minutos'].sum()
+    assert weeks['dias'].sum() == len(days)
+
+
+def test_operarios_without_visits_get_zero_totals(plan):
+    tasks, operarios = plan
+    table = plan_table(operarios)
+    totals = operario_totals(table[table['operario'] != 2], operarios)
+    assert list(totals['operario']) == [1, 2, 3]
+    assert totals.loc[totals['operario'] == 2, ['tareas', 'dias', 'minutos', 'minutos_viaje']].sum().sum() == 0
+    assert totals['tareas'].sum() == (table['operario'] != 2).sum()
+
+
+def test_summary_and_unassigned_use_the_same_table(plan):
+    tasks, operarios = plan
+    table = plan_table(operarios)
+    assert print_summary(tasks, operarios, table) == print_summary(tasks, operarios)
+    
+    unassigned = unassigned_table(tasks)
+    assert len(unassigned) == sum(not task.assigned for task in tasks) > 0
+    assert set(unassigned.columns) <= set(table.columns)
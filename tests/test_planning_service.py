@@ -0,0 +1,21 @@
+"""Prueba de carga del servicio de planificación contra un servidor local."""
+
+from planning_service import PlanningServer, PlanningService, load_test, synthetic_payloads
+
+
+def test_load_test_reports_latency_and_rejections():
+    # Un solo proceso y un trabajo en espera: cuatro clientes a la vez llenan la cola
+    server = PlanningServer(port=0, service=PlanningService(workers=1, max_queue=1))
+    url = server.start()
+    try:
+        result = load_test(url, synthetic_payloads(8, 100), 4, 2, {'operarios': 1}, timeout=120)
+    finally:
+        server.stop()
+    
+    assert result['errores'] == 0, result['primeros_errores']
+    assert result['trabajos'] == 8
+    assert result['de_cache'] == 0
+    latency = result['latencia']
+    assert 0 < latency['p50'] <= latency['p95'] <= latency['max']
+    assert result['trabajos_por_segundo'] > 0
+    assert result['rechazos'] > 0
@@ -0,0 +1,44 @@
+"""Pruebas del informe Excel: el modo en streaming da las mismas hojas que el de pandas."""
+
+import contextlib
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (ASSIGNMENT_MODES, PlanningCalendar, create_excel_report, generate_routes, operario_tables,
+                           read_excel_data, report_rows, timeline_report_rows)
+
+
+def plan(assignment):
+    """Planifica tareas sintéticas con franjas horarias y devuelve los operarios."""
+    tasks = read_excel_data(generate_synthetic_tasks(400, 30, 6, window_ratio=0.4))
+    with contextlib.redirect_stdout(io.StringIO()):
+        return generate_routes(tasks, 3, assignment=assignment, calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_timeline_rows_match_table_rows(assignment):
+    operarios = plan(assignment)
+    sheets = dict(operario_tables(operarios))
+    assert sheets
+    for operario in operarios:
+        if operario.operario_id in sheets:
+            assert list(timeline_report_rows(operario)) == list(report_rows(sheets[operario.operario_id]))
+        else:
+            assert list(timeline_report_rows(operario)) == []
+
+
+def test_streaming_report_matches_pandas_report():
+    operarios = plan('best_fit')
+    workbooks = {}
+    for streaming in (False, True):
+        output = io.BytesIO()
+        assert create_excel_report(operarios, output, streaming=streaming)
+        output.seek(0)
+        workbooks[streaming] = pd.read_excel(output, sheet_name=None)
+    assert list(workbooks[True]) == list(workbooks[False])
+    for name, sheet in workbooks[False].items():
+        pd.testing.assert_frame_equal(workbooks[True][name], sheet)
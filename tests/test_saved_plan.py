@@ -0,0 +1,87 @@
+"""Pruebas del plan guardado: ida y vuelta por JSON y cambios respecto al mes anterior."""
+
+import contextlib
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (PLAN_FILE_COLUMNS, PlanningCalendar, SavedPlan, Task, diff_counts, generate_routes,
+                           plan_diff, plan_table, read_excel_data, restore_routes, task_records,
+                           warm_start_routes)
+
+
+@pytest.fixture
+def month():
+    """Tareas de un mes con su plan (2 operarios, 4 semanas)."""
+    tasks = read_excel_data(generate_synthetic_tasks(250, 20, 6, window_ratio=0.2))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 2, calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    return tasks, operarios
+
+
+def test_saved_plan_round_trip(month):
+    tasks, operarios = month
+    saved = SavedPlan.from_plan(operarios)
+    assert list(saved.visits.columns) == PLAN_FILE_COLUMNS
+    
+    loaded = SavedPlan.from_bytes(saved.to_bytes())
+    assert list(loaded.visits.columns) == PLAN_FILE_COLUMNS
+    pd.testing.assert_frame_equal(loaded.visits, saved.visits)
+    assert (loaded.start_date, loaded.num_weeks, loaded.num_operarios) == (datetime(2026, 3, 2), 4, 2)
+    
+    # Las mismas tareas vuelven a su día, en su orden y con sus horas
+    restored = restore_routes([Task.from_values(*record) for record in task_records(tasks)], 2, loaded)
+    pd.testing.assert_frame_equal(plan_table(restored), plan_table(operarios))
+
+
+def test_saved_plan_rejects_other_files():
+    with pytest.raises(ValueError):
+        SavedPlan.from_bytes(b"no es json")
+    with pytest.raises(ValueError):
+        SavedPlan.from_bytes(b'{"formato": "otro"}')
+    with pytest.raises(ValueError):
+        SavedPlan.from_bytes(b'{"formato": "eix-planificacion", "version": 99}')
+
+
+def test_plan_diff_against_the_same_plan(month):
+    tasks, operarios = month
+    diff = plan_diff(SavedPlan.from_plan(operarios), tasks, operarios)
+    assigned = sum(task.assigned for task in tasks)
+    assert diff_counts(diff)['igual'] == assigned
+    assert diff_counts(diff)['sin_asignar'] == len(tasks) - assigned
+    assert not diff['modificada'].any()
+
+
+def test_plan_diff_states_after_a_warm_start(month):
+    tasks, operarios = month
+    saved = SavedPlan.from_bytes(SavedPlan.from_plan(operarios).to_bytes())
+    planned = [task for task in tasks if task.assigned]
+    removed, changed = planned[0], planned[1]
+    
+    records = [record for task, record in zip(tasks, task_records(tasks)) if task is not removed]
+    next_tasks = [Task.from_values(*record) for record in records]
+    changed_task = next(task for task in next_tasks
+                        if (task.cod_cliente, task.mantenimiento, task.poblacion)
+                        == (changed.cod_cliente, changed.mantenimiento, changed.poblacion))
+    changed_task.duracion += 15
+    new_task = Task.from_values("ACS", "99999", "Client nou", "Carrer 1", "", "Vic", "1 legio", 45)
+    next_tasks.append(new_task)
+    
+    with contextlib.redirect_stdout(io.StringIO()):
+        next_operarios, diff = warm_start_routes(next_tasks, 2, saved, PlanningCalendar(datetime(2026, 4, 6), 4))
+    pd.testing.assert_frame_equal(diff, plan_diff(saved, next_tasks, next_operarios))
+    
+    def state_of(task):
+        rows = diff[(diff['cod_cliente'] == task.cod_cliente) & (diff['mantenimiento'] == task.mantenimiento)]
+        return set(rows['estado'])
+    
+    assert 'eliminada' in state_of(removed)
+    assert state_of(new_task) <= {'nueva', 'sin_asignar'}
+    assert diff.loc[diff['modificada'], 'cod_cliente'].tolist() == [changed.cod_cliente]
+    counts = diff_counts(diff)
+    assert counts['igual'] > len(planned) // 2
+    assert counts['eliminada'] == 1
+    assert counts['nueva'] + counts['sin_asignar'] >= 1
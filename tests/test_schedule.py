@@ -0,0 +1,66 @@
+"""Pruebas de las reglas de la jornada: franjas horarias, esperas y pausa para comer."""
+
+from datetime import datetime
+
+from route_planner import (DAY_START, LUNCH_DURATION, LUNCH_START, ORIGIN_LOCATION, Operario,
+                           PlanningCalendar, Task, lunch_minute, next_start_minute, plan_table, report_rows)
+
+
+def make_task(duration, window_start=0, window_end=24 * 60, poblacion=ORIGIN_LOCATION):
+    """Crea una tarea sin fila de Excel con la duración y la franja dadas."""
+    task = Task()
+    task.poblacion = poblacion
+    task.duracion = duration
+    task.window_start, task.window_end = window_start, window_end
+    return task
+
+
+def make_day(*tasks):
+    """Planifica un día con las tareas dadas, en ese orden, y sin viajes entre ellas."""
+    operario = Operario(1, PlanningCalendar(datetime(2026, 3, 2), 1))
+    route_day = operario.get_route_day('Lunes', 1)
+    for task in tasks:
+        route_day.add_task(task, 0)
+    route_day.finalize_day()
+    return operario, route_day
+
+
+def test_lunch_is_taken_during_the_wait_for_a_window():
+    # Llega a las 11:50 y la franja abre a las 13:20: come de 12:50 a 13:20
+    assert next_start_minute(700, 10, 800) == 800
+    assert lunch_minute(700, 800) == 800 - LUNCH_DURATION
+    # Sin franja, la pausa retrasa la llegada y empieza a LUNCH_START
+    assert next_start_minute(770, 20) == 770 + 20 + LUNCH_DURATION
+    assert lunch_minute(770, 820) == LUNCH_START
+
+
+def test_window_wait_counts_as_work():
+    operario, route_day = make_day(make_task(60), make_task(60, window_start=14 * 60))
+    # 60 min, espera de 9:00 a 14:00 sin la pausa para comer y otros 60 min
+    work = route_day.total_time - route_day.return_travel_time
+    assert work == 60 + (14 * 60 - 9 * 60 - LUNCH_DURATION) + 60
+    assert not route_day.has_capacity_for(60, 0, window_start=15 * 60 + 30)
+    table = plan_table([operario])
+    assert list(table['espera']) == [0, 14 * 60 - 9 * 60 - LUNCH_DURATION]
+    assert (table['viaje'] + table['espera'] + table['duracion'] + table['vuelta']).sum() == route_day.total_time
+
+
+def test_timeline_table_and_report_agree_on_lunch():
+    operario, route_day = make_day(make_task(210), make_task(45, window_start=800))
+    lunches = [minute for kind, minute, _ in route_day.timeline() if kind == 'dinar']
+    assert lunches == [800 - LUNCH_DURATION]
+    assert lunches[0] >= DAY_START + 210
+    
+    table = plan_table([operario])
+    assert list(table.loc[table['comida'], 'inicio_comida']) == lunches
+    report = [row for row in report_rows(table) if row[7] == 'Pausa per dinar']
+    assert [row[3] for row in report] == ['12:50']
+
+
+def test_lunch_before_the_first_visit():
+    operario, route_day = make_day(make_task(60, window_start=15 * 60))
+    kinds = [kind for kind, _, _ in route_day.timeline()]
+    assert kinds == ['sortida', 'dinar', 'visita', 'tornada']
+    table = plan_table([operario])
+    assert bool(table['comida'].iloc[0])
+    assert [row[7] for row in report_rows(table)][2:4] == ['Sortida', 'Pausa per dinar']
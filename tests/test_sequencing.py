@@ -0,0 +1,71 @@
+"""Pruebas del orden de visita de cada día: Held-Karp exacto frente a la fuerza bruta."""
+
+import contextlib
+import io
+import itertools
+import random
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (LUNCH_DURATION, WORK_HOURS, PlanningCalendar, generate_routes, held_karp_order,
+                           heuristic_order, read_excel_data, resequence_days, total_travel_time)
+
+
+def tour_length(travel, order):
+    """Viaje de Vic por las paradas en el orden dado y de vuelta a Vic."""
+    route = [0] + list(order) + [0]
+    return int(sum(travel[a, b] for a, b in zip(route, route[1:])))
+
+
+def random_travel(n, seed, symmetric=True):
+    """Matriz de viaje (n+1)x(n+1) con el índice 0 como Vic."""
+    rng = random.Random(seed)
+    travel = np.array([[0 if a == b else rng.randint(5, 60) for b in range(n + 1)] for a in range(n + 1)],
+                      dtype=np.int64)
+    return np.minimum(travel, travel.T) if symmetric else travel
+
+
+@pytest.mark.parametrize('n', range(0, 9))
+@pytest.mark.parametrize('symmetric', [True, False])
+def test_held_karp_matches_brute_force(n, symmetric):
+    travel = random_travel(n, seed=n, symmetric=symmetric)
+    order = held_karp_order(travel)
+    assert sorted(order) == list(range(1, n + 1))
+    best = min((tour_length(travel, perm) for perm in itertools.permutations(range(1, n + 1))), default=0)
+    assert tour_length(travel, order) == best
+
+
+def test_heuristic_is_a_permutation_no_better_than_exact():
+    for seed in range(5):
+        travel = random_travel(8, seed)
+        order = heuristic_order(travel)
+        assert sorted(order) == list(range(1, 9))
+        assert tour_length(travel, order) >= tour_length(travel, held_karp_order(travel))
+
+
+def test_resequence_days_saves_travel_without_breaking_days():
+    tasks = read_excel_data(generate_synthetic_tasks(300, 25, 2, window_ratio=0.2))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 2, calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    capacity = (WORK_HOURS * 60) - LUNCH_DURATION
+    days = {(operario.operario_id, key): (sorted(id(task) for task in route_day.visit_tasks),
+                                          max(capacity, route_day.total_time - route_day.return_travel_time))
+            for operario in operarios for key, route_day in operario.route_days.items()}
+    travel = total_travel_time(operarios)
+    
+    result = resequence_days(operarios)
+    assert result['travel_before'] == travel
+    assert result['travel_after'] == total_travel_time(operarios) < travel
+    assert result['days_changed'] > 0
+    assert result['exact_days'] + result['heuristic_days'] + result['cache_hits'] == sum(
+        1 for operario in operarios for _ in operario.active_days())
+    # Cada día conserva sus tareas y sus franjas, y no pasa de la jornada (o de la que ya tenía)
+    for operario in operarios:
+        for key, route_day in operario.route_days.items():
+            planned, work = days[(operario.operario_id, key)]
+            assert sorted(id(task) for task in route_day.visit_tasks) == planned
+            assert route_day.fits_windows()
+            assert route_day.total_time - route_day.return_travel_time <= work
@@ -0,0 +1,58 @@
+"""Pruebas de los contadores de PlanningStats en los dos modos de asignación."""
+
+import contextlib
+import io
+from datetime import datetime
+
+import pytest
+
+from benchmarks import generate_synthetic_tasks
+from route_planner import (ASSIGNMENT_MODES, PlanningCalendar, PlanningStats, RouteDayWeek, Task, generate_routes,
+                           read_excel_data)
+
+
+def plan(tasks, assignment, weeks=1):
+    """Planifica las tareas con 1 operario y devuelve sus estadísticas."""
+    stats = PlanningStats()
+    with contextlib.redirect_stdout(io.StringIO()):
+        generate_routes(tasks, 1, assignment=assignment, calendar=PlanningCalendar(datetime(2026, 3, 2), weeks),
+                        stats=stats)
+    return stats
+
+
+def test_round_robin_counts_only_capacity_failures(monkeypatch):
+    failures = []
+    has_capacity_for = RouteDayWeek.has_capacity_for
+    
+    def counting(self, *args, **kwargs):
+        result = has_capacity_for(self, *args, **kwargs)
+        failures.append(not result)
+        return result
+    
+    monkeypatch.setattr(RouteDayWeek, 'has_capacity_for', counting)
+    tasks = read_excel_data(generate_synthetic_tasks(200, 15, 8, window_ratio=0.5))
+    stats = plan(tasks, "round_robin")
+    
+    assert stats.capacity_rejections == sum(failures)
+    # Los intentos que solo fallan por la franja no son rechazos por capacidad
+    assert stats.capacity_rejections < stats.probes - (stats.tasks - stats.unassigned)
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_window_failures_are_not_capacity_rejections(assignment):
+    # Una franja demasiado corta para la visita: cabe en la jornada pero nunca en la franja
+    task = Task.from_values("ACS", "1", "Client", "Carrer 1", "", "Vic", "1 legio", 45, 8 * 60, 8 * 60 + 30)
+    stats = plan([task], assignment)
+    assert not task.assigned
+    assert stats.unassigned == 1
+    assert stats.probes > 0
+    assert stats.capacity_rejections == 0
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_full_days_are_capacity_rejections(assignment):
+    # Ocho tareas de 6 horas en una semana de cuatro días: cuatro no caben
+    tasks = [Task.from_values("ACS", str(i), "Client", "Carrer 1", "", "Vic", "", 360) for i in range(8)]
+    stats = plan(tasks, assignment)
+    assert stats.unassigned == 4
+    assert stats.capacity_rejections >= 4
@@ -0,0 +1,43 @@
+"""Pruebas de la lectura de tareas: el mismo archivo en xlsx, CSV o Parquet da las mismas tareas."""
+
+import pandas as pd
+import pytest
+
+from benchmarks import generate_synthetic_tasks, read_excel_iterrows, write_task_files
+from route_planner import normalize_code, read_excel_data, read_tasks_file
+
+
+def task_records(tasks):
+    """Datos de cada tarea que dependen de la lectura, en orden."""
+    return [(task.mantenimiento, task.cod_cliente, task.nombre_cliente, task.direccion, task.alias,
+             task.poblacion, task.observaciones, task.duracion, task.window_start, task.window_end)
+            for task in tasks]
+
+
+def test_normalize_code():
+    assert normalize_code(10079.0) == '10079'
+    assert normalize_code('10079.0') == '10079'
+    assert normalize_code(10079) == '10079'
+    assert normalize_code('A-10079') == 'A-10079'
+    assert normalize_code(10079.5) == '10079.5'
+
+
+def test_column_reading_matches_iterrows():
+    df = generate_synthetic_tasks(300, 20, 5, window_ratio=0.3)
+    df.loc[df.index % 11 == 0, 2] = None
+    assert task_records(read_excel_data(df)) == task_records(read_excel_iterrows(df))
+
+
+def test_formats_give_the_same_tasks(tmp_path):
+    pytest.importorskip('pyarrow')
+    df = generate_synthetic_tasks(200, 20, 3, window_ratio=0.3)
+    # Códigos con celdas vacías: pandas los lee como decimales y openpyxl como enteros
+    df.loc[df.index % 7 == 0, 2] = None
+    paths = write_task_files(df, tmp_path)
+    
+    expected = task_records(read_excel_data(pd.read_excel(paths['xlsx'], header=None)))
+    assert any(record[1] == '' for record in expected)
+    assert all(not record[1].endswith('.0') for record in expected)
+    for path in paths.values():
+        assert task_records(read_tasks_file(path)) == expected
+        assert task_records(read_tasks_file(path, chunk_rows=37)) == expected
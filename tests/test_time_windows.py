@@ -0,0 +1,94 @@
+"""Pruebas de las franjas horarias: lectura de horas, holgura hacia delante e inserción factible."""
+
+import random
+from datetime import datetime, time
+
+import pandas as pd
+import pytest
+
+from route_planner import (MINUTES_PER_DAY, ORIGIN_LOCATION, Operario, PlanningCalendar, Task,
+                           estimate_travel_time, parse_hour, parse_time_window, read_time_windows)
+
+TOWNS = ["Vic", "Manlleu", "Tona", "Torelló", "Aiguafreda"]
+
+
+@pytest.mark.parametrize('value, minutes', [
+    ("9", 540), ("9:30", 570), ("09.30", 570), ("09:30:00", 570), ("9h", 540), (9.5, 570), (0.375, 540),
+    (time(14, 15), 855), (datetime(2026, 3, 2, 8, 0), 480), ("24:00", MINUTES_PER_DAY),
+    (None, None), ("", None), ("matí", None), ("25:00", None), (30, None),
+])
+def test_parse_hour(value, minutes):
+    assert parse_hour(value) == minutes
+
+
+def test_parse_time_window_falls_back_to_the_whole_day():
+    assert parse_time_window("9", "13") == (540, 780)
+    assert parse_time_window(None, "13") == (0, 780)
+    assert parse_time_window("15", None) == (900, MINUTES_PER_DAY)
+    assert parse_time_window("13", "9") == (0, MINUTES_PER_DAY)
+    assert parse_time_window("x", "y") == (0, MINUTES_PER_DAY)
+
+
+def test_read_time_windows_matches_parse_time_window():
+    starts = ["9", None, "13", 0.5, "15:00", "x"]
+    ends = ["13", "12", "9", None, "18", "19"]
+    df = pd.DataFrame([[None] * 12 + [start, end] for start, end in zip(starts, ends)])
+    valid = pd.Series([True, True, True, True, False, True])
+    window_starts, window_ends = read_time_windows(df, valid)
+    expected = [parse_time_window(start, end) for start, end, keep in zip(starts, ends, valid) if keep]
+    assert list(zip(window_starts, window_ends)) == expected
+    # Sin las columnas M-N, todas las tareas tienen el día entero
+    assert read_time_windows(df.iloc[:, :12], valid) == ([0] * 5, [MINUTES_PER_DAY] * 5)
+
+
+def random_task(rng):
+    """Tarea con duración y población al azar; la mitad con franja de mañana o de tarde."""
+    task = Task.from_values("ACS", "1", "Client", "Carrer 1", "", rng.choice(TOWNS), "", rng.randrange(15, 120, 5))
+    if rng.random() < 0.5:
+        start = rng.choice([8 * 60, 9 * 60, 10 * 60, 12 * 60, 14 * 60])
+        task.window_start, task.window_end = start, start + rng.randrange(60, 300, 30)
+    return task
+
+
+def random_day(rng, size):
+    """Día con hasta size visitas al azar que respetan sus franjas."""
+    operario = Operario(1, PlanningCalendar(datetime(2026, 3, 2), 1))
+    route_day = operario.get_route_day("Lunes", 1)
+    tasks = []
+    for _ in range(size * 3):
+        task = random_task(rng)
+        if len(tasks) < size and route_day.schedule_fits_windows(tasks + [task]):
+            tasks.append(task)
+    route_day.rebuild(tasks)
+    return route_day
+
+
+def test_forward_slack_bounds_each_visit():
+    rng = random.Random(18)
+    for _ in range(200):
+        route_day = random_day(rng, rng.randrange(1, 7))
+        slack = route_day.forward_slack()
+        assert len(slack) == len(route_day.visit_tasks)
+        for task, start_minute, margin in zip(route_day.visit_tasks, route_day.start_times, slack):
+            assert 0 <= margin <= task.window_end - task.duracion - start_minute
+        last = route_day.visit_tasks[-1]
+        assert slack[-1] == last.window_end - last.duracion - route_day.start_times[-1]
+
+
+def test_insertion_feasible_matches_a_full_simulation():
+    rng = random.Random(7)
+    checked = {True: 0, False: 0}
+    for _ in range(300):
+        route_day = random_day(rng, rng.randrange(0, 7))
+        task = random_task(rng)
+        locations = [ORIGIN_LOCATION] + [visit_task.poblacion for visit_task in route_day.visit_tasks]
+        for position, origin in enumerate(locations):
+            travel_in = estimate_travel_time(origin, task.poblacion)
+            travel_out = (estimate_travel_time(task.poblacion, locations[position + 1])
+                          if position < len(locations) - 1 else None)
+            tasks = list(route_day.visit_tasks)
+            tasks.insert(position, task)
+            expected = route_day.schedule_fits_windows(tasks)
+            assert route_day.insertion_feasible(task, position, travel_in, travel_out) == expected
+            checked[expected] += 1
+    assert checked[True] and checked[False]
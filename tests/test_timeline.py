@@ -0,0 +1,64 @@
+"""Pruebas del modelo de minutos enteros frente al modelo anterior basado en datetime."""
+
+import contextlib
+import io
+from datetime import datetime
+
+import pytest
+
+from benchmarks import datetime_start_times, generate_synthetic_tasks
+from route_planner import (ASSIGNMENT_MODES, LUNCH_START, PlanningCalendar, Task, format_hour, generate_routes,
+                           read_excel_data)
+
+
+@pytest.mark.parametrize('assignment', ASSIGNMENT_MODES)
+def test_start_times_and_timeline_match_the_datetime_model(assignment):
+    tasks = read_excel_data(generate_synthetic_tasks(300, 30, 5))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 2, assignment=assignment,
+                                    calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    days = [route_day for operario in operarios for route_day in operario.active_days()]
+    assert days
+    
+    lunches_seen = 0
+    for route_day in days:
+        starts, lunches = datetime_start_times(
+            [(task.duracion, travel_time) for task, travel_time in zip(route_day.visit_tasks, route_day.travel_times)]
+        )
+        assert [format_hour(minute) for minute in route_day.start_times] == [start.strftime("%H:%M")
+                                                                             for start in starts]
+        
+        # La pausa para comer va a las 13:00 justo antes de las mismas visitas
+        expected = [('sortida', '08:00')]
+        for start, lunch in zip(starts, lunches):
+            if lunch:
+                expected.append(('dinar', format_hour(LUNCH_START)))
+            expected.append(('visita', start.strftime("%H:%M")))
+        last = route_day.visit_tasks[-1]
+        expected.append(('tornada', format_hour(route_day.start_times[-1] + last.duracion)))
+        assert [(kind, format_hour(minute)) for kind, minute, _ in route_day.timeline()] == expected
+        lunches_seen += sum(lunches)
+    assert lunches_seen
+
+
+def test_visit_keeps_the_attributes_the_report_and_app_read():
+    tasks = read_excel_data(generate_synthetic_tasks(60, 10, 2, window_ratio=0.5))
+    with contextlib.redirect_stdout(io.StringIO()):
+        operarios = generate_routes(tasks, 1, calendar=PlanningCalendar(datetime(2026, 3, 2), 4))
+    route_day = operarios[0].active_days()[0]
+    
+    for visit, task, start_minute, travel_time in zip(route_day.tasks, route_day.visit_tasks,
+                                                       route_day.start_times, route_day.travel_times):
+        assert visit.task is task
+        for name in Task.__slots__:
+            assert getattr(visit, name) == getattr(task, name)
+        assert visit.travel_time == travel_time
+        assert visit.start_minute == start_minute
+        assert visit.end_minute == start_minute + task.duracion
+        assert visit.start_time == datetime.combine(route_day.date, datetime.min.time()).replace(
+            hour=start_minute // 60, minute=start_minute % 60)
+        assert visit.start_time.strftime("%H:%M") == format_hour(start_minute)
+        assert str(visit) == str(task)
+    
+    with pytest.raises(AttributeError):
+        route_day.tasks[0].no_existe
@@ -0,0 +1,99 @@
+"""Pruebas del proveedor de tiempos por carretera y su caché contra el servidor de rutas de prueba."""
+
+import sqlite3
+
+import pytest
+
+from route_planner import ORIGIN_LOCATION, get_travel_matrix
+from travel_times import (CachedTravelTimeProvider, RoutingServerProvider, SQLiteTravelTimeCache, StubRoutingServer,
+                          TravelTimeProvider, coordinates_of, road_travel_matrix)
+
+
+@pytest.fixture
+def stub():
+    """Servidor de rutas de prueba en un puerto libre, más lento que la estimación en línea recta."""
+    server = StubRoutingServer(speed_kmh=25)
+    server.start()
+    yield server
+    server.stop()
+
+
+def test_provider_interface_is_abstract():
+    with pytest.raises(TypeError):
+        TravelTimeProvider()
+
+
+def test_second_run_uses_only_the_cache(stub, tmp_path):
+    travel_matrix = get_travel_matrix()
+    locations = travel_matrix.names[1:12]
+    server = RoutingServerProvider(stub.url, coordinates_of(travel_matrix), batch_size=7, max_connections=2)
+    cache = SQLiteTravelTimeCache(str(tmp_path / "road_times.sqlite"))
+    
+    first = road_travel_matrix(locations, CachedTravelTimeProvider(server, cache))
+    requests = server.requests
+    assert requests > 0
+    assert len(cache) == 12 * 11
+    
+    second = road_travel_matrix(locations, CachedTravelTimeProvider(server, cache))
+    assert server.requests == requests
+    assert (second.matrix == first.matrix).all()
+    assert cache.hits == 12 * 11
+    assert (first.matrix != travel_matrix.matrix).any()
+
+
+def test_cache_is_keyed_by_provider(stub, tmp_path):
+    travel_matrix = get_travel_matrix()
+    locations = travel_matrix.names[1:5]
+    cache = SQLiteTravelTimeCache(str(tmp_path / "road_times.sqlite"))
+    driving = RoutingServerProvider(stub.url, coordinates_of(travel_matrix))
+    cycling = RoutingServerProvider(stub.url, coordinates_of(travel_matrix), profile="cycling")
+    assert driving.source != cycling.source
+    
+    road_travel_matrix(locations, CachedTravelTimeProvider(driving, cache))
+    road_travel_matrix(locations, CachedTravelTimeProvider(cycling, cache))
+    assert cycling.requests > 0
+    assert cache.hits == 0
+    assert len(cache) == 2 * 5 * 4
+
+
+def test_cache_expires_evicts_and_closes_connections(tmp_path, monkeypatch):
+    now = [1000.0]
+    cache = SQLiteTravelTimeCache(str(tmp_path / "road_times.sqlite"), ttl=60, max_entries=3,
+                                  clock=lambda: now[0])
+    connections = []
+    
+    def connect():
+        connection = sqlite3.connect(cache.path)
+        connections.append(connection)
+        return connection
+    
+    monkeypatch.setattr(cache, 'connect', connect)
+    # Cada par se guarda un segundo después del anterior: se conservan los tres últimos
+    for i in range(5):
+        cache.put_many({(ORIGIN_LOCATION, str(i)): i})
+        now[0] += 1
+    assert len(cache) == 3
+    pairs = [(ORIGIN_LOCATION, str(i)) for i in range(5)]
+    assert cache.get_many(pairs) == {pair: i for i, pair in enumerate(pairs) if i >= 2}
+    
+    now[0] += 59
+    assert cache.get_many(pairs) == {(ORIGIN_LOCATION, '4'): 4}
+    
+    assert len(connections) == 8
+    for connection in connections:
+        with pytest.raises(sqlite3.ProgrammingError):
+            connection.execute("SELECT 1")
+
+
+def test_cache_without_source_is_replaced(tmp_path):
+    path = str(tmp_path / "road_times.sqlite")
+    with sqlite3.connect(path) as connection:
+        connection.execute("CREATE TABLE travel_times (origin TEXT, destination TEXT, minutes INTEGER,"
+                           " fetched_at REAL, PRIMARY KEY (origin, destination))")
+        connection.execute("INSERT INTO travel_times VALUES ('Vic', 'Manlleu', 12, 0)")
+    connection.close()
+    
+    cache = SQLiteTravelTimeCache(path)
+    assert len(cache) == 0
+    cache.put_many({('Vic', 'Manlleu'): 15}, "http://localhost:5000|driving")
+    assert cache.get_many([('Vic', 'Manlleu')], "http://localhost:5000|driving") == {('Vic', 'Manlleu'): 15}
@@ -0,0 +1,443 @@
+"""Tiempos de viaje por carretera desde un servidor de rutas, con caché persistente.
+
+Uso:
+    python travel_times.py stub [--port 5000]
+
+Un TravelTimeProvider devuelve los minutos de viaje de una lista de pares
+(origen, destino). RoutingServerProvider los pide a un servidor con la API
+"table" de OSRM, en lotes asíncronos que comparten un conjunto de conexiones
+persistentes, y CachedTravelTimeProvider guarda los resultados en SQLite (con
+caducidad y límite de tamaño), de modo que repetir una planificación de la
+misma zona no hace ninguna petición. road_travel_matrix reúne todos los pares
+que necesita una planificación y construye la TravelTimeMatrix que usa
+estimate_travel_time.
+
+StubRoutingServer es un servidor local con la misma API que calcula los
+tiempos con la fórmula de haversine; sirve para probar sin un servidor real.
+
+Solo usa la biblioteca estándar; route_planner se importa al construir la matriz.
+"""
+
+import argparse
+import asyncio
+import http.client
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+from abc import ABC, abstractmethod
+from contextlib import closing
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+DEFAULT_BATCH_SIZE = 100  # Pares por petición al servidor de rutas
+DEFAULT_CONNECTIONS = 4  # Conexiones persistentes en paralelo
+DEFAULT_TIMEOUT = 30  # Segundos por petición
+CACHE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), ".travel_cache", "road_times.sqlite")
+CACHE_TTL = 30 * 24 * 3600  # Segundos que un tiempo de viaje se considera vigente
+CACHE_MAX_ENTRIES = 200_000  # Pares guardados como máximo; se descartan los más antiguos
+
+
+class TravelTimeProvider(ABC):
+    """Interfaz de los proveedores de tiempos de viaje.
+
+    source identifica de dónde salen los tiempos; la caché lo guarda con cada
+    par, así que dos proveedores con tiempos distintos no comparten entradas.
+    """
+
+    @property
+    def source(self):
+        """Identidad del proveedor en la caché; por defecto, el nombre de la clase."""
+        return type(self).__name__
+
+    @abstractmethod
+    def travel_times(self, pairs):
+        """Devuelve {(origen, destino): minutos} para los pares dados.
+
+        Los pares que el proveedor no sabe resolver no aparecen en el resultado.
+        """
+
+
+class RoutingServerProvider(TravelTimeProvider):
+    """Pide los tiempos a un servidor de rutas con la API "table" de OSRM.
+
+    coordinates es un diccionario {población: (lat, lon)}; los pares con alguna
+    población sin coordenadas se ignoran. Los pares se agrupan por origen en
+    lotes de batch_size y se piden a la vez por max_connections conexiones
+    HTTP persistentes. requests cuenta las peticiones hechas al servidor (se
+    actualiza desde los hilos de fetch_all, con un cerrojo).
+    """
+
+    def __init__(self, base_url, coordinates, batch_size=DEFAULT_BATCH_SIZE,
+                 max_connections=DEFAULT_CONNECTIONS, timeout=DEFAULT_TIMEOUT, profile="driving"):
+        """Prepara el proveedor para el servidor de base_url (por ejemplo http://localhost:5000)."""
+        url = urlsplit(base_url)
+        self.scheme = url.scheme or "http"
+        self.host = url.hostname
+        self.port = url.port
+        self.path = url.path.rstrip("/")
+        self.coordinates = coordinates
+        self.batch_size = batch_size
+        self.max_connections = max_connections
+        self.timeout = timeout
+        self.profile = profile
+        self.requests = 0
+        self.requests_lock = threading.Lock()
+
+    @property
+    def source(self):
+        """URL base del servidor más el perfil de rutas, por ejemplo http://localhost:5000|driving."""
+        port = f":{self.port}" if self.port is not None else ""
+        return f"{self.scheme}://{self.host}{port}{self.path}|{self.profile}"
+
+    def travel_times(self, pairs):
+        """Pide los pares al servidor en lotes asíncronos y devuelve los minutos de cada uno."""
+        pairs = [
+            pair for pair in dict.fromkeys(pairs)
+            if pair[0] in self.coordinates and pair[1] in self.coordinates
+        ]
+        if not pairs:
+            return {}
+        return asyncio.run(self.fetch_all(pairs))
+
+    def batches(self, pairs):
+        """Divide los pares, ordenados por origen, en lotes de batch_size."""
+        pairs = sorted(pairs)
+        for i in range(0, len(pairs), self.batch_size):
+            yield pairs[i:i + self.batch_size]
+
+    async def fetch_all(self, pairs):
+        """Pide todos los lotes en paralelo, repartidos entre las conexiones del conjunto."""
+        pool = asyncio.Queue()
+        for _ in range(self.max_connections):
+            pool.put_nowait(self.connect())
+
+        async def fetch(batch):
+            connection = await pool.get()
+            try:
+                return await asyncio.to_thread(self.fetch_batch, connection, batch)
+            finally:
+                pool.put_nowait(connection)
+
+        try:
+            results = await asyncio.gather(*(fetch(batch) for batch in self.batches(pairs)))
+        finally:
+            while not pool.empty():
+                pool.get_nowait().close()
+
+        travel_times = {}
+        for result in results:
+            travel_times.update(result)
+        return travel_times
+
+    def connect(self):
+        """Crea una conexión HTTP persistente con el servidor."""
+        connection_class = http.client.HTTPSConnection if self.scheme == "https" else http.client.HTTPConnection
+        return connection_class(self.host, self.port, timeout=self.timeout)
+
+    def fetch_batch(self, connection, batch):
+        """Pide un lote como una tabla orígenes x destinos y devuelve los minutos de sus pares."""
+        origins = list(dict.fromkeys(origin for origin, _ in batch))
+        destinations = list(dict.fromkeys(destination for _, destination in batch))
+        locations = list(dict.fromkeys(origins + destinations))
+        index = {location: i for i, location in enumerate(locations)}
+        coordinates = ";".join(
+            f"{self.coordinates[location][1]:.6f},{self.coordinates[location][0]:.6f}" for location in locations
+        )
+        path = (f"{self.path}/table/v1/{self.profile}/{coordinates}"
+                f"?sources={';'.join(str(index[o]) for o in origins)}"
+                f"&destinations={';'.join(str(index[d]) for d in destinations)}"
+                f"&annotations=duration")
+
+        data = self.get_json(connection, path)
+        durations = data['durations']
+        row = {origin: i for i, origin in enumerate(origins)}
+        column = {destination: j for j, destination in enumerate(destinations)}
+        travel_times = {}
+        for origin, destination in batch:
+            seconds = durations[row[origin]][column[destination]]
+            if seconds is not None:
+                travel_times[(origin, destination)] = math.ceil(seconds / 60)
+        return travel_times
+
+    def get_json(self, connection, path):
+        """Hace una petición GET por la conexión dada, reconectando una vez si se ha cerrado."""
+        for attempt in range(2):
+            try:
+                connection.request("GET", path)
+                response = connection.getresponse()
+                body = response.read()
+                break
+            except (http.client.HTTPException, ConnectionError):
+                connection.close()
+                if attempt:
+                    raise
+        with self.requests_lock:
+            self.requests += 1
+
+        if response.status != 200:
+            raise RuntimeError(f"El servidor de rutas ha respondido {response.status}: {body[:200]!r}")
+        data = json.loads(body)
+        if data.get('code', 'Ok') != 'Ok':
+            raise RuntimeError(f"El servidor de rutas ha respondido {data.get('code')}: {data.get('message')}")
+        return data
+
+
+class SQLiteTravelTimeCache:
+    """Caché persistente de tiempos de viaje en SQLite, con caducidad y límite de tamaño.
+
+    Cada par se guarda con el source del proveedor que lo ha calculado (la URL
+    del servidor y el perfil), que forma parte de la clave. Los tiempos de más
+    de ttl segundos no se devuelven y se borran al guardar; si se superan
+    max_entries pares, se borran los más antiguos. clock da la hora actual en
+    segundos (time.time por defecto). Cada operación abre su propia conexión,
+    así que la caché se puede compartir entre procesos.
+    """
+
+    def __init__(self, path=CACHE_FILE, ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES, clock=time.time):
+        """Abre (o crea) la caché en path."""
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.clock = clock
+        self.hits = 0
+        self.misses = 0
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with closing(self.connect()) as connection, connection:
+            # Las cachés anteriores no guardaban el proveedor: se descartan
+            columns = [row[1] for row in connection.execute("PRAGMA table_info(travel_times)")]
+            if columns and 'source' not in columns:
+                connection.execute("DROP TABLE travel_times")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS travel_times ("
+                " source TEXT NOT NULL, origin TEXT NOT NULL, destination TEXT NOT NULL,"
+                " minutes INTEGER NOT NULL, fetched_at REAL NOT NULL,"
+                " PRIMARY KEY (source, origin, destination))"
+            )
+            connection.execute("CREATE INDEX IF NOT EXISTS travel_times_age ON travel_times (fetched_at)")
+
+    def connect(self):
+        """Abre una conexión con la base de datos de la caché.
+
+        El with de una conexión de sqlite3 solo confirma la transacción; quien la
+        abre la cierra con contextlib.closing.
+        """
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, pairs, source=""):
+        """Devuelve {(origen, destino): minutos} de los pares de source que están en la caché y no han caducado."""
+        oldest = self.clock() - self.ttl
+        found = {}
+        with closing(self.connect()) as connection, connection:
+            connection.execute("CREATE TEMP TABLE wanted (origin TEXT, destination TEXT)")
+            connection.executemany("INSERT INTO wanted VALUES (?, ?)", pairs)
+            rows = connection.execute(
+                "SELECT t.origin, t.destination, t.minutes FROM travel_times t"
+                " JOIN wanted w ON t.origin = w.origin AND t.destination = w.destination"
+                " WHERE t.source = ? AND t.fetched_at >= ?", (source, oldest),
+            )
+            for origin, destination, minutes in rows:
+                found[(origin, destination)] = minutes
+        self.hits += len(found)
+        self.misses += len(set(pairs)) - len(found)
+        return found
+
+    def put_many(self, travel_times, source=""):
+        """Guarda los tiempos dados de source y aplica la caducidad y el límite de tamaño."""
+        now = self.clock()
+        with closing(self.connect()) as connection, connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO travel_times VALUES (?, ?, ?, ?, ?)",
+                [(source, origin, destination, minutes, now)
+                 for (origin, destination), minutes in travel_times.items()],
+            )
+            self.evict(connection, now)
+
+    def evict(self, connection, now):
+        """Borra los tiempos caducados y, si sobran, los más antiguos."""
+        connection.execute("DELETE FROM travel_times WHERE fetched_at < ?", (now - self.ttl,))
+        (count,) = connection.execute("SELECT COUNT(*) FROM travel_times").fetchone()
+        if count > self.max_entries:
+            connection.execute(
+                "DELETE FROM travel_times WHERE rowid IN"
+                " (SELECT rowid FROM travel_times ORDER BY fetched_at LIMIT ?)",
+                (count - self.max_entries,),
+            )
+
+    def __len__(self):
+        """Número de pares guardados (incluidos los caducados que aún no se han borrado)."""
+        with closing(self.connect()) as connection, connection:
+            return connection.execute("SELECT COUNT(*) FROM travel_times").fetchone()[0]
+
+
+class CachedTravelTimeProvider(TravelTimeProvider):
+    """Proveedor que consulta primero una SQLiteTravelTimeCache y solo pide al proveedor lo que falta.
+
+    Las entradas de la caché se buscan y se guardan con el source del proveedor.
+    """
+
+    def __init__(self, provider, cache):
+        """Combina un proveedor con una caché."""
+        self.provider = provider
+        self.cache = cache
+
+    @property
+    def source(self):
+        """El source del proveedor al que envuelve."""
+        return self.provider.source
+
+    def travel_times(self, pairs):
+        """Devuelve los minutos de los pares, de la caché o del proveedor."""
+        pairs = list(dict.fromkeys(pairs))
+        travel_times = self.cache.get_many(pairs, self.source)
+        missing = [pair for pair in pairs if pair not in travel_times]
+        if missing:
+            fetched = self.provider.travel_times(missing)
+            if fetched:
+                self.cache.put_many(fetched, self.source)
+            travel_times.update(fetched)
+        return travel_times
+
+
+def road_travel_matrix(locations, provider, travel_matrix=None):
+    """Devuelve una copia de la TravelTimeMatrix con tiempos por carretera entre las poblaciones dadas.
+
+    Se piden de una vez todos los pares ordenados entre las poblaciones con
+    coordenadas (más Vic). El resto de pares, y los que el proveedor no
+    resuelve, conservan el tiempo de la matriz de partida (por defecto, la
+    activa). Devuelve None si no hay coordenadas.
+    """
+    import route_planner
+
+    if travel_matrix is None:
+        travel_matrix = route_planner.get_travel_matrix()
+    if travel_matrix is None:
+        return None
+
+    ids = {}
+    for location in [route_planner.ORIGIN_LOCATION, *locations]:
+        location_id = travel_matrix.location_id(location)
+        if location_id is not None:
+            ids.setdefault(travel_matrix.names[location_id], location_id)
+    pairs = [(origin, destination) for origin in ids for destination in ids if origin != destination]
+
+    road_matrix = route_planner.TravelTimeMatrix(
+        travel_matrix.names, travel_matrix.latitudes, travel_matrix.longitudes, travel_matrix.matrix.copy(),
+    )
+    for (origin, destination), minutes in provider.travel_times(pairs).items():
+        road_matrix.matrix[ids[origin], ids[destination]] = max(minutes, route_planner.SAME_LOCATION_TRAVEL_TIME)
+    return road_matrix
+
+
+def coordinates_of(travel_matrix):
+    """Devuelve {población: (lat, lon)} de una TravelTimeMatrix, para RoutingServerProvider."""
+    return {
+        name: (float(lat), float(lon))
+        for name, lat, lon in zip(travel_matrix.names, travel_matrix.latitudes, travel_matrix.longitudes)
+    }
+
+
+class StubRoutingServer:
+    """Servidor HTTP local con la API "table" de OSRM, con tiempos calculados por haversine.
+
+    Cuenta las peticiones recibidas en requests. Se arranca en segundo plano con
+    start(), que devuelve su URL, y se para con stop().
+    """
+
+    EARTH_RADIUS_KM = 6371.0
+
+    def __init__(self, host="127.0.0.1", port=0, speed_kmh=50, road_factor=1.3):
+        """Prepara el servidor; con port=0 se elige un puerto libre."""
+        self.speed_kmh = speed_kmh
+        self.road_factor = road_factor
+        self.requests = 0
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"  # Conexiones persistentes
+
+            def do_GET(self):
+                stub.requests += 1
+                status, data = stub.table(self.path)
+                body = json.dumps(data).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread = None
+
+    @property
+    def url(self):
+        """URL base del servidor."""
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def table(self, path):
+        """Responde a una petición /table/v1/{perfil}/{lon,lat;...}?sources=...&destinations=..."""
+        url = urlsplit(path)
+        parts = url.path.strip("/").split("/")
+        if len(parts) != 4 or parts[0] != "table":
+            return 404, {'code': 'InvalidUrl', 'message': url.path}
+        try:
+            points = [tuple(map(float, point.split(","))) for point in parts[3].split(";")]
+            query = parse_qs(url.query)
+            sources = [int(i) for i in query['sources'][0].split(";")] if 'sources' in query else range(len(points))
+            destinations = ([int(i) for i in query['destinations'][0].split(";")]
+                            if 'destinations' in query else range(len(points)))
+        except (ValueError, IndexError):
+            return 400, {'code': 'InvalidQuery', 'message': path}
+
+        durations = [[self.duration(points[i], points[j]) for j in destinations] for i in sources]
+        return 200, {'code': 'Ok', 'durations': durations}
+
+    def duration(self, a, b):
+        """Segundos de conducción entre dos puntos (lon, lat)."""
+        lon1, lat1, lon2, lat2 = map(math.radians, (*a, *b))
+        h = (math.sin((lat2 - lat1) / 2) ** 2
+             + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        distance_km = 2 * self.EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+        return distance_km * self.road_factor / self.speed_kmh * 3600
+
+    def start(self):
+        """Arranca el servidor en un hilo y devuelve su URL."""
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        return self.url
+
+    def stop(self):
+        """Para el servidor."""
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def main(argv=None):
+    """Punto de entrada: arranca el servidor de rutas de prueba."""
+    parser = argparse.ArgumentParser(description="Servidor de rutas de prueba con la API table de OSRM.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    stub_parser = subparsers.add_parser("stub", help="arranca un servidor de rutas local de prueba")
+    stub_parser.add_argument("--host", default="127.0.0.1")
+    stub_parser.add_argument("--port", type=int, default=5000)
+    args = parser.parse_args(argv)
+
+    stub = StubRoutingServer(args.host, args.port)
+    print(f"Servidor de rutas de prueba en {stub.url}")
+    try:
+        stub.server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        stub.server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())